@@ -0,0 +1,248 @@
+"""
+Асинхронный конвейер обработки файлов: чтение, разбор и запись результатов перекрываются во времени.
+
+Этапы связаны ограниченными очередями: если разбор не успевает за чтением, читатели ждут свободного места
+в очереди (обратное давление), поэтому в памяти одновременно находится не больше `queue_size` прочитанных файлов.
+Целиком читаются только файлы не больше `large_file_size`; более крупные файлы этап разбора читает сам потоково,
+а сжатое содержимое распаковывается и декодируется порциями. Поэтому в памяти находится не больше
+`queue_size * large_file_size` байт прочитанного содержимого (плюс буферы разбора) при любом размере файлов.
+Чтение и запись выполняются в пуле потоков, разбор — в отдельном пуле (по умолчанию процессов).
+"""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from batch_processor import (BatchResult, EXECUTOR_PROCESS, _process_file, _process_file_in_child, cache_namespace,
+                             create_handler, is_supported, result_path)
+from columnar_data_handler import ColumnarDataHandler
+from columnar_writer import COLUMNAR_SUFFIX, PARQUET_SUFFIX
+from compressed_io import data_suffix, open_payload
+from data_handler import SumResult, merge_results
+from instrumentation import COUNTER_BYTES_READ, STAGE_PARSE, STAGE_READ, init_worker, metrics
+from result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_READ_WORKERS = 8
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_WRITE_BATCH_SIZE = 32
+DEFAULT_LARGE_FILE_SIZE = 16 * 1024 * 1024
+
+Writer = Callable[[Path, SumResult, Optional[float]], None]
+
+
+def _parse_payload(path: Path, payload: bytes, options: Dict[str, Any]) -> Tuple[SumResult, bool]:
+    try:
+        handler = create_handler(path, **options)
+        if isinstance(handler, ColumnarDataHandler) and data_suffix(path) == COLUMNAR_SUFFIX:
+            result = handler.process_buffer(payload)
+            handler.log_invalid_values(path)
+            return result, True
+        with open_payload(payload, newline='') as f:
+            result = handler.process_stream(f)
+        handler.log_invalid_values(path)
+        return result, True
+    except (ValueError, OSError) as e:
+        logger.error(f"Ошибка при обработке файла {path}: {e}")
+        return SumResult(total=0.0, count=0, incorrect_count=0), False
+    except Exception:
+        logger.exception(f"Непредвиденная ошибка при обработке файла {path}")
+        return SumResult(total=0.0, count=0, incorrect_count=0), False
+
+
+def parse_payload(path: Path, payload: bytes, options: Dict[str, Any]) -> SumResult:
+    """
+    Разбирает содержимое файла, прочитанное заранее.
+
+    Args:
+        path (Path): Путь к файлу (по расширению выбирается обработчик).
+        payload (bytes): Содержимое файла.
+        options (Dict[str, Any]): Параметры движка суммирования, см. `DataHandler.__init__`.
+
+    Returns:
+        SumResult: Результат суммирования.
+    """
+    return _parse_payload(path, payload, options)[0]
+
+
+def _write_batch(batch: List[Tuple[int, Path, SumResult]], output_dir: Path, suffix: str, writer: Writer) -> None:
+    for _, path, sum_result in batch:
+        output_path = result_path(output_dir, path, suffix)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        writer(output_path, sum_result, sum_result.total / sum_result.count if sum_result.count > 0 else None)
+
+
+def _read_file(path: Path, max_size: int) -> Optional[bytes]:
+    """
+    Читает файл целиком, если он не больше `max_size` байт; для большего файла возвращает None.
+    Для Parquet-файла тоже возвращает None: pyarrow читает его по группам строк сам, см. `ColumnarDataHandler`.
+    """
+    if data_suffix(path) == PARQUET_SUFFIX:
+        return None
+    with path.open('rb') as f:
+        if os.fstat(f.fileno()).st_size > max_size:
+            return None
+        return f.read()
+
+
+async def _read_stage(paths: asyncio.Queue, read_queue: asyncio.Queue, io_pool: Executor,
+                      options: Dict[str, Any], cache: Optional[ResultCache], large_file_size: int) -> None:
+    """
+    Читает файлы и передает этапу разбора элементы (номер, путь, содержимое, результат, отпечаток для кеша).
+    Содержимое None без результата означает крупный или Parquet-файл, который этап разбора читает сам.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await paths.get()
+        if item is None:
+            return
+        index, path = item
+        fingerprint = None
+        if cache is not None and is_supported(path):
+            cached = await loop.run_in_executor(io_pool, cache.get, path, cache_namespace(path, **options))
+            if cached is not None:
+                await read_queue.put((index, path, None, cached, None))
+                continue
+            fingerprint = await loop.run_in_executor(io_pool, cache.fingerprint, path)
+        try:
+            with metrics.stage(STAGE_READ, path):
+                payload = await loop.run_in_executor(io_pool, _read_file, path, large_file_size)
+        except OSError as e:
+            logger.error(f"Ошибка при чтении файла {path}: {e}")
+            await read_queue.put((index, path, None, SumResult(total=0.0, count=0, incorrect_count=0), None))
+            continue
+        if payload is not None:
+            metrics.count(COUNTER_BYTES_READ, len(payload), path)
+        await read_queue.put((index, path, payload, None, fingerprint))
+
+
+async def _parse_stage(read_queue: asyncio.Queue, write_queue: asyncio.Queue, parse_pool: Executor,
+                       io_pool: Executor, options: Dict[str, Any], cache: Optional[ResultCache],
+                       parse_file: Callable[[Path, Dict[str, Any]], tuple]) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await read_queue.get()
+        if item is None:
+            return
+        index, path, payload, sum_result, fingerprint = item
+        if sum_result is None:
+            with metrics.stage(STAGE_PARSE, path):
+                if payload is None:
+                    # Крупный файл читается потоково; обработчик сам учитывает размер файла и результат
+                    sum_result, succeeded, *snapshot = await loop.run_in_executor(parse_pool, parse_file, path,
+                                                                                  options)
+                    if snapshot:
+                        metrics.merge(snapshot[0])
+                else:
+                    sum_result, succeeded = await loop.run_in_executor(parse_pool, _parse_payload, path, payload,
+                                                                       options)
+                    metrics.record_result(path, sum_result)
+            if cache is not None and succeeded and fingerprint is not None:
+                await loop.run_in_executor(io_pool, cache.put, path, cache_namespace(path, **options), sum_result,
+                                           fingerprint)
+        await write_queue.put((index, path, sum_result))
+
+
+async def _write_stage(write_queue: asyncio.Queue, io_pool: Executor, output_dir: Path, suffix: str,
+                       writer: Writer, write_batch_size: int) -> List[Tuple[int, Path, SumResult]]:
+    """
+    Собирает готовые результаты в пачки (до `write_batch_size` или сколько уже накопилось в очереди)
+    и записывает каждую пачку одним заданием в пуле потоков.
+    """
+    loop = asyncio.get_running_loop()
+    written = []
+    done = False
+    while not done:
+        item = await write_queue.get()
+        batch = []
+        while item is not None:
+            batch.append(item)
+            if len(batch) >= write_batch_size or write_queue.empty():
+                break
+            item = write_queue.get_nowait()
+        done = item is None
+        if batch:
+            await loop.run_in_executor(io_pool, _write_batch, batch, output_dir, suffix, writer)
+            written.extend(batch)
+    return written
+
+
+async def process_files_async(paths: List[Path], output_dir: Path, writer: Writer, suffix: str,
+                              read_workers: int = DEFAULT_READ_WORKERS, parse_workers: Optional[int] = None,
+                              parse_executor: str = EXECUTOR_PROCESS, queue_size: int = DEFAULT_QUEUE_SIZE,
+                              write_batch_size: int = DEFAULT_WRITE_BATCH_SIZE, cache: Optional[ResultCache] = None,
+                              large_file_size: int = DEFAULT_LARGE_FILE_SIZE, **options: Any) -> BatchResult:
+    """
+    Обрабатывает файлы конвейером «чтение → разбор → запись» с ограниченными очередями между этапами.
+
+    Args:
+        paths (List[Path]): Файлы для обработки.
+        output_dir (Path): Каталог для файлов результатов.
+        writer (Writer): Функция записи результатов (`write_json_results` или `write_csv_results`).
+        suffix (str): Расширение файлов результатов.
+        read_workers (int): Количество одновременных чтений.
+        parse_workers (Optional[int]): Размер пула разбора (по умолчанию — число ядер).
+        parse_executor (str): Тип пула разбора: 'thread' или 'process'.
+        queue_size (int): Емкость очередей между этапами.
+        write_batch_size (int): Максимальное количество результатов в одной пачке записи.
+        cache (Optional[ResultCache]): Кеш результатов: неизменившиеся файлы не читаются и не разбираются.
+        large_file_size (int): Файлы больше этого размера (в байтах) не читаются целиком, а разбираются потоково.
+        **options: Параметры движка суммирования, см. `DataHandler.__init__`.
+
+    Returns:
+        BatchResult: Результаты по файлам (в порядке `paths`), общий результат и время обработки.
+    """
+    if read_workers <= 0 or queue_size <= 0 or write_batch_size <= 0:
+        raise ValueError("Количество читателей, емкость очередей и размер пачки записи должны быть положительными.")
+    parse_workers = parse_workers or os.cpu_count() or 1
+    if parse_executor == EXECUTOR_PROCESS:
+        parse_pool: Executor = ProcessPoolExecutor(max_workers=parse_workers, initializer=init_worker,
+                                                   initargs=(metrics.enabled,))
+        parse_file = _process_file_in_child
+    else:
+        parse_pool = ThreadPoolExecutor(max_workers=parse_workers)
+        parse_file = _process_file
+
+    start = time.perf_counter()
+    path_queue: asyncio.Queue = asyncio.Queue()
+    for item in enumerate(paths):
+        path_queue.put_nowait(item)
+    for _ in range(read_workers):
+        path_queue.put_nowait(None)
+    read_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    write_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    with ThreadPoolExecutor(max_workers=read_workers + 1) as io_pool, parse_pool:
+        readers = [asyncio.create_task(_read_stage(path_queue, read_queue, io_pool, options, cache, large_file_size))
+                   for _ in range(read_workers)]
+        parsers = [asyncio.create_task(_parse_stage(read_queue, write_queue, parse_pool, io_pool, options, cache,
+                                                    parse_file))
+                   for _ in range(parse_workers)]
+        writer_task = asyncio.create_task(_write_stage(write_queue, io_pool, output_dir, suffix, writer,
+                                                       write_batch_size))
+        try:
+            await asyncio.gather(*readers)
+            for _ in parsers:
+                await read_queue.put(None)
+            await asyncio.gather(*parsers)
+            await write_queue.put(None)
+            written = await writer_task
+        except BaseException:
+            for task in readers + parsers + [writer_task]:
+                task.cancel()
+            raise
+
+    written.sort(key=lambda item: item[0])
+    results = [(path, sum_result) for _, path, sum_result in written]
+    return BatchResult(results=results, total=merge_results(result for _, result in results),
+                       seconds=time.perf_counter() - start)
+
+
+def run_pipeline(paths: List[Path], output_dir: Path, writer: Writer, suffix: str, **kwargs: Any) -> BatchResult:
+    """
+    Синхронная обертка над `process_files_async`.
+    """
+    return asyncio.run(process_files_async(paths, output_dir, writer, suffix, **kwargs))
@@ -0,0 +1,202 @@
+import glob
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import repeat
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+from columnar_data_handler import ColumnarDataHandler
+from columnar_writer import COLUMNAR_SUFFIX, PARQUET_SUFFIX
+from compressed_io import data_suffix
+from csv_data_handler import CSVDataHandler
+from data_handler import DataHandler, SumResult, merge_results
+from instrumentation import Snapshot, init_worker, metrics
+from json_data_handler import JSONDataHandler, JSON_LINES_SUFFIXES
+from result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_THREAD = 'thread'
+EXECUTOR_PROCESS = 'process'
+EXECUTORS = (EXECUTOR_THREAD, EXECUTOR_PROCESS)
+
+HANDLERS = {'.json': JSONDataHandler, '.csv': CSVDataHandler,
+            COLUMNAR_SUFFIX: ColumnarDataHandler, PARQUET_SUFFIX: ColumnarDataHandler}
+HANDLERS.update((suffix, JSONDataHandler) for suffix in JSON_LINES_SUFFIXES)
+
+
+@dataclass
+class BatchResult:
+    results: List[Tuple[Path, SumResult]] = field(default_factory=list)
+    total: SumResult = SumResult(total=0.0, count=0, incorrect_count=0)
+    seconds: float = 0.0
+
+    @property
+    def files_per_second(self) -> float:
+        return len(self.results) / self.seconds if self.seconds > 0 else 0.0
+
+
+def is_supported(path: Path) -> bool:
+    """
+    Проверяет, есть ли обработчик для файла с таким расширением (расширение сжатия, например `.gz`, не учитывается).
+    """
+    return data_suffix(path) in HANDLERS
+
+
+def collect_files(patterns: Iterable[str]) -> List[Path]:
+    """
+    Раскрывает шаблоны, каталоги и пути к файлам в список файлов для обработки.
+
+    Каталоги обходятся рекурсивно, из них берутся только файлы с поддерживаемыми расширениями.
+    Шаблоны раскрываются через `glob` (поддерживается `**`). Повторы отбрасываются.
+
+    Args:
+        patterns (Iterable[str]): Шаблоны, каталоги или пути к файлам.
+
+    Returns:
+        List[Path]: Файлы в порядке перечисления.
+    """
+    files: Dict[Path, None] = {}
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            matches = sorted(p for p in path.rglob('*') if p.is_file() and is_supported(p))
+        elif glob.has_magic(pattern):
+            matches = sorted(Path(p) for p in glob.glob(pattern, recursive=True) if Path(p).is_file())
+        else:
+            matches = [path]
+        files.update(dict.fromkeys(matches))
+    return list(files)
+
+
+def handler_class_for(path: Path) -> Type[DataHandler]:
+    """
+    Возвращает класс обработчика, соответствующий расширению файла.
+
+    Raises:
+        ValueError: Если расширение не поддерживается.
+    """
+    handler_class = HANDLERS.get(data_suffix(path))
+    if handler_class is None:
+        raise ValueError(f"Неподдерживаемый формат файла: {path}")
+    return handler_class
+
+
+def create_handler(path: Path, **options: Any) -> DataHandler:
+    """
+    Создает обработчик, соответствующий расширению файла.
+
+    Args:
+        path (Path): Путь к файлу.
+        **options: Параметры движка суммирования, см. `DataHandler.__init__`.
+
+    Raises:
+        ValueError: Если расширение не поддерживается.
+    """
+    return handler_class_for(path)(path, **options)
+
+
+def cache_namespace(path: Path, **options: Any) -> str:
+    """
+    Возвращает пространство имен кеша для файла — то же, что использует сам обработчик в `DataHandler._cached`.
+    """
+    return create_handler(path, **options)._cache_namespace()
+
+
+def _process_file(path: Path, options: Dict[str, Any]) -> Tuple[SumResult, bool]:
+    try:
+        return create_handler(path, **options).process_data(), True
+    except ValueError as e:
+        logger.error(f"Ошибка при обработке файла {path}: {e}")
+        return SumResult(total=0.0, count=0, incorrect_count=0), False
+    except Exception:
+        logger.exception(f"Непредвиденная ошибка при обработке файла {path}")
+        return SumResult(total=0.0, count=0, incorrect_count=0), False
+
+
+def _process_file_in_child(path: Path, options: Dict[str, Any]) -> Tuple[SumResult, bool, Snapshot]:
+    """
+    Задание для пула процессов: метрики, накопленные в дочернем процессе, возвращаются вместе с результатом,
+    чтобы их можно было объединить в исходном процессе.
+    """
+    result, succeeded = _process_file(path, options)
+    return result, succeeded, metrics.snapshot(reset=True)
+
+
+def process_file(path: Path, options: Dict[str, Any]) -> SumResult:
+    """
+    Обрабатывает один файл.
+
+    Ошибка в одном файле (неподдерживаемый формат, некорректный JSON, непредвиденное исключение обработчика)
+    не прерывает обработку остальных: она записывается в лог, а для файла возвращается нулевой результат.
+    """
+    return _process_file(path, options)[0]
+
+
+def process_files(paths: List[Path], workers: int = 1, executor: str = EXECUTOR_THREAD,
+                  cache: Optional[ResultCache] = None, **options: Any) -> BatchResult:
+    """
+    Обрабатывает файлы в пуле потоков или процессов и объединяет результаты.
+
+    Args:
+        paths (List[Path]): Файлы для обработки.
+        workers (int): Размер пула.
+        executor (str): Тип пула: 'thread' или 'process'.
+        cache (Optional[ResultCache]): Кеш результатов. Проверяется в текущем процессе до отправки файлов в пул,
+            в пул уходят только измененные и новые файлы.
+        **options: Параметры движка суммирования, см. `DataHandler.__init__`.
+
+    Returns:
+        BatchResult: Результаты по файлам, общий результат и время обработки.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Неизвестный тип пула: {executor}. Допустимые значения: {', '.join(EXECUTORS)}.")
+    if workers <= 0:
+        raise ValueError("Размер пула должен быть положительным.")
+
+    start = time.perf_counter()
+    cached: Dict[int, SumResult] = {}
+    fingerprints: Dict[int, Optional[Dict[str, Any]]] = {}
+    if cache is not None:
+        for index, path in enumerate(paths):
+            result = cache.get(path, cache_namespace(path, **options)) if is_supported(path) else None
+            if result is not None:
+                cached[index] = result
+            else:
+                fingerprints[index] = cache.fingerprint(path)
+    pending = [path for index, path in enumerate(paths) if index not in cached]
+
+    if executor == EXECUTOR_PROCESS:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(metrics.enabled,))
+        task = _process_file_in_child
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers)
+        task = _process_file
+    with pool:
+        computed = iter(pool.map(task, pending, repeat(options)))
+        results = []
+        for index, path in enumerate(paths):
+            if index in cached:
+                results.append((path, cached[index]))
+                continue
+            result, succeeded, *snapshot = next(computed)
+            if snapshot:
+                metrics.merge(snapshot[0])
+            if cache is not None and succeeded and fingerprints.get(index) is not None:
+                cache.put(path, cache_namespace(path, **options), result, fingerprints[index])
+            results.append((path, result))
+    seconds = time.perf_counter() - start
+    return BatchResult(results=results, total=merge_results(result for _, result in results), seconds=seconds)
+
+
+def result_path(output_dir: Path, path: Path, suffix: str) -> Path:
+    """
+    Возвращает путь к файлу результатов для входного файла, повторяя его расположение внутри `output_dir`,
+    чтобы одноименные файлы из разных каталогов не перезаписывали друг друга.
+    """
+    try:
+        relative = path.resolve().relative_to(Path.cwd())
+    except ValueError:
+        relative = Path(*path.resolve().parts[1:])
+    return output_dir / relative.parent / f"{relative.name}_results{suffix}"
@@ -0,0 +1,437 @@
+"""
+Набор бенчмарков движков обработки и проверка регрессий производительности.
+
+Генерирует синтетические наборы данных CSV, JSON и NDJSON заданного размера и доли некорректных значений,
+прогоняет на них `process_data`, `CSVDataHandler` и `JSONDataHandler` и выводит в формате JSON
+пропускную способность (значений/с и МБ/с), пиковый RSS и перцентили времени прогона. Каждый бенчмарк
+запускается в отдельном процессе, чтобы пиковые значения RSS не смешивались.
+
+Бенчмарки:
+    process_data  — `data_processor.process_data` на значениях из CSV-файла;
+    csv           — потоковое чтение CSV через `csv.reader` с буфером `--buffer-size`;
+    csv_fast      — разбор числового CSV из mmap (`fast_numeric=True`);
+    csv_parallel  — обработка одного файла диапазонами в `--workers` процессах;
+    csv_gzip, csv_bz2, csv_zstd — потоковая распаковка сжатого CSV в фоновом потоке;
+    csv_gzip_to_disk, csv_bz2_to_disk, csv_zstd_to_disk — распаковка во временный файл и его обработка;
+    json, ndjson  — `JSONDataHandler` на массиве JSON и на NDJSON.
+
+В разделе "speedups" отчета — ускорение относительно опорного бенчмарка того же прогона (`SPEEDUP_REFERENCES`):
+csv_fast и csv_parallel сравниваются с csv (обработкой в одном процессе через `csv.reader`), потоковая
+распаковка — с распаковкой на диск. С `--sizes` бенчмарки повторяются для каждого размера (ключи вида
+"csv@100MB"), что показывает зависимость пикового RSS и пропускной способности от размера входных данных.
+
+Пример:
+    python benchmark.py --size 50 --repeat 5 --output baseline.json
+    python benchmark.py --size 50 --repeat 5 --baseline baseline.json --threshold 0.15
+    python benchmark.py --size 1000 --benchmarks csv,csv_fast,csv_parallel --workers 8
+    python benchmark.py --sizes 10,100,1000 --benchmarks csv --repeat 1
+    python benchmark.py --size 200 --benchmarks csv_gzip,csv_gzip_to_disk,csv_bz2,csv_bz2_to_disk
+    python benchmark.py --size 500 --benchmarks csv,csv_fast --max-rss-mb 64
+"""
+import argparse
+import bz2
+import gzip
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from compressed_io import COMPRESSION_BZ2, COMPRESSION_GZIP, COMPRESSION_ZSTD, open_binary, zstandard
+from csv_data_handler import CSVDataHandler, DEFAULT_BUFFER_SIZE
+from data_handler import ENGINES, ENGINE_PYTHON
+from data_processor import process_data
+from json_data_handler import JSONDataHandler
+
+COMPRESSION_SUFFIXES = {COMPRESSION_GZIP: '.gz', COMPRESSION_BZ2: '.bz2', COMPRESSION_ZSTD: '.zst'}
+COMPRESSIONS = {f'csv_{compression}{mode}': compression
+                for compression in COMPRESSION_SUFFIXES for mode in ('', '_to_disk')}
+BENCHMARKS = ('process_data', 'csv', 'csv_fast', 'csv_parallel', *COMPRESSIONS, 'json', 'ndjson')
+DATASET_SUFFIXES = {'process_data': '.csv', 'csv': '.csv', 'csv_fast': '.csv', 'csv_parallel': '.csv',
+                    'json': '.json', 'ndjson': '.ndjson'}
+DATASET_SUFFIXES.update((name, '.csv' + COMPRESSION_SUFFIXES[compression])
+                        for name, compression in COMPRESSIONS.items())
+SPEEDUP_REFERENCES = {'csv_fast': 'csv', 'csv_parallel': 'csv'}
+SPEEDUP_REFERENCES.update((name, name + '_to_disk') for name in COMPRESSIONS if not name.endswith('_to_disk'))
+DEFAULT_THRESHOLD = 0.10
+DEFAULT_RSS_THRESHOLD = 0.25
+DEFAULT_WORKERS = os.cpu_count() or 1
+ROW_WIDTH = 10
+_BLOCK_ITEMS = 10000
+
+
+def generate_csv(path: Path, size_mb: float, seed: int = 0, invalid_ratio: float = 0.05) -> None:
+    """
+    Генерирует CSV-файл примерно заданного размера из случайных чисел с примесью некорректных значений.
+
+    Args:
+        path (Path): Путь к создаваемому файлу.
+        size_mb (float): Целевой размер файла в мегабайтах.
+        seed (int): Зерно генератора случайных чисел.
+        invalid_ratio (float): Доля некорректных значений.
+    """
+    rng = random.Random(seed)
+    block = "".join(
+        ",".join(f"{rng.uniform(-1000, 1000):.3f}" if rng.random() >= invalid_ratio else "abc"
+                 for _ in range(ROW_WIDTH)) + "\n"
+        for _ in range(1000)
+    )
+    target = size_mb * 1024 * 1024
+    written = 0
+    with path.open('w', newline='') as f:
+        while written < target:
+            f.write(block)
+            written += len(block)
+
+
+def compress(source: Path, target: Path, compression: str) -> None:
+    """
+    Сжимает файл выбранным алгоритмом.
+    """
+    with source.open('rb') as src:
+        if compression == COMPRESSION_GZIP:
+            with gzip.open(target, 'wb', compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst)
+        elif compression == COMPRESSION_BZ2:
+            with bz2.open(target, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+        else:
+            with target.open('wb') as dst:
+                zstandard.ZstdCompressor().copy_stream(src, dst)
+
+
+def _sample_values(rng: random.Random, invalid_ratio: float) -> List[str]:
+    return [f"{rng.uniform(-1000, 1000):.3f}" if rng.random() >= invalid_ratio else rng.choice(('"abc"', 'null'))
+            for _ in range(_BLOCK_ITEMS)]
+
+
+def generate_json(path: Path, size_mb: float, seed: int = 0, invalid_ratio: float = 0.05) -> None:
+    """
+    Генерирует JSON-массив примерно заданного размера из случайных чисел с примесью строк и null.
+
+    Args:
+        path (Path): Путь к создаваемому файлу.
+        size_mb (float): Целевой размер файла в мегабайтах.
+        seed (int): Зерно генератора случайных чисел.
+        invalid_ratio (float): Доля некорректных значений.
+    """
+    rng = random.Random(seed)
+    block = ", ".join(_sample_values(rng, invalid_ratio))
+    target = size_mb * 1024 * 1024
+    written = 0
+    with path.open('w') as f:
+        f.write("[")
+        while written < target:
+            if written:
+                f.write(", ")
+            f.write(block)
+            written += len(block)
+        f.write("]")
+
+
+def generate_ndjson(path: Path, size_mb: float, seed: int = 0, invalid_ratio: float = 0.05) -> None:
+    """
+    Генерирует NDJSON-файл примерно заданного размера: по одному значению на строку.
+
+    Args:
+        path (Path): Путь к создаваемому файлу.
+        size_mb (float): Целевой размер файла в мегабайтах.
+        seed (int): Зерно генератора случайных чисел.
+        invalid_ratio (float): Доля некорректных значений.
+    """
+    rng = random.Random(seed)
+    block = "\n".join(_sample_values(rng, invalid_ratio)) + "\n"
+    target = size_mb * 1024 * 1024
+    written = 0
+    with path.open('w') as f:
+        while written < target:
+            f.write(block)
+            written += len(block)
+
+
+def generate_dataset(name: str, path: Path, size_mb: float, seed: int = 0, invalid_ratio: float = 0.05) -> None:
+    """
+    Генерирует набор данных для бенчмарка `name`.
+    """
+    if name in COMPRESSIONS:
+        source = path.with_suffix('')
+        generate_csv(source, size_mb, seed=seed, invalid_ratio=invalid_ratio)
+        compress(source, path, COMPRESSIONS[name])
+        source.unlink()
+    elif DATASET_SUFFIXES[name] == '.csv':
+        generate_csv(path, size_mb, seed=seed, invalid_ratio=invalid_ratio)
+    elif name == 'json':
+        generate_json(path, size_mb, seed=seed, invalid_ratio=invalid_ratio)
+    else:
+        generate_ndjson(path, size_mb, seed=seed, invalid_ratio=invalid_ratio)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Перцентиль по методу ближайшего ранга.
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def _load_items(path: Path) -> List[Any]:
+    items: List[Any] = []
+    with path.open('r') as f:
+        for line in f:
+            for cell in line.rstrip("\n").split(","):
+                try:
+                    items.append(float(cell))
+                except ValueError:
+                    items.append(cell)
+    return items
+
+
+def _decompress_and_process(path: Path, compression: str, engine: str, buffer_size: int) -> Any:
+    """
+    Распаковывает файл во временный файл рядом с ним и обрабатывает распакованный файл.
+    """
+    target = path.with_name(path.name + '.decompressed.csv')
+    try:
+        with open_binary(path, compression) as src, target.open('wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        return CSVDataHandler(target, engine=engine, buffer_size=buffer_size).process_data()
+    finally:
+        target.unlink(missing_ok=True)
+
+
+def is_available(name: str) -> bool:
+    """
+    Проверяет, можно ли выполнить бенчмарк (для zstd нужен пакет zstandard).
+    """
+    return COMPRESSIONS.get(name) != COMPRESSION_ZSTD or zstandard is not None
+
+
+def run_benchmark(name: str, path: Path, repeat: int, engine: str = ENGINE_PYTHON,
+                  workers: int = DEFAULT_WORKERS, buffer_size: int = DEFAULT_BUFFER_SIZE) -> Dict[str, Any]:
+    """
+    Выполняет бенчмарк `repeat` раз в текущем процессе и возвращает метрики.
+
+    Args:
+        name (str): Имя бенчмарка из `BENCHMARKS`.
+        path (Path): Набор данных, созданный `generate_dataset`.
+        repeat (int): Количество прогонов.
+        engine (str): Движок суммирования обработчиков.
+        workers (int): Количество процессов бенчмарка csv_parallel.
+        buffer_size (int): Размер буфера чтения CSV-файлов в байтах.
+
+    Returns:
+        Dict[str, Any]: Количество значений, размер данных, пропускная способность по медианному времени,
+        перцентили времени прогона и пиковый RSS процесса.
+    """
+    if name == 'process_data':
+        items = _load_items(path)
+        size_bytes = None
+        run: Callable[[], Any] = lambda: process_data(items)[0]
+    elif name in ('json', 'ndjson'):
+        size_bytes = path.stat().st_size
+        run = lambda: JSONDataHandler(path, engine=engine).process_data()
+    elif name.endswith('_to_disk'):
+        size_bytes = path.stat().st_size
+        run = lambda: _decompress_and_process(path, COMPRESSIONS[name], engine, buffer_size)
+    else:
+        size_bytes = path.stat().st_size
+        options: Dict[str, Any] = {'buffer_size': buffer_size}
+        if name == 'csv_fast':
+            options['fast_numeric'] = True
+        elif name == 'csv_parallel':
+            options['workers'] = workers
+        run = lambda: CSVDataHandler(path, engine=engine, **options).process_data()
+
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        durations.append(time.perf_counter() - start)
+
+    count = result.count + result.incorrect_count
+    median = statistics.median(durations)
+    return {
+        "items": count,
+        "bytes": size_bytes,
+        "items_per_second": count / median,
+        "mb_per_second": size_bytes / median / (1024 * 1024) if size_bytes is not None else None,
+        "latency_seconds": {"p50": percentile(durations, 0.5), "p95": percentile(durations, 0.95),
+                            "p99": percentile(durations, 0.99)},
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(name: str, path: Path, repeat: int, engine: str, workers: int = DEFAULT_WORKERS,
+            buffer_size: int = DEFAULT_BUFFER_SIZE) -> Dict[str, Any]:
+    """
+    Запускает бенчмарк в дочернем процессе и возвращает его метрики.
+    """
+    output = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), '--worker', name, str(path),
+         '--repeat', str(repeat), '--engine', engine, '--workers', str(workers), '--buffer-size', str(buffer_size)],
+        cwd=Path(__file__).resolve().parent, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def speedups(benchmarks: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Вычисляет ускорение бенчмарков относительно опорных (`SPEEDUP_REFERENCES`), выполненных в том же прогоне
+    на данных того же размера.
+
+    Args:
+        benchmarks (Dict[str, Any]): Результаты бенчмарков (ключ "benchmarks" отчета).
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Для каждого бенчмарка, чей опорный бенчмарк тоже выполнялся, —
+        имя опорного бенчмарка и отношение пропускной способности.
+    """
+    result = {}
+    for key, current in benchmarks.items():
+        name, separator, size = key.partition('@')
+        reference_name = SPEEDUP_REFERENCES.get(name)
+        reference = benchmarks.get(f"{reference_name}{separator}{size}") if reference_name is not None else None
+        if reference is None:
+            continue
+        result[key] = {"reference": f"{reference_name}{separator}{size}",
+                       "ratio": current["items_per_second"] / reference["items_per_second"]}
+    return result
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD,
+            rss_threshold: float = DEFAULT_RSS_THRESHOLD) -> List[str]:
+    """
+    Сравнивает пропускную способность и пиковый RSS с эталонным прогоном.
+
+    Args:
+        results (Dict[str, Any]): Результаты текущего прогона (ключ "benchmarks").
+        baseline (Dict[str, Any]): Эталонные результаты в том же формате.
+        threshold (float): Допустимое относительное снижение пропускной способности.
+        rss_threshold (float): Допустимый относительный рост пикового RSS.
+
+    Returns:
+        List[str]: Описания регрессий; пустой список, если регрессий нет.
+    """
+    regressions = []
+    for name, current in results["benchmarks"].items():
+        reference = baseline["benchmarks"].get(name)
+        if reference is None:
+            continue
+        ratio = current["items_per_second"] / reference["items_per_second"]
+        if ratio < 1 - threshold:
+            regressions.append(f"{name}: {current['items_per_second']:.0f} значений/с против "
+                               f"{reference['items_per_second']:.0f} в эталоне ({(1 - ratio) * 100:.1f}% медленнее)")
+        peak, reference_peak = current.get("peak_rss_mb"), reference.get("peak_rss_mb")
+        if peak is not None and reference_peak and peak > reference_peak * (1 + rss_threshold):
+            regressions.append(f"{name}: пиковый RSS {peak:.1f} МБ против {reference_peak:.1f} МБ в эталоне")
+    return regressions
+
+
+def check_peak_rss(results: Dict[str, Any], max_rss_mb: float) -> List[str]:
+    """
+    Проверяет, что пиковый RSS ни одного бенчмарка не превышает `max_rss_mb` (например, что потоковые режимы
+    не держат в памяти весь файл).
+
+    Returns:
+        List[str]: Описания превышений; пустой список, если превышений нет.
+    """
+    return [f"{name}: пиковый RSS {current['peak_rss_mb']:.1f} МБ больше {max_rss_mb:g} МБ"
+            for name, current in results["benchmarks"].items()
+            if current.get("peak_rss_mb") is not None and current["peak_rss_mb"] > max_rss_mb]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS), help="Бенчмарки через запятую.")
+    parser.add_argument("--size", type=float, default=10, help="Размер набора данных в МБ.")
+    parser.add_argument("--sizes", default=None,
+                        help="Размеры наборов данных в МБ через запятую: бенчмарки повторяются для каждого размера.")
+    parser.add_argument("--invalid-ratio", type=float, default=0.05, help="Доля некорректных значений.")
+    parser.add_argument("--repeat", type=int, default=5, help="Количество прогонов каждого бенчмарка.")
+    parser.add_argument("--engine", choices=ENGINES, default=ENGINE_PYTHON, help="Движок суммирования обработчиков.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Количество процессов бенчмарка csv_parallel.")
+    parser.add_argument("--buffer-size", type=int, default=DEFAULT_BUFFER_SIZE,
+                        help="Размер буфера чтения CSV-файлов в байтах.")
+    parser.add_argument("--seed", type=int, default=0, help="Зерно генератора данных.")
+    parser.add_argument("--output", type=Path, default=None, help="Файл для записи результатов в формате JSON.")
+    parser.add_argument("--baseline", type=Path, default=None, help="Эталонные результаты для сравнения.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Допустимое относительное снижение пропускной способности.")
+    parser.add_argument("--rss-threshold", type=float, default=DEFAULT_RSS_THRESHOLD,
+                        help="Допустимый относительный рост пикового RSS по сравнению с эталоном.")
+    parser.add_argument("--max-rss-mb", type=float, default=None,
+                        help="Максимальный пиковый RSS бенчмарка в МБ (проверяется и без эталона).")
+    parser.add_argument("--workdir", type=Path, default=None, help="Каталог для временных файлов.")
+    parser.add_argument("--worker", nargs=2, metavar=("NAME", "PATH"), default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker is not None:
+        name, path = args.worker
+        print(json.dumps(run_benchmark(name, Path(path), args.repeat, args.engine, args.workers, args.buffer_size)))
+        return 0
+
+    names = args.benchmarks.split(",")
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"неизвестные бенчмарки: {', '.join(sorted(unknown))}")
+    sizes = [float(size) for size in args.sizes.split(",")] if args.sizes else [args.size]
+
+    results: Dict[str, Any] = {
+        "parameters": {"size_mb": sizes if args.sizes else args.size, "invalid_ratio": args.invalid_ratio,
+                       "repeat": args.repeat, "engine": args.engine, "workers": args.workers,
+                       "buffer_size": args.buffer_size, "seed": args.seed},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpu_count": os.cpu_count()},
+        "benchmarks": {},
+    }
+    with tempfile.TemporaryDirectory(dir=args.workdir) as tmp:
+        for size_mb in sizes:
+            for name in names:
+                if not is_available(name):
+                    print(f"Бенчмарк {name} пропущен: пакет zstandard не установлен.", file=sys.stderr)
+                    continue
+                path = Path(tmp) / f"{name}{DATASET_SUFFIXES[name]}"
+                generate_dataset(name, path, size_mb, seed=args.seed, invalid_ratio=args.invalid_ratio)
+                key = f"{name}@{size_mb:g}MB" if args.sizes else name
+                results["benchmarks"][key] = measure(name, path, args.repeat, args.engine, args.workers,
+                                                     args.buffer_size)
+                path.unlink()
+    results["speedups"] = speedups(results["benchmarks"])
+
+    report = json.dumps(results, ensure_ascii=False, indent=4)
+    if args.output is not None:
+        args.output.write_text(report, encoding='utf-8')
+    print(report)
+    for key, speedup in results["speedups"].items():
+        print(f"{key}: ускорение {speedup['ratio']:.2f}x относительно {speedup['reference']}", file=sys.stderr)
+
+    regressions = []
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        regressions.extend(compare(results, baseline, args.threshold, args.rss_threshold))
+    if args.max_rss_mb is not None:
+        regressions.extend(check_peak_rss(results, args.max_rss_mb))
+    for regression in regressions:
+        print(f"Регрессия: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+import logging
+import mmap
+import operator
+import sys
+from array import array
+from functools import reduce
+from pathlib import Path
+from typing import TYPE_CHECKING, Union, Optional
+from columnar_writer import HEADER, MAGIC, PARQUET_COLUMN, PARQUET_SUFFIX, load_pyarrow
+from data_handler import DataHandler, SumResult, ENGINE_NUMPY
+from data_processor import parse_value
+from numpy_engine import load_numpy
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ColumnarDataHandler(DataHandler):
+    """
+    Обработчик данных, считывающий значения, ранее записанные `columnar_writer` в формат `.dscol` или Parquet.
+
+    Файл `.dscol` отображается в память, и массив значений суммируется без разбора текста и без копирования:
+    с движком 'numpy' — через `np.sum`, иначе — циклом по `memoryview`. Parquet-файлы читаются через pyarrow
+    по группам строк.
+
+    Некорректные значения учитываются в `invalid_values` по позициям из битовой карты (или null в Parquet).
+    Исходный текст некорректного значения в колоночный формат не записывается, поэтому все они попадают
+    в категорию None, а в примерах вместо текста стоит None.
+    """
+    def __init__(self, file_path: Path, **kwargs) -> None:
+        """
+        Args:
+            file_path (Path): Путь к файлу `.dscol` или `.parquet`.
+            **kwargs: Параметры движка суммирования, см. `DataHandler.__init__`.
+        """
+        super().__init__(**kwargs)
+        self.file_path = file_path
+
+    def process_data(self) -> SumResult:
+        """
+        Обрабатывает данные из колоночного файла и возвращает результат суммирования.
+
+        Returns:
+            SumResult: Результат суммирования.
+
+        Raises:
+            ValueError: Если файл поврежден или не является файлом `.dscol`.
+        """
+        try:
+            result = self._cached(self.file_path, self._process_file)
+        except (IOError, OSError) as e:
+            logger.error(f"Ошибка при обработке файла: {e}")
+            return SumResult(total=0.0, count=0, incorrect_count=0)
+        self.log_invalid_values(self.file_path)
+        return result
+
+    def _process_file(self) -> SumResult:
+        if self.file_path.suffix.lower() == PARQUET_SUFFIX:
+            return self._process_parquet()
+        with self.file_path.open('rb') as f:
+            if f.seek(0, 2) == 0:
+                raise ValueError(f"Пустой файл вместо колоночного формата: {self.file_path}")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return self.process_buffer(mm)
+
+    def process_buffer(self, buffer: Union[bytes, mmap.mmap]) -> SumResult:
+        """
+        Суммирует значения из содержимого файла `.dscol` (отображенного в память или прочитанного заранее).
+
+        Args:
+            buffer (Union[bytes, mmap.mmap]): Содержимое файла.
+
+        Returns:
+            SumResult: Результат суммирования.
+
+        Raises:
+            ValueError: Если содержимое повреждено или не является файлом `.dscol`.
+        """
+        if len(buffer) < HEADER.size:
+            raise ValueError("Файл слишком короткий для колоночного формата.")
+        magic, length, incorrect_count = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError("Неизвестная сигнатура колоночного формата.")
+        values_end = HEADER.size + 8 * length
+        if len(buffer) != values_end + (length + 7) // 8:
+            raise ValueError("Размер файла не соответствует заголовку колоночного формата.")
+
+        if self.engine == ENGINE_NUMPY:
+            np = load_numpy()
+            values = np.frombuffer(buffer, dtype='<f8', count=length, offset=HEADER.size)
+            try:
+                total_sum = float(np.sum(values))
+                if self.sketches is not None:
+                    self.sketches.update(self._valid(values, buffer, values_end, length).tolist())
+            finally:
+                del values  # массив ссылается на отображение, его нужно освободить до закрытия mmap
+        else:
+            with memoryview(buffer) as view:
+                with view[HEADER.size:values_end] as raw:
+                    if sys.byteorder == 'little':
+                        with raw.cast('d') as values:
+                            total_sum = reduce(operator.add, values, 0.0)
+                            self._update_sketches(values, buffer, values_end, length)
+                    else:
+                        values = array('d', raw)
+                        values.byteswap()
+                        total_sum = reduce(operator.add, values, 0.0)
+                        self._update_sketches(values, buffer, values_end, length)
+
+        if incorrect_count and self.invalid_values is not None:
+            self._add_invalid(buffer, values_end, length)
+        return SumResult(total=total_sum, count=length - incorrect_count, incorrect_count=incorrect_count)
+
+    @staticmethod
+    def _valid(values: "np.ndarray", buffer: Union[bytes, mmap.mmap], values_end: int,
+               length: int) -> "np.ndarray":
+        np = load_numpy()
+        bitmap = np.frombuffer(buffer, dtype=np.uint8, offset=values_end)
+        invalid = np.unpackbits(bitmap, count=length, bitorder='little').astype(bool)
+        return values[~invalid]
+
+    def _update_sketches(self, values, buffer: Union[bytes, mmap.mmap], values_end: int, length: int) -> None:
+        if self.sketches is None:
+            return
+        for position in range(length):
+            if not buffer[values_end + position // 8] >> (position % 8) & 1:
+                self.sketches.add(values[position])
+
+    def _add_invalid(self, buffer: Union[bytes, mmap.mmap], values_end: int, length: int) -> None:
+        """
+        Учитывает в `invalid_values` позиции, отмеченные в битовой карте; нулевые байты карты пропускаются.
+        """
+        for index, byte in enumerate(buffer[values_end:values_end + (length + 7) // 8]):
+            if byte:
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        self.invalid_values.add(None, index * 8 + bit)
+
+    def _process_parquet(self) -> SumResult:
+        """
+        Суммирует колонку `value` Parquet-файла по группам строк; null считаются некорректными значениями.
+        """
+        pa = load_pyarrow()
+        if pa is None:
+            raise ValueError("Для чтения формата Parquet требуется pyarrow.")
+        total_sum = 0.0
+        count = 0
+        incorrect_count = 0
+        parquet_file = pa.parquet.ParquetFile(str(self.file_path), memory_map=True)
+        for index in range(parquet_file.num_row_groups):
+            column = parquet_file.read_row_group(index, columns=[PARQUET_COLUMN]).column(PARQUET_COLUMN)
+            total_sum += pa.compute.sum(column).as_py() or 0.0
+            if column.null_count and self.invalid_values is not None:
+                offset = count + incorrect_count
+                for position, is_null in enumerate(column.is_null().to_pylist()):
+                    if is_null:
+                        self.invalid_values.add(None, offset + position)
+            count += len(column) - column.null_count
+            incorrect_count += column.null_count
+            if self.sketches is not None:
+                self.sketches.update(column.drop_null().to_pylist())
+        return SumResult(total=total_sum, count=count, incorrect_count=incorrect_count)
+
+    def _process_item(self, item: Union[int, float, str]) -> Optional[float]:
+        return parse_value(item)
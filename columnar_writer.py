@@ -0,0 +1,174 @@
+"""
+Запись разобранных значений в колоночный двоичный формат, чтобы повторная агрегация не требовала разбора текста.
+
+Формат `.dscol` (все числа little-endian):
+    - заголовок: сигнатура `MAGIC` (8 байт), количество позиций и количество некорректных значений (uint64);
+    - массив float64 по одному значению на позицию, на месте некорректных значений записан 0.0;
+    - битовая карта некорректных позиций: бит i (младший бит первого байта — позиция 0) установлен,
+      если значение в позиции i некорректно.
+
+Массив значений начинается со смещения `HEADER.size` (кратного 8), поэтому файл можно отобразить в память
+и суммировать без копирования, см. `ColumnarDataHandler`. Если установлен pyarrow, значения можно записать
+и в Parquet: одна колонка `value`, некорректные значения записываются как null.
+
+Пример:
+    python columnar_writer.py data.csv --output data.dscol
+"""
+import argparse
+import importlib.util
+import logging
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from types import ModuleType
+from typing import Iterable, Optional
+from compressed_io import data_suffix
+from csv_data_handler import CSVDataHandler
+from data_handler import SumResult
+from json_data_handler import JSONDataHandler
+from logger_config import setup_logger
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'DSCOL\x00\x01\x00'
+HEADER = struct.Struct('<8sQQ')
+COLUMNAR_SUFFIX = '.dscol'
+PARQUET_SUFFIX = '.parquet'
+PARQUET_COLUMN = 'value'
+DEFAULT_BLOCK_SIZE = 64 * 1024
+
+
+@lru_cache(maxsize=None)
+def load_pyarrow() -> Optional[ModuleType]:
+    """
+    Импортирует pyarrow (вместе с `pyarrow.parquet` и `pyarrow.compute`) при первом вызове: pyarrow загружает
+    NumPy, поэтому запуск без Parquet-файлов не тратит время на их импорт.
+
+    Returns:
+        Optional[ModuleType]: Модуль pyarrow или None, если он не установлен.
+    """
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError:  # pragma: no cover - зависит от окружения
+        return None
+    return pyarrow
+
+
+def parquet_available() -> bool:
+    """
+    Проверяет, установлен ли pyarrow (без его импорта).
+    """
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def write_columnar(file_path: Path, values: Iterable[Optional[float]],
+                   block_size: int = DEFAULT_BLOCK_SIZE) -> SumResult:
+    """
+    Записывает значения в файл формата `.dscol`, попутно суммируя их.
+
+    Args:
+        file_path (Path): Путь к создаваемому файлу.
+        values (Iterable[Optional[float]]): Значения по порядку, None — некорректное значение.
+        block_size (int): Количество значений, записываемых за один раз.
+
+    Returns:
+        SumResult: Результат суммирования записанных значений.
+    """
+    total_sum = 0.0
+    count = 0
+    incorrect_count = 0
+    bitmap = bytearray()
+    block = array('d')
+    with file_path.open('wb') as f:
+        f.write(HEADER.pack(MAGIC, 0, 0))
+        for value in values:
+            position = count + incorrect_count
+            if position % 8 == 0:
+                bitmap.append(0)
+            if value is None:
+                bitmap[-1] |= 1 << (position % 8)
+                incorrect_count += 1
+                block.append(0.0)
+            else:
+                total_sum += value
+                count += 1
+                block.append(value)
+            if len(block) >= block_size:
+                _write_block(f, block)
+                block = array('d')
+        _write_block(f, block)
+        f.write(bitmap)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, count + incorrect_count, incorrect_count))
+    return SumResult(total=total_sum, count=count, incorrect_count=incorrect_count)
+
+
+def _write_block(f, block: array) -> None:
+    if sys.byteorder == 'big':
+        block.byteswap()
+    block.tofile(f)
+
+
+def write_parquet(file_path: Path, values: Iterable[Optional[float]],
+                  block_size: int = DEFAULT_BLOCK_SIZE) -> SumResult:
+    """
+    Записывает значения в Parquet-файл (колонка `value`, некорректные значения — null), попутно суммируя их.
+
+    Args:
+        file_path (Path): Путь к создаваемому файлу.
+        values (Iterable[Optional[float]]): Значения по порядку, None — некорректное значение.
+        block_size (int): Количество значений в одной группе строк.
+
+    Returns:
+        SumResult: Результат суммирования записанных значений.
+
+    Raises:
+        ImportError: Если pyarrow не установлен.
+    """
+    pa = load_pyarrow()
+    if pa is None:
+        raise ImportError("Для записи в формат Parquet требуется pyarrow.")
+    total_sum = 0.0
+    count = 0
+    incorrect_count = 0
+    schema = pa.schema([(PARQUET_COLUMN, pa.float64())])
+    block = []
+    with pa.parquet.ParquetWriter(str(file_path), schema) as writer:
+        for value in values:
+            if value is None:
+                incorrect_count += 1
+            else:
+                total_sum += value
+                count += 1
+            block.append(value)
+            if len(block) >= block_size:
+                writer.write_table(pa.table({PARQUET_COLUMN: pa.array(block, type=pa.float64())}, schema=schema))
+                block = []
+        if block:
+            writer.write_table(pa.table({PARQUET_COLUMN: pa.array(block, type=pa.float64())}, schema=schema))
+    return SumResult(total=total_sum, count=count, incorrect_count=incorrect_count)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', type=Path, help="CSV-, JSON- или NDJSON-файл.")
+    parser.add_argument('--output', type=Path, required=True, help="Файл результата (.dscol или .parquet).")
+    args = parser.parse_args()
+
+    setup_logger('logging_config.yaml')
+    if data_suffix(args.input) == '.csv':
+        handler = CSVDataHandler(args.input)
+    else:
+        handler = JSONDataHandler(args.input)
+    writer = write_parquet if args.output.suffix.lower() == PARQUET_SUFFIX else write_columnar
+    sum_result = writer(args.output, handler.iter_values())
+    logger.info(f"Записано значений: {sum_result.count + sum_result.incorrect_count} "
+                f"(некорректных: {sum_result.incorrect_count}) в файл {args.output}")
+
+
+if __name__ == "__main__":
+    main()
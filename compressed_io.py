@@ -0,0 +1,220 @@
+"""
+Прозрачное чтение сжатых входных файлов (gzip, bzip2, zstd) без распаковки на диск.
+
+Сжатие определяется по сигнатуре в начале файла, а для пустых или нестандартных файлов — по расширению.
+Распаковка выполняется в фоновом потоке, который складывает распакованные порции в ограниченную очередь:
+пока обработчик разбирает одну порцию, следующая уже распаковывается (zlib, bz2 и zstd отпускают GIL на время
+распаковки). gzip-файлы из нескольких членов и zstd-файлы из нескольких кадров читаются целиком.
+
+zstd — необязательная зависимость: требуется пакет `zstandard`.
+"""
+import bz2
+import gzip
+import io
+import locale
+import queue
+import threading
+from pathlib import Path
+from typing import BinaryIO, IO, Optional, Union
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - зависит от окружения
+    zstandard = None
+
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_BZ2 = 'bz2'
+COMPRESSION_ZSTD = 'zstd'
+
+COMPRESSION_SUFFIXES = {'.gz': COMPRESSION_GZIP, '.bz2': COMPRESSION_BZ2, '.zst': COMPRESSION_ZSTD}
+# Сигнатура bzip2 — 'BZh' и размер блока от '1' до '9': с одного 'BZh' может начинаться и обычный текст
+_MAGIC = ((b'\x1f\x8b', COMPRESSION_GZIP), *((b'BZh' + bytes([level]), COMPRESSION_BZ2) for level in b'123456789'),
+          (b'\x28\xb5\x2f\xfd', COMPRESSION_ZSTD))
+
+DEFAULT_DECOMPRESS_CHUNK_SIZE = 1024 * 1024
+DEFAULT_QUEUE_SIZE = 4
+
+
+class DecompressionError(ValueError):
+    """
+    Сжатый файл поврежден или обрезан. Наследуется от ValueError, как и ошибки разбора данных: такой файл
+    считается необработанным и не попадает в кеш результатов.
+    """
+
+
+def compression_from_suffix(file_path: Path) -> Optional[str]:
+    """
+    Определяет сжатие по расширению файла.
+    """
+    return COMPRESSION_SUFFIXES.get(file_path.suffix.lower())
+
+
+def data_suffix(file_path: Path) -> str:
+    """
+    Возвращает расширение данных без расширения сжатия: `data.csv.gz` -> `.csv`.
+    """
+    if compression_from_suffix(file_path) is not None:
+        file_path = file_path.with_suffix('')
+    return file_path.suffix.lower()
+
+
+def _compression_from_magic(header: bytes) -> Optional[str]:
+    for magic, compression in _MAGIC:
+        if header.startswith(magic):
+            return compression
+    return None
+
+
+def detect_compression(file_path: Path) -> Optional[str]:
+    """
+    Определяет сжатие файла по сигнатуре, а если сигнатура не распознана — по расширению.
+
+    Returns:
+        Optional[str]: 'gzip', 'bz2', 'zstd' или None для несжатого файла.
+    """
+    with file_path.open('rb') as f:
+        header = f.read(4)
+    return _compression_from_magic(header) or (compression_from_suffix(file_path) if header else None)
+
+
+def _open_decompressed(source: Union[Path, BinaryIO], compression: str) -> BinaryIO:
+    if compression == COMPRESSION_GZIP:
+        return gzip.open(source, 'rb')
+    if compression == COMPRESSION_BZ2:
+        return bz2.open(source, 'rb')
+    if zstandard is None:
+        raise ValueError(f"Для чтения zstd-данных {source} требуется пакет zstandard.")
+    raw = source.open('rb') if isinstance(source, Path) else source
+    return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+
+
+def open_binary(file_path: Path, compression: Optional[str] = None) -> BinaryIO:
+    """
+    Открывает файл в двоичном режиме, распаковывая его на лету (в текущем потоке, без фонового чтения).
+
+    Args:
+        file_path (Path): Путь к файлу.
+        compression (Optional[str]): Сжатие файла; по умолчанию определяется через `detect_compression`.
+
+    Returns:
+        BinaryIO: Поток распакованных байтов.
+    """
+    compression = compression or detect_compression(file_path)
+    if compression is None:
+        return file_path.open('rb')
+    return _open_decompressed(file_path, compression)
+
+
+class BackgroundReader(io.RawIOBase):
+    """
+    Двоичный поток, который читает источник в фоновом потоке порциями через ограниченную очередь.
+    """
+    def __init__(self, source: BinaryIO, chunk_size: int = DEFAULT_DECOMPRESS_CHUNK_SIZE,
+                 queue_size: int = DEFAULT_QUEUE_SIZE) -> None:
+        """
+        Args:
+            source (BinaryIO): Источник (например, поток распаковки). Закрывается вместе с этим потоком.
+            chunk_size (int): Размер порции чтения в байтах.
+            queue_size (int): Максимальное количество прочитанных, но еще не разобранных порций.
+        """
+        super().__init__()
+        self._source = source
+        self._chunk_size = chunk_size
+        self._queue: "queue.Queue[Union[bytes, BaseException, None]]" = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._pending = memoryview(b'')
+        self._eof = False
+        self._thread = threading.Thread(target=self._run, name='datastats-decompress', daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                chunk = self._source.read(self._chunk_size)
+                if not chunk:
+                    break
+                self._put(chunk)
+        except OSError as e:  # ошибка передается читающему потоку
+            # Ошибки чтения с диска (с errno) передаются как есть, а ошибки формата (BadGzipFile, bz2) — как
+            # DecompressionError
+            self._put(e if e.errno is not None else DecompressionError(f"Ошибка распаковки: {e}"))
+        except Exception as e:
+            self._put(DecompressionError(f"Ошибка распаковки: {e}"))
+        self._put(None)
+
+    def _put(self, item: Union[bytes, BaseException, None]) -> None:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self._pending:
+            if self._eof:
+                return 0
+            item = self._queue.get()
+            if item is None or isinstance(item, BaseException):
+                self._eof = True
+                if item is not None:
+                    raise item
+                return 0
+            self._pending = memoryview(item)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._source.close()
+        super().close()
+
+
+def open_input(file_path: Path, buffering: int = -1, newline: Optional[str] = None) -> IO[str]:
+    """
+    Открывает входной файл в текстовом режиме, при необходимости распаковывая его на лету в фоновом потоке.
+
+    Args:
+        file_path (Path): Путь к файлу.
+        buffering (int): Размер буфера чтения, как у `open`.
+        newline (Optional[str]): Режим перевода строк, как у `open`.
+
+    Returns:
+        IO[str]: Текстовый поток.
+    """
+    compression = detect_compression(file_path)
+    if compression is None:
+        return file_path.open('r', buffering=buffering, newline=newline)
+    return _open_decompressed_text(file_path, compression, buffering, newline)
+
+
+def open_payload(data: bytes, newline: Optional[str] = None) -> IO[str]:
+    """
+    Открывает содержимое файла, прочитанное заранее, в текстовом режиме. Сжатые данные распаковываются на лету
+    порциями, поэтому ни распакованные байты, ни декодированный текст не хранятся в памяти целиком.
+
+    Args:
+        data (bytes): Содержимое файла; сжатие определяется по сигнатуре.
+        newline (Optional[str]): Режим перевода строк, как у `open`.
+
+    Returns:
+        IO[str]: Текстовый поток.
+    """
+    compression = _compression_from_magic(data[:4])
+    if compression is None:
+        return io.TextIOWrapper(io.BytesIO(data), encoding=locale.getpreferredencoding(False), newline=newline)
+    return _open_decompressed_text(io.BytesIO(data), compression, -1, newline)
+
+
+def _open_decompressed_text(source: Union[Path, BinaryIO], compression: str, buffering: int,
+                            newline: Optional[str]) -> IO[str]:
+    binary = io.BufferedReader(BackgroundReader(_open_decompressed(source, compression)),
+                               buffer_size=buffering if buffering > 0 else io.DEFAULT_BUFFER_SIZE)
+    return io.TextIOWrapper(binary, encoding=locale.getpreferredencoding(False), newline=newline)
@@ -1,17 +1,107 @@
 import csv
+import io
+import locale
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from itertools import chain, repeat
 from pathlib import Path
-from typing import Iterable, Union, Optional
-from data_handler import DataHandler, SumResult
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, TextIO, Tuple, Union, Optional
+from compressed_io import detect_compression, open_input
+from data_handler import DataHandler, SumResult, merge_results
+from data_processor import parse_value
+from group_aggregator import DEFAULT_MAX_GROUPS, GroupAggregator
+from instrumentation import STAGE_OPEN, metrics
+from mmap_tokenizer import DEFAULT_BLOCK_SIZE, iter_blocks, open_mmap, sum_numeric_block
+from invalid_values import InvalidValueReport
+from sketches import Sketches
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_BUFFER_SIZE = io.DEFAULT_BUFFER_SIZE
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
+
+
 class CSVDataHandler(DataHandler):
     """
     Обработчик данных, считывающий данные из CSV-файла.
+
+    Файл читается потоково: ячейки передаются в `_process_data` по одной через генератор,
+    поэтому потребление памяти не зависит от размера файла.
+
+    При `workers > 1` файл делится на диапазоны байтов около `chunk_size`, выровненные по границам строк,
+    и диапазоны обрабатываются параллельно в пуле процессов. Частичные результаты объединяются
+    через `merge_results`. Параллельный режим предполагает, что поля не содержат переводов строк в кавычках.
+
+    При `fast_numeric=True` файл отображается в память и числа разбираются прямо из байтов блоками
+    по `block_size` (см. `mmap_tokenizer`), минуя декодирование и `csv.reader`; блоки с кавычками разбираются
+    обычным путем. В параллельном режиме так же, блоками, разбирается каждый диапазон.
+    Быстрый путь не используется, если заданы скетчи.
+
+    Сжатые файлы (gzip, bzip2, zstd) распаковываются на лету, см. `compressed_io.open_input`; они всегда
+    обрабатываются последовательно, так как по сжатому файлу нельзя перемещаться по смещениям.
+
+    Табличный режим (`header`, `columns`, `group_by`) учитывает только выбранные колонки, а `aggregate()`
+    считает результаты по каждой колонке и группе за один проход. В табличном режиме файл всегда
+    обрабатывается последовательно (без `workers` и `fast_numeric`).
     """
-    def __init__(self, file_path: Path) -> None:
+    def __init__(self, file_path: Path, buffer_size: int = DEFAULT_BUFFER_SIZE, workers: int = 1,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, fast_numeric: bool = False,
+                 block_size: int = DEFAULT_BLOCK_SIZE, header: bool = False,
+                 columns: Optional[Sequence[Union[str, int]]] = None, group_by: Optional[Union[str, int]] = None,
+                 **kwargs) -> None:
+        """
+        Args:
+            file_path (Path): Путь к CSV-файлу.
+            buffer_size (int): Размер буфера чтения файла в байтах.
+            workers (int): Количество процессов; 1 — обработка в текущем процессе.
+            chunk_size (int): Примерный размер диапазона байтов для одного задания в параллельном режиме.
+            fast_numeric (bool): Разбирать числа прямо из байтов отображенного в память файла.
+            block_size (int): Примерный размер блока в режиме `fast_numeric`; от него зависит память на разбор.
+            header (bool): Первая строка файла — заголовок с именами колонок.
+            columns (Optional[Sequence[Union[str, int]]]): Колонки со значениями (имена или номера с нуля);
+                по умолчанию все, кроме колонки группировки.
+            group_by (Optional[Union[str, int]]): Колонка группировки для `aggregate()`.
+            **kwargs: Параметры движка суммирования, см. `DataHandler.__init__`.
+        """
+        super().__init__(**kwargs)
+        if buffer_size <= 0:
+            raise ValueError("Размер буфера чтения должен быть положительным.")
+        if workers <= 0:
+            raise ValueError("Количество процессов должно быть положительным.")
+        if chunk_size <= 0 or block_size <= 0:
+            raise ValueError("Размеры диапазона и блока должны быть положительными.")
         self.file_path = file_path
+        self.buffer_size = buffer_size
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.fast_numeric = fast_numeric
+        self.block_size = block_size
+        self.header = header
+        self.columns = list(columns) if columns is not None else None
+        self.group_by = group_by
+        named = [column for column in (self.columns or []) + [group_by] if isinstance(column, str)]
+        if named and not header:
+            raise ValueError("Колонки можно выбирать по имени только в файле с заголовком (header=True).")
+
+    @property
+    def tabular(self) -> bool:
+        return self.header or self.columns is not None or self.group_by is not None
+
+    def _cache_namespace(self) -> str:
+        """
+        Кроме настроек табличного режима, в пространство имен входят `fast_numeric` (другой путь разбора)
+        и `chunk_size` при `workers > 1`: частичные суммы диапазонов складываются в другом порядке, и сумма
+        может отличаться в последних разрядах. Табличный режим эти параметры не использует.
+        """
+        namespace = super()._cache_namespace()
+        if self.tabular:
+            return f"{namespace}[header={self.header},columns={self.columns},group_by={self.group_by}]"
+        if self.fast_numeric:
+            namespace += "[fast_numeric=True]"
+        if self.workers > 1:
+            namespace += f"[chunk_size={self.chunk_size}]"
+        return namespace
 
     def process_data(self) -> SumResult:
         """
@@ -19,19 +109,237 @@ class CSVDataHandler(DataHandler):
 
         Returns:
             SumResult: Результат суммирования.
+
+        Raises:
+            ValueError: Если файл является поврежденным архивом (`compressed_io.DecompressionError`).
         """
 
         try:
-            with self.file_path.open('r') as f:
-                reader = csv.reader(f)
-                data = [item for row in reader for item in row]  # Преобразуем строки в плоский списоk
-                return self._process_data(data)  # Используем общий метод
+            result = self._cached(self.file_path, self._process_file)
         except (IOError, OSError) as e:
             logger.error(f"Ошибка при обработке файла: {e}")
             return SumResult(total=0.0, count=0, incorrect_count=0)
+        self.log_invalid_values(self.file_path)
+        return result
+
+    def _process_file(self) -> SumResult:
+        compressed = detect_compression(self.file_path) is not None
+        if self.workers > 1 and not self.tabular and not compressed:
+            return self._process_parallel()
+        if self._use_fast_numeric() and not compressed:
+            return self._process_mapped()
+        with metrics.stage(STAGE_OPEN, self.file_path):
+            f = open_input(self.file_path, buffering=self.buffer_size, newline='')
+        with f:
+            return self.process_stream(f)  # Используем общий метод
+
+    def _use_fast_numeric(self) -> bool:
+        return self.fast_numeric and self.sketches is None and not self.tabular
+
+    def _process_mapped(self, start: int = 0, end: Optional[int] = None) -> SumResult:
+        """
+        Обрабатывает диапазон [start, end) файла, отображенного в память, блоками, выровненными по границам строк.
+        """
+        state = SumResult(total=0.0, count=0, incorrect_count=0)
+        mm = open_mmap(self.file_path)
+        if mm is None:
+            return state
+        with mm, closing(iter_blocks(mm, self.block_size, start, end)) as blocks:
+            for block in blocks:
+                state = self._process_block(block, state)
+        return state
+
+    def _process_block(self, block: memoryview, initial: SumResult) -> SumResult:
+        """
+        Суммирует блок байтов быстрым путем, а блок с кавычками — через `csv.reader`.
+        """
+        on_invalid = self.invalid_values.add if self.invalid_values is not None else None
+        result = sum_numeric_block(block, initial, on_invalid)
+        if result is None:
+            text = str(block, locale.getpreferredencoding(False))
+            result = self.process_stream(io.StringIO(text, newline=''), initial)
+        return result
+
+    def _process_parallel(self) -> SumResult:
+        """
+        Обрабатывает диапазоны файла в пуле процессов и объединяет частичные результаты.
+        """
+        ranges = self._byte_ranges()
+        if len(ranges) <= 1:
+            return merge_results(self._process_range(start, end) for start, end in ranges)
+        starts, ends = zip(*ranges)
+        results = []
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(ranges))) as executor:
+            offset = 0
+            for result, sketches, invalid_values in executor.map(_process_range, repeat(self), starts, ends):
+                results.append(result)
+                if sketches is not None:
+                    self.sketches.merge(sketches)
+                if invalid_values is not None:
+                    self.invalid_values.merge(invalid_values, offset)
+                offset += result.count + result.incorrect_count
+        return merge_results(results)
+
+    def _byte_ranges(self) -> List[Tuple[int, int]]:
+        """
+        Делит файл на диапазоны байтов около `chunk_size`, каждый из которых заканчивается на границе строки.
+
+        Returns:
+            List[Tuple[int, int]]: Пары (начало, конец) диапазонов.
+        """
+        size = self.file_path.stat().st_size
+        ranges = []
+        start = 0
+        with self.file_path.open('rb') as f:
+            while start < size:
+                end = start + self.chunk_size
+                if end < size:
+                    f.seek(end)
+                    f.readline()
+                    end = f.tell()
+                else:
+                    end = size
+                ranges.append((start, end))
+                start = end
+        return ranges
+
+    def _process_range(self, start: int, end: int) -> SumResult:
+        """
+        Обрабатывает диапазон байтов файла [start, end).
+
+        Args:
+            start (int): Смещение начала диапазона (начало строки).
+            end (int): Смещение конца диапазона (начало следующей строки или конец файла).
+
+        Returns:
+            SumResult: Частичный результат суммирования.
+        """
+        if self._use_fast_numeric():
+            return self._process_mapped(start, end)
+        with self.file_path.open('rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+        text = data.decode(locale.getpreferredencoding(False))
+        return self.process_stream(io.StringIO(text, newline=''))
+
+    def process_stream(self, f: TextIO, initial: Optional[SumResult] = None) -> SumResult:
+        """
+        Обрабатывает CSV-данные из уже открытого текстового потока (например, содержимого, прочитанного заранее).
+
+        Args:
+            f (TextIO): Текстовый поток с CSV-данными.
+            initial (Optional[SumResult]): Результат по предыдущей части данных, см. `DataHandler._process_data`.
+
+        Returns:
+            SumResult: Результат суммирования.
+        """
+        return self._process_data(self._iter_items(f), initial)
+
+    def iter_values(self) -> Iterator[Optional[float]]:
+        """
+        Выдает разобранные значения файла по порядку, None — на месте некорректных (например, для записи
+        в колоночный формат, см. `columnar_writer`).
+        """
+        with open_input(self.file_path, buffering=self.buffer_size, newline='') as f:
+            yield from map(self._process_item, self._iter_items(f))
+
+    def _iter_items(self, f: TextIO) -> Iterator[Optional[str]]:
+        """
+        Построчно читает CSV и выдает ячейки по одной, не накапливая их в памяти.
+
+        Args:
+            f (TextIO): Открытый текстовый поток с CSV-данными.
+
+        Returns:
+            Iterator[Optional[str]]: Ячейки всех строк в порядке следования (в табличном режиме — только
+            выбранных колонок; None вместо отсутствующей в короткой строке ячейки).
+        """
+        if not self.tabular:
+            for row in csv.reader(f):
+                yield from row
+            return
+        _, indices, _, rows = self._select_columns(csv.reader(f))
+        for row in rows:
+            if row:
+                yield from (row[index] if index < len(row) else None for index in indices)
+
+    def _select_columns(self, reader: Iterator[List[str]]
+                        ) -> Tuple[List[Union[str, int]], List[int], Optional[int], Iterator[List[str]]]:
+        """
+        Читает заголовок (или первую строку) и определяет номера выбранных колонок.
+
+        Returns:
+            Tuple: Подписи колонок для результатов, номера колонок со значениями, номер колонки группировки
+            и итератор строк данных.
+
+        Raises:
+            ValueError: Если колонки с указанным именем нет в заголовке.
+        """
+        first = next(reader, None)
+        if first is None:
+            return [], [], None, iter(())
+        rows = reader if self.header else chain([first], reader)
+
+        def resolve(column: Union[str, int]) -> int:
+            if isinstance(column, int):
+                return column
+            try:
+                return first.index(column)
+            except ValueError:
+                raise ValueError(f"Колонка {column} не найдена в заголовке файла {self.file_path}.") from None
+
+        group_index = resolve(self.group_by) if self.group_by is not None else None
+        if self.columns is not None:
+            labels = self.columns
+            indices = [resolve(column) for column in self.columns]
+        else:
+            indices = [index for index in range(len(first)) if index != group_index]
+            labels = [first[index] for index in indices] if self.header else indices
+        return labels, indices, group_index, rows
+
+    def aggregate(self, max_groups: int = DEFAULT_MAX_GROUPS,
+                  spill_dir: Optional[Path] = None) -> Iterator[Tuple[Any, Dict[Union[str, int], SumResult]]]:
+        """
+        Считает результаты суммирования по каждой выбранной колонке и каждой группе за один проход по файлу.
+
+        Группы хранятся в `GroupAggregator`, который при большом количестве ключей сбрасывает их на диск.
+
+        Args:
+            max_groups (int): Максимальное количество групп в памяти до сброса на диск.
+            spill_dir (Optional[Path]): Каталог для временных файлов.
+
+        Returns:
+            Iterator[Tuple[Any, Dict[Union[str, int], SumResult]]]: Пары (значение колонки группировки,
+            результаты по колонкам). Без `group_by` выдается одна группа с ключом None.
+        """
+        with open_input(self.file_path, buffering=self.buffer_size, newline='') as f:
+            labels, indices, group_index, rows = self._select_columns(csv.reader(f))
+            if not indices:
+                return
+            aggregator = GroupAggregator(len(indices), max_groups=max_groups, spill_dir=spill_dir)
+            process_item = self._process_item
+            for row in rows:
+                if not row:
+                    continue
+                key = row[group_index] if group_index is not None and group_index < len(row) else None
+                aggregator.add(key, [process_item(row[index]) if index < len(row) else None for index in indices])
+        for key, results in aggregator.results():
+            yield key, dict(zip(labels, results))
 
     def _process_item(self, item: Union[int, float, str]) -> Optional[float]:
-        try:
-            return float(item)
-        except (ValueError, TypeError):
-            return None
+        return parse_value(item)
+
+
+def _process_range(handler: CSVDataHandler, start: int,
+                   end: int) -> Tuple[SumResult, Optional[Sketches], Optional[InvalidValueReport]]:
+    """
+    Задание для пула процессов: обрабатывает диапазон байтов файла.
+
+    Обработчик приходит в процесс копией, поэтому скетчи заполняются с нуля и возвращаются вместе
+    с частичным результатом, чтобы их можно было объединить в исходном процессе.
+    """
+    if handler.sketches is not None:
+        handler.sketches = handler.sketches.empty_copy()
+    if handler.invalid_values is not None:
+        handler.invalid_values = handler.invalid_values.empty_copy()
+    return handler._process_range(start, end), handler.sketches, handler.invalid_values
@@ -1,10 +1,100 @@
+import logging
 from collections import namedtuple
-from typing import Iterable, Union, Optional
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Union, Optional
 from abc import ABC, abstractmethod
+import numpy_engine
+from data_processor import parse_value
+from instrumentation import STAGE_PROCESS, metrics
+from invalid_values import InvalidValueReport
+from sketches import Sketches
+
+if TYPE_CHECKING:
+    from result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
 
 SumResult = namedtuple('SumResult', ['total', 'count', 'incorrect_count'])
 
+
+def merge_results(results: Iterable[SumResult]) -> SumResult:
+    """
+    Объединяет частичные результаты суммирования (например, по частям файла) в один.
+
+    Args:
+        results (Iterable[SumResult]): Частичные результаты.
+
+    Returns:
+        SumResult: Общий результат.
+    """
+    total_sum = 0.0
+    count = 0
+    incorrect_count = 0
+    for result in results:
+        total_sum += result.total
+        count += result.count
+        incorrect_count += result.incorrect_count
+    return SumResult(total=total_sum, count=count, incorrect_count=incorrect_count)
+
+
+ENGINE_PYTHON = 'python'
+ENGINE_NUMPY = 'numpy'
+ENGINES = (ENGINE_PYTHON, ENGINE_NUMPY)
+
 class DataHandler(ABC):
+    engine: str = ENGINE_PYTHON
+    batch_size: int = numpy_engine.DEFAULT_BATCH_SIZE
+    sketches: Optional[Sketches] = None
+    cache: Optional["ResultCache"] = None
+    invalid_values: Optional[InvalidValueReport] = None
+
+    def __init__(self, engine: str = ENGINE_PYTHON, batch_size: int = numpy_engine.DEFAULT_BATCH_SIZE,
+                 sketches: Optional[Sketches] = None, cache: Optional["ResultCache"] = None,
+                 invalid_values: Optional[InvalidValueReport] = None) -> None:
+        """
+        Args:
+            engine (str): Движок суммирования: 'python' (поэлементный цикл) или 'numpy' (векторизованный,
+                пачками по `batch_size` элементов). NumPy-движок предполагает, что `_process_item`
+                преобразует элемент через `data_processor.parse_value` (float() без NaN и бесконечностей);
+                если NumPy не установлен, используется 'python'.
+            batch_size (int): Размер пачки для движка 'numpy'.
+            sketches (Optional[Sketches]): Скетчи квантилей и уникальных значений, которые заполняются
+                корректными значениями за тот же проход, что и сумма.
+            cache (Optional[ResultCache]): Кеш результатов для файловых обработчиков: неизменившийся файл
+                не обрабатывается повторно. Не используется, если заданы скетчи (их нельзя восстановить из кеша).
+            invalid_values (Optional[InvalidValueReport]): Отчет, в котором учитываются некорректные элементы
+                (категории и выборка примеров с позициями); по умолчанию новый. Отчет описывает последний вызов
+                `process_data` и очищается в начале каждого вызова.
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Неизвестный движок: {engine}. Допустимые значения: {', '.join(ENGINES)}.")
+        if batch_size <= 0:
+            raise ValueError("Размер пачки должен быть положительным.")
+        if engine == ENGINE_NUMPY and not numpy_engine.is_available():
+            logger.warning("NumPy не установлен, используется движок 'python'.")
+            engine = ENGINE_PYTHON
+        self.engine = engine
+        self.batch_size = batch_size
+        self.sketches = sketches
+        self.cache = cache
+        self.invalid_values = invalid_values if invalid_values is not None else InvalidValueReport()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """
+        Обработчик передается в дочерние процессы (например, диапазоны CSV-файла при `workers > 1`) без кеша:
+        кеш содержит блокировку, которую нельзя сериализовать, и используется только в исходном процессе.
+        """
+        state = self.__dict__.copy()
+        state['cache'] = None
+        return state
+
+    def log_invalid_values(self, source: object) -> None:
+        """
+        Пишет в лог одну сводку о некорректных элементах источника (вместо строки на каждый элемент).
+        """
+        if self.invalid_values is not None:
+            self.invalid_values.log_summary(logger, source)
+
     @abstractmethod
     def process_data(self, data: Iterable[float]) -> SumResult:
         """
@@ -18,16 +108,94 @@ class DataHandler(ABC):
         """
         pass
 
-    def _process_data(self, data: Iterable[Union[int, float, str]]) -> SumResult:
-        total_sum = 0.0
-        count = 0
-        incorrect_count = 0
+    def _cache_namespace(self) -> str:
+        """
+        Пространство имен записей кеша: результаты обработчиков с разными настройками разбора не должны смешиваться.
+
+        Движок входит в пространство имен, если он не 'python': `np.sum` складывает попарно, и сумма может
+        отличаться в последних разрядах.
+        """
+        if self.engine == ENGINE_PYTHON:
+            return type(self).__name__
+        return f"{type(self).__name__}[engine={self.engine}]"
+
+    def _cached(self, file_path: Path, compute: Callable[[], SumResult]) -> SumResult:
+        """
+        Возвращает результат из кеша или вычисляет его и сохраняет в кеш.
+
+        Отчет о некорректных значениях очищается и заполняется заново: при вычислении — по ходу обработки,
+        при попадании в кеш — из сохраненной вместе с результатом копии.
+
+        Время обработки и счетчики файла учитываются в `instrumentation.metrics`, если метрики включены.
+
+        Args:
+            file_path (Path): Путь к входному файлу.
+            compute (Callable[[], SumResult]): Функция, обрабатывающая файл.
+
+        Returns:
+            SumResult: Результат суммирования.
+        """
+        if self.invalid_values is not None:
+            self.invalid_values.reset()
+        with metrics.stage(STAGE_PROCESS, file_path):
+            if self.cache is None or self.sketches is not None:
+                return self._compute(file_path, compute)
+            namespace = self._cache_namespace()
+            result = self.cache.get(file_path, namespace, self.invalid_values)
+            if result is None:
+                fingerprint = self.cache.fingerprint(file_path)
+                result = self._compute(file_path, compute)
+                if fingerprint is not None:
+                    self.cache.put(file_path, namespace, result, fingerprint, self.invalid_values)
+            return result
+
+    @staticmethod
+    def _compute(file_path: Path, compute: Callable[[], SumResult]) -> SumResult:
+        result = compute()
+        metrics.record_file(file_path)
+        metrics.record_result(file_path, result)
+        return result
+
+    def _process_data(self, data: Iterable[Union[int, float, str]], initial: Optional[SumResult] = None) -> SumResult:
+        """
+        Суммирует элементы данных.
+
+        Args:
+            data (Iterable[Union[int, float, str]]): Элементы данных.
+            initial (Optional[SumResult]): Результат по предыдущей части данных, с которого продолжается
+                суммирование (итог совпадает с обработкой всех данных за один проход).
+
+        Returns:
+            SumResult: Результат суммирования.
+        """
+        if self.engine == ENGINE_NUMPY:
+            on_values = self.sketches.update if self.sketches is not None else None
+            on_invalid = None
+            if self.invalid_values is not None:
+                offset = initial.count + initial.incorrect_count if initial is not None else 0
+
+                def on_invalid(item: Any, position: int) -> None:
+                    self.invalid_values.add(item, offset + position)
+            total_sum, count, incorrect_count = numpy_engine.sum_batches(data, self._process_item, self.batch_size,
+                                                                         on_values, on_invalid)
+            result = SumResult(total=total_sum, count=count, incorrect_count=incorrect_count)
+            return merge_results([initial, result]) if initial is not None else result
+
+        total_sum, count, incorrect_count = initial if initial is not None else (0.0, 0, 0)
+        add_to_sketches = self.sketches.add if self.sketches is not None else None
+        add_invalid = self.invalid_values.add if self.invalid_values is not None else None
+        process_item = self._process_item
 
-        for item in map(self._process_item, data):
+        for raw in data:
+            item = process_item(raw)
             if item is not None:
                 total_sum += item
                 count += 1
+                if add_to_sketches is not None:
+                    add_to_sketches(item)
             else:
+                if add_invalid is not None:
+                    add_invalid(raw, count + incorrect_count)
                 incorrect_count += 1
 
         return SumResult(total=total_sum, count=count, incorrect_count=incorrect_count)
@@ -48,12 +216,10 @@ class DataHandler(ABC):
 # Пример реализации DataHandler
 class SimpleDataHandler(DataHandler):
     def process_data(self, data: Iterable[float]) -> SumResult:
+        if self.invalid_values is not None:
+            self.invalid_values.reset()
         return self._process_data(data)
 
     def _process_item(self, item: Union[int, float, str]) -> Optional[float]:
-        try:
-            # Пробуем преобразовать элемент в float
-            return float(item)
-        except (ValueError, TypeError):
-            # Если не удалось преобразовать, возвращаем None
-            return None
+        # Конечное число или None, если элемент некорректен (в том числе NaN и бесконечности)
+        return parse_value(item)
@@ -1,6 +1,10 @@
 import logging
-from typing import Iterable, Optional
+import math
+from typing import Any, Iterable, Optional
 from dataclasses import dataclass
+from invalid_values import InvalidValueReport, classify
+from running_stats import RunningStats
+from sketches import Sketches
 
 logger = logging.getLogger(__name__)
 
@@ -17,38 +21,104 @@ class SumResult:
     count: int
     incorrect_count: int
     average: Optional[float]
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    variance: Optional[float] = None
+    stddev: Optional[float] = None
+    skewness: Optional[float] = None
+    kurtosis: Optional[float] = None
 
 
 class DataProcessor:
-    def __init__(self) -> None:
-        self.total_sum: float = 0.0
-        self.count: int = 0
+    def __init__(self, sketches: Optional[Sketches] = None,
+                 invalid_values: Optional[InvalidValueReport] = None) -> None:
+        """
+        Args:
+            sketches (Optional[Sketches]): Скетчи квантилей и уникальных значений, которые заполняются
+                за тот же проход, что и сумма.
+            invalid_values (Optional[InvalidValueReport]): Отчет о некорректных значениях (по умолчанию новый).
+        """
+        self.stats = RunningStats()
+        self.sketches = sketches
+        self.invalid_values = invalid_values if invalid_values is not None else InvalidValueReport()
         self.incorrect_count: int = 0
 
+    @property
+    def total_sum(self) -> float:
+        return self.stats.total
+
+    @property
+    def count(self) -> int:
+        return self.stats.count
+
     def add_value(self, value: float) -> None:
-        self.total_sum += value
-        self.count += 1
+        self.stats.add(value)
+        if self.sketches is not None:
+            self.sketches.add(value)
 
     def add_incorrect(self) -> None:
         self.incorrect_count += 1
 
+    def add_invalid(self, item: Any) -> None:
+        """
+        Учитывает некорректное значение в счетчике и в отчете о некорректных значениях. Значения отклоняются
+        `to_value`, поэтому строка, даже с числом, попадает в отчет как значение неподдерживаемого типа.
+        """
+        self.invalid_values.add(item, self.count + self.incorrect_count, classify(item, numeric_strings=False))
+        self.incorrect_count += 1
+
+    def merge(self, other: "DataProcessor") -> None:
+        """
+        Добавляет результаты другого процессора (например, обработавшего другую часть данных).
+
+        Args:
+            other (DataProcessor): Процессор с частичными результатами.
+        """
+        self.invalid_values.merge(other.invalid_values, offset=self.count + self.incorrect_count)
+        self.stats.merge(other.stats)
+        if self.sketches is not None and other.sketches is not None:
+            self.sketches.merge(other.sketches)
+        self.incorrect_count += other.incorrect_count
+
     def calculate_results(self) -> SumResult:
         average = self.total_sum / self.count if self.count > 0 else None
-        return SumResult(total=self.total_sum, count=self.count, incorrect_count=self.incorrect_count, average=average)
+        return SumResult(total=self.total_sum, count=self.count, incorrect_count=self.incorrect_count, average=average,
+                         minimum=self.stats.minimum, maximum=self.stats.maximum, variance=self.stats.variance,
+                         stddev=self.stats.stddev, skewness=self.stats.skewness, kurtosis=self.stats.kurtosis)
 
 
-def safe_add(processor: DataProcessor, item) -> None:
+def to_value(item: Any) -> Optional[float]:
+    """
+    Преобразует элемент в конечное число или возвращает None для некорректного элемента
+    (None, строки, NaN и бесконечности, другие типы).
+    """
     if item is None or not isinstance(item, (int, float)):
-        logger.error(f"Некорректные данные: {item} - неподдерживаемый тип.")
-        processor.add_incorrect()
-        return
+        return None
+    return parse_value(item)
+
 
+def parse_value(item: Any) -> Optional[float]:
+    """
+    Как `to_value`, но принимает и строки с числами (например, ячейки CSV-файла): возвращает конечное число
+    или None для некорректного элемента. Этой проверкой пользуются обработчики файлов.
+    """
     try:
         value = float(item)
-        processor.add_value(value)
-    except (ValueError, TypeError) as e:
-        logger.error(f"Некорректные данные: {item} - {e}")
-        processor.add_incorrect()
+    except (ValueError, TypeError, OverflowError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def safe_add(processor: DataProcessor, item) -> None:
+    """
+    Добавляет элемент в процессор. Некорректные элементы не пишутся в лог по одному,
+    а учитываются в `processor.invalid_values`.
+    """
+    value = to_value(item)
+    if value is None:
+        processor.add_invalid(item)
+        return
+    processor.add_value(value)
 
 
 def process_data(data: Iterable[float]) -> (SumResult, AverageResult):
@@ -61,6 +131,7 @@ def process_data(data: Iterable[float]) -> (SumResult, AverageResult):
     processor = DataProcessor()
     for item in data:
         safe_add(processor, item)
+    processor.invalid_values.log_summary(logger, "входные данные")
 
     sum_result = processor.calculate_results()
     average_result = AverageResult(average=sum_result.average, error=None)
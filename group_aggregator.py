@@ -0,0 +1,227 @@
+"""
+Агрегация значений по колонкам и группам за один проход с ограниченным потреблением памяти.
+
+Для каждой группы хранится по аккумулятору (сумма, количество корректных и некорректных значений) на колонку.
+Когда количество групп в памяти превышает `max_groups`, накопленные аккумуляторы сбрасываются на диск
+в файлы-разделы (раздел выбирается по хешу ключа), а память освобождается. В конце разделы по очереди
+загружаются и объединяются. Если в разделе больше `max_groups` групп, при объединении он снова делится
+на `partitions` подразделов по следующим битам хеша, поэтому в памяти одновременно находится не больше
+`max_groups` групп при любом их общем количестве.
+
+Пример:
+    python group_aggregator.py sales.csv --columns price,quantity --group-by region --output sales_results.csv
+"""
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from data_handler import SumResult
+from logger_config import setup_logger
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_GROUPS = 100_000
+DEFAULT_PARTITIONS = 16
+_HASH_RANGE = 1 << 64
+
+Accumulators = List[List[Any]]
+
+
+class GroupAggregator:
+    """
+    Хеш-агрегатор результатов суммирования по группам и колонкам со сбросом на диск.
+
+    Ключ группы — любое значение, представимое в JSON (строка, число, None). Порядок групп в результате
+    не гарантируется. После сброса на диск частичные суммы одной группы складываются при объединении,
+    поэтому итог может отличаться от поэлементного суммирования в последних знаках.
+    """
+    def __init__(self, width: int, max_groups: int = DEFAULT_MAX_GROUPS, partitions: int = DEFAULT_PARTITIONS,
+                 spill_dir: Optional[Path] = None) -> None:
+        """
+        Args:
+            width (int): Количество колонок.
+            max_groups (int): Максимальное количество групп в памяти до сброса на диск.
+            partitions (int): Количество файлов-разделов при сбросе.
+            spill_dir (Optional[Path]): Каталог для временных файлов (по умолчанию системный).
+        """
+        if width <= 0:
+            raise ValueError("Количество колонок должно быть положительным.")
+        if max_groups <= 0:
+            raise ValueError("Максимальное количество групп должно быть положительным.")
+        if partitions <= 0:
+            raise ValueError("Количество разделов должно быть положительным.")
+        self.width = width
+        self.max_groups = max_groups
+        self.partitions = partitions
+        self.spill_dir = spill_dir
+        self.spills = 0
+        self.repartitions = 0
+        self._groups: Dict[Any, Accumulators] = {}
+        self._spill_path: Optional[Path] = None
+
+    def add(self, key: Any, values: Sequence[Optional[float]]) -> None:
+        """
+        Добавляет строку: по одному значению на колонку, None — некорректное значение.
+
+        Args:
+            key (Any): Ключ группы.
+            values (Sequence[Optional[float]]): Значения колонок.
+        """
+        accumulators = self._groups.get(key)
+        if accumulators is None:
+            if len(self._groups) >= self.max_groups:
+                self._spill()
+            accumulators = self._groups[key] = [[0.0, 0, 0] for _ in range(self.width)]
+        for accumulator, value in zip(accumulators, values):
+            if value is None:
+                accumulator[2] += 1
+            else:
+                accumulator[0] += value
+                accumulator[1] += 1
+
+    def _partition(self, key: Any, level: int = 0) -> int:
+        """
+        Возвращает раздел ключа на уровне `level`: каждый уровень использует следующие биты 64-битного хеша.
+        """
+        digest = hashlib.blake2b(json.dumps(key).encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'little') // self.partitions ** level % self.partitions
+
+    def _write_partitions(self, groups: Dict[Any, Accumulators], directory: Path, level: int) -> None:
+        """
+        Дописывает аккумуляторы групп в файлы-разделы каталога `directory`.
+        """
+        files = [(directory / f"{index}.jsonl").open('a', encoding='utf-8') for index in range(self.partitions)]
+        try:
+            for key, accumulators in groups.items():
+                files[self._partition(key, level)].write(json.dumps([key, accumulators]) + "\n")
+        finally:
+            for f in files:
+                f.close()
+
+    def _spill(self) -> None:
+        """
+        Дописывает аккумуляторы всех групп из памяти в файлы-разделы и очищает память.
+        """
+        if self._spill_path is None:
+            self._spill_path = Path(tempfile.mkdtemp(prefix='datastats_groups_', dir=self.spill_dir))
+        self._write_partitions(self._groups, self._spill_path, 0)
+        logger.info(f"Сброшено на диск групп: {len(self._groups)}")
+        self.spills += 1
+        self._groups = {}
+
+    def _merge_partition(self, path: Path, level: int) -> Iterator[Tuple[Any, List[SumResult]]]:
+        """
+        Объединяет частичные аккумуляторы из файла-раздела и выдает результаты по группам.
+
+        Если групп в разделе больше `max_groups`, накопленные группы сбрасываются в подразделы следующего уровня,
+        которые затем объединяются так же (рекурсивно).
+        """
+        merged: Dict[Any, Accumulators] = {}
+        split_path = path.with_suffix('')
+        split = False
+        with path.open('r', encoding='utf-8') as f:
+            for line in f:
+                key, accumulators = json.loads(line)
+                current = merged.get(key)
+                if current is None:
+                    # Ключи, у которых совпадают все биты хеша, дальше не делятся
+                    if (len(merged) >= self.max_groups and self.partitions > 1
+                            and self.partitions ** (level + 1) < _HASH_RANGE):
+                        if not split:
+                            split_path.mkdir()
+                            split = True
+                        self._write_partitions(merged, split_path, level + 1)
+                        merged = {}
+                    merged[key] = accumulators
+                    continue
+                for target, source in zip(current, accumulators):
+                    target[0] += source[0]
+                    target[1] += source[1]
+                    target[2] += source[2]
+        path.unlink()
+        if not split:
+            for key, accumulators in merged.items():
+                yield key, _to_results(accumulators)
+            return
+
+        self._write_partitions(merged, split_path, level + 1)
+        merged = {}
+        self.repartitions += 1
+        logger.info(f"Раздел {path.name} (уровень {level}) разделен на {self.partitions} подразделов")
+        for index in range(self.partitions):
+            yield from self._merge_partition(split_path / f"{index}.jsonl", level + 1)
+
+    def results(self) -> Iterator[Tuple[Any, List[SumResult]]]:
+        """
+        Выдает результаты по группам и освобождает временные файлы.
+
+        Returns:
+            Iterator[Tuple[Any, List[SumResult]]]: Пары (ключ группы, результаты по колонкам).
+        """
+        if self._spill_path is None:
+            groups, self._groups = self._groups, {}
+            for key, accumulators in groups.items():
+                yield key, _to_results(accumulators)
+            return
+
+        self._spill()
+        try:
+            for index in range(self.partitions):
+                yield from self._merge_partition(self._spill_path / f"{index}.jsonl", 0)
+        finally:
+            shutil.rmtree(self._spill_path, ignore_errors=True)
+            self._spill_path = None
+
+
+def _to_results(accumulators: Accumulators) -> List[SumResult]:
+    return [SumResult(total=total, count=count, incorrect_count=incorrect_count)
+            for total, count, incorrect_count in accumulators]
+
+
+def write_group_results(file_path: Path, groups: Iterator[Tuple[Any, Dict[Any, SumResult]]]) -> None:
+    """
+    Записывает результаты по группам и колонкам в CSV-файл: по строке на пару (группа, колонка).
+
+    Args:
+        file_path (Path): Путь к файлу результатов.
+        groups (Iterator[Tuple[Any, Dict[Any, SumResult]]]): Результаты, см. `CSVDataHandler.aggregate`.
+    """
+    try:
+        with open(file_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Группа", "Колонка", "Сумма", "Количество", "Некорректные данные",
+                             "Среднее арифметическое"])
+            for key, columns in groups:
+                for column, result in columns.items():
+                    average = result.total / result.count if result.count > 0 else "Нет данных"
+                    writer.writerow([key, column, result.total, result.count, result.incorrect_count, average])
+        logger.info(f"Результаты записаны в файл: {file_path}")
+    except (IOError, OSError) as e:
+        logger.error(f"Ошибка при записи в файл: {e}")
+
+
+def main() -> None:
+    from csv_data_handler import CSVDataHandler
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', type=Path, help="CSV-файл с заголовком.")
+    parser.add_argument('--columns', default=None, help="Колонки через запятую (по умолчанию все, кроме группировки).")
+    parser.add_argument('--group-by', default=None, help="Колонка группировки.")
+    parser.add_argument('--max-groups', type=int, default=DEFAULT_MAX_GROUPS,
+                        help="Количество групп в памяти до сброса на диск.")
+    parser.add_argument('--output', type=Path, required=True, help="CSV-файл результатов.")
+    args = parser.parse_args()
+
+    setup_logger('logging_config.yaml')
+    columns = args.columns.split(',') if args.columns else None
+    handler = CSVDataHandler(args.input, header=True, columns=columns, group_by=args.group_by)
+    write_group_results(args.output, handler.aggregate(max_groups=args.max_groups))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Инкрементальная обработка растущих файлов (CSV и NDJSON), в которые данные только дописываются.
+
+После каждого запуска в файл контрольной точки сохраняются смещение конца последней полной строки
+и накопленный результат. Следующий запуск разбирает только дописанные байты и продолжает суммирование
+с сохраненного результата, поэтому итог совпадает с полной обработкой файла. Если файл был усечен,
+заменен (ротация) или перезаписан, выполняется полная обработка с начала.
+
+Пример:
+    python incremental.py events.csv --checkpoint events.checkpoint.json --output events_results.json
+"""
+import argparse
+import hashlib
+import json
+import locale
+import logging
+import os
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Union
+from compressed_io import compression_from_suffix
+from csv_data_handler import CSVDataHandler
+from csv_result_writer import write_csv_results
+from data_handler import SumResult
+from json_data_handler import JSONDataHandler
+from json_result_writer import write_json_results
+from logger_config import setup_logger
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_SIZE = 64 * 1024
+
+
+def _fingerprint(f: BinaryIO, length: int) -> str:
+    """
+    Хеш первых `length` байтов файла: по нему определяется, что начало файла не было перезаписано.
+    """
+    f.seek(0)
+    return hashlib.sha256(f.read(length)).hexdigest()
+
+
+class IncrementalProcessor:
+    """
+    Инкрементальный обработчик растущего файла поверх `CSVDataHandler` или `JSONDataHandler` в режиме JSON Lines.
+
+    Контрольная точка охватывает только полные строки (заканчивающиеся переводом строки). Незавершенная
+    последняя строка учитывается в возвращаемом результате, но не в контрольной точке: когда ее допишут,
+    она будет разобрана заново целиком. Поля в кавычках с переводами строк не поддерживаются.
+    """
+    def __init__(self, handler: Union[CSVDataHandler, JSONDataHandler], checkpoint_path: Path) -> None:
+        """
+        Args:
+            handler (Union[CSVDataHandler, JSONDataHandler]): Обработчик файла.
+            checkpoint_path (Path): Файл контрольной точки.
+        """
+        if isinstance(handler, JSONDataHandler) and not handler.json_lines:
+            raise ValueError("Инкрементальная обработка JSON поддерживается только для формата JSON Lines.")
+        if compression_from_suffix(handler.file_path) is not None:
+            raise ValueError("Инкрементальная обработка сжатых файлов не поддерживается.")
+        if isinstance(handler, CSVDataHandler) and handler.tabular:
+            raise ValueError("Инкрементальная обработка не поддерживает табличный режим CSV (заголовок и выбор колонок).")
+        self.handler = handler
+        self.checkpoint_path = checkpoint_path
+        self.encoding = locale.getpreferredencoding(False)
+        self.offset = 0
+        self._tail: Optional[bytes] = None
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        try:
+            with self.checkpoint_path.open('r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (IOError, OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать контрольную точку {self.checkpoint_path}: {e}")
+            return None
+
+    def _save_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        temp_path = self.checkpoint_path.with_name(self.checkpoint_path.name + '.tmp')
+        with temp_path.open('w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def _resume_point(self, f: BinaryIO, stat: os.stat_result,
+                      checkpoint: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Проверяет, можно ли продолжить с контрольной точки, и возвращает ее (или None для полной обработки).
+        """
+        if checkpoint is None:
+            return None
+        file_path = str(self.handler.file_path.resolve())
+        if checkpoint.get("path") != file_path:
+            reason = "контрольная точка относится к другому файлу"
+        elif checkpoint["inode"] != stat.st_ino:
+            reason = "файл был заменен (ротация)"
+        elif stat.st_size < checkpoint["offset"]:
+            reason = "файл был усечен"
+        elif _fingerprint(f, checkpoint["fingerprint_size"]) != checkpoint["fingerprint"]:
+            reason = "начало файла изменилось"
+        else:
+            return checkpoint
+        logger.info(f"Полная обработка {self.handler.file_path}: {reason}.")
+        return None
+
+    def _complete_lines(self, f: BinaryIO, offset: int) -> Iterator[str]:
+        """
+        Выдает полные строки, начиная с `offset`, и сдвигает `self.offset` за каждую из них.
+        Незавершенная последняя строка сохраняется в `self._tail`.
+        """
+        f.seek(offset)
+        self.offset = offset
+        for line in f:
+            if not line.endswith(b'\n'):
+                self._tail = line
+                return
+            self.offset += len(line)
+            yield line.decode(self.encoding)
+
+    def process(self) -> SumResult:
+        """
+        Обрабатывает дописанную часть файла и возвращает результат по всему файлу.
+
+        Returns:
+            SumResult: Результат суммирования, совпадающий с полной обработкой файла. Отчет о некорректных
+            значениях обработчика описывает только обработанную в этом вызове часть.
+        """
+        file_path = self.handler.file_path
+        self._tail = None
+        if self.handler.invalid_values is not None:
+            self.handler.invalid_values.reset()
+        with file_path.open('rb') as f:
+            stat = os.fstat(f.fileno())
+            checkpoint = self._resume_point(f, stat, self._load_checkpoint())
+            if checkpoint is None:
+                offset, state = 0, SumResult(total=0.0, count=0, incorrect_count=0)
+            else:
+                offset = checkpoint["offset"]
+                state = SumResult(total=checkpoint["total"], count=checkpoint["count"],
+                                  incorrect_count=checkpoint["incorrect_count"])
+
+            state = self.handler.process_stream(self._complete_lines(f, offset), state)
+            fingerprint_size = min(self.offset, FINGERPRINT_SIZE)
+            self._save_checkpoint({
+                "path": str(file_path.resolve()),
+                "inode": stat.st_ino,
+                "offset": self.offset,
+                "fingerprint_size": fingerprint_size,
+                "fingerprint": _fingerprint(f, fingerprint_size),
+                "total": state.total,
+                "count": state.count,
+                "incorrect_count": state.incorrect_count,
+            })
+            logger.info(f"Обработано {self.offset - offset} новых байт файла {file_path}.")
+
+        if self._tail:
+            state = self.handler.process_stream(iter([self._tail.decode(self.encoding)]), state)
+        self.handler.log_invalid_values(file_path)
+        return state
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', type=Path, help="CSV- или NDJSON-файл.")
+    parser.add_argument('--checkpoint', type=Path, default=None,
+                        help="Файл контрольной точки (по умолчанию <input>.checkpoint.json).")
+    parser.add_argument('--output', type=Path, required=True, help="Файл результатов (.json или .csv).")
+    args = parser.parse_args()
+
+    setup_logger('logging_config.yaml')
+    if args.input.suffix.lower() == '.csv':
+        handler = CSVDataHandler(args.input)
+    else:
+        handler = JSONDataHandler(args.input, json_lines=True)
+    checkpoint = args.checkpoint or args.input.with_name(args.input.name + '.checkpoint.json')
+
+    sum_result = IncrementalProcessor(handler, checkpoint).process()
+    average = sum_result.total / sum_result.count if sum_result.count > 0 else None
+    writer = write_csv_results if args.output.suffix.lower() == '.csv' else write_json_results
+    writer(args.output, sum_result, average)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Инструментовка горячих путей: таймеры этапов и счетчики по каждому файлу, экспорт метрик в текстовый формат
+Prometheus или JSON и профилирование через cProfile/tracemalloc.
+
+Все включается переменными окружения:
+    DATASTATS_METRICS — путь к файлу метрик: `.prom` — текстовый формат Prometheus (для textfile collector
+        node_exporter), иначе JSON;
+    DATASTATS_PROFILE — 'cprofile', 'tracemalloc' или оба через запятую;
+    DATASTATS_PROFILE_OUTPUT — файл статистики cProfile (по умолчанию datastats.prof).
+
+Когда метрики выключены, `Metrics.stage()` возвращает один и тот же пустой контекстный менеджер, а `count()`
+и `record_result()` сразу возвращаются: накладные расходы — несколько вызовов на файл, а не на значение.
+Этапы: 'open' (открытие файла), 'process' (разбор и суммирование — в потоковом режиме они чередуются
+поэлементно, поэтому измеряются вместе), 'read' и 'parse' (этапы асинхронного конвейера), 'write' (запись результатов).
+"""
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENV = 'DATASTATS_METRICS'
+PROFILE_ENV = 'DATASTATS_PROFILE'
+PROFILE_OUTPUT_ENV = 'DATASTATS_PROFILE_OUTPUT'
+DEFAULT_PROFILE_OUTPUT = 'datastats.prof'
+PROFILE_CPROFILE = 'cprofile'
+PROFILE_TRACEMALLOC = 'tracemalloc'
+
+STAGE_OPEN = 'open'
+STAGE_PROCESS = 'process'
+STAGE_READ = 'read'
+STAGE_PARSE = 'parse'
+STAGE_WRITE = 'write'
+
+COUNTER_BYTES_READ = 'bytes_read'
+COUNTER_ITEMS = 'items'
+COUNTER_INVALID_ITEMS = 'invalid_items'
+
+_TRACEMALLOC_TOP = 10
+_NULL_STAGE = nullcontext()
+
+Snapshot = Tuple[Dict[Tuple[str, str], list], Dict[Tuple[str, str], int]]
+
+
+class _Stage:
+    __slots__ = ('_metrics', '_key', '_start')
+
+    def __init__(self, metrics: "Metrics", key: Tuple[str, str]) -> None:
+        self._metrics = metrics
+        self._key = key
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._metrics._add_time(self._key, time.perf_counter() - self._start)
+
+
+class Metrics:
+    """
+    Потокобезопасный накопитель времени этапов и счетчиков с разбивкой по файлам.
+    """
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self._stages: Dict[Tuple[str, str], list] = {}
+        self._counters: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name: str, source: Any) -> ContextManager[None]:
+        """
+        Контекстный менеджер, который добавляет время выполнения блока к этапу `name` файла `source`.
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, (name, str(source)))
+
+    def _add_time(self, key: Tuple[str, str], seconds: float) -> None:
+        with self._lock:
+            entry = self._stages.setdefault(key, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def count(self, name: str, value: int, source: Any) -> None:
+        """
+        Увеличивает счетчик `name` файла `source` на `value`.
+        """
+        if not self.enabled:
+            return
+        key = (name, str(source))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def record_result(self, source: Any, result: Any) -> None:
+        """
+        Учитывает количество разобранных и некорректных элементов из результата суммирования.
+        """
+        if not self.enabled:
+            return
+        self.count(COUNTER_ITEMS, result.count + result.incorrect_count, source)
+        self.count(COUNTER_INVALID_ITEMS, result.incorrect_count, source)
+
+    def record_file(self, file_path: Path) -> None:
+        """
+        Учитывает размер прочитанного с диска файла.
+        """
+        if not self.enabled:
+            return
+        try:
+            self.count(COUNTER_BYTES_READ, file_path.stat().st_size, file_path)
+        except OSError:
+            pass
+
+    def snapshot(self, reset: bool = False) -> Snapshot:
+        """
+        Возвращает копию накопленных значений (например, чтобы передать их из дочернего процесса в `merge`).
+
+        Args:
+            reset (bool): Очистить накопленные значения.
+        """
+        with self._lock:
+            stages = {key: list(entry) for key, entry in self._stages.items()}
+            counters = dict(self._counters)
+            if reset:
+                self._stages.clear()
+                self._counters.clear()
+        return stages, counters
+
+    def merge(self, snapshot: Snapshot) -> None:
+        """
+        Добавляет значения, накопленные в другом процессе.
+        """
+        stages, counters = snapshot
+        with self._lock:
+            for key, (calls, seconds) in stages.items():
+                entry = self._stages.setdefault(key, [0, 0.0])
+                entry[0] += calls
+                entry[1] += seconds
+            for key, value in counters.items():
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def reset(self) -> None:
+        self.snapshot(reset=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Возвращает метрики по файлам: вызовы и время этапов, счетчики и пропускную способность этапа 'process'.
+        """
+        stages, counters = self.snapshot()
+        files: Dict[str, Dict[str, Any]] = {}
+        for (name, source), (calls, seconds) in stages.items():
+            files.setdefault(source, {"stages": {}, "counters": {}})["stages"][name] = {"calls": calls,
+                                                                                       "seconds": seconds}
+        for (name, source), value in counters.items():
+            files.setdefault(source, {"stages": {}, "counters": {}})["counters"][name] = value
+        for entry in files.values():
+            seconds = entry["stages"].get(STAGE_PROCESS, {}).get("seconds")
+            if seconds:
+                entry["items_per_second"] = entry["counters"].get(COUNTER_ITEMS, 0) / seconds
+                entry["mb_per_second"] = entry["counters"].get(COUNTER_BYTES_READ, 0) / seconds / (1024 * 1024)
+        return {"files": files}
+
+    def to_prometheus(self) -> str:
+        """
+        Возвращает метрики в текстовом формате Prometheus.
+        """
+        stages, counters = self.snapshot()
+        lines = [
+            "# HELP datastats_stage_seconds_total Время этапов обработки в секундах.",
+            "# TYPE datastats_stage_seconds_total counter",
+        ]
+        lines.extend(f'datastats_stage_seconds_total{{stage="{_escape(name)}",file="{_escape(source)}"}} {seconds!r}'
+                     for (name, source), (_, seconds) in sorted(stages.items()))
+        lines.extend([
+            "# HELP datastats_stage_calls_total Количество выполнений этапов обработки.",
+            "# TYPE datastats_stage_calls_total counter",
+        ])
+        lines.extend(f'datastats_stage_calls_total{{stage="{_escape(name)}",file="{_escape(source)}"}} {calls}'
+                     for (name, source), (calls, _) in sorted(stages.items()))
+        for counter in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE datastats_{counter}_total counter")
+            lines.extend(f'datastats_{counter}_total{{file="{_escape(source)}"}} {value}'
+                         for (name, source), value in sorted(counters.items()) if name == counter)
+        return "\n".join(lines) + "\n"
+
+    def export(self, file_path: Path) -> None:
+        """
+        Записывает метрики в файл: `.prom` — в формате Prometheus, иначе в JSON.
+
+        Файл сначала пишется во временный и затем переименовывается, чтобы textfile collector
+        не прочитал его наполовину записанным.
+        """
+        if file_path.suffix == '.prom':
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.to_dict(), ensure_ascii=False, indent=4)
+        tmp_path = file_path.with_name(file_path.name + '.tmp')
+        tmp_path.write_text(content, encoding='utf-8')
+        os.replace(tmp_path, file_path)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = Metrics(enabled=bool(os.getenv(METRICS_ENV)))
+
+
+def init_worker(enabled: bool) -> None:
+    """
+    Инициализатор дочернего процесса пула: метрики начинаются с нуля (при fork процесс получает копию
+    уже накопленных значений) и включаются так же, как в родительском процессе.
+    """
+    metrics.reset()
+    metrics.enabled = enabled
+
+
+def export_metrics() -> Optional[Path]:
+    """
+    Записывает метрики в файл из переменной окружения DATASTATS_METRICS, если она задана.
+
+    Returns:
+        Optional[Path]: Путь к файлу метрик или None.
+    """
+    path = os.getenv(METRICS_ENV)
+    if not path or not metrics.enabled:
+        return None
+    try:
+        metrics.export(Path(path))
+    except OSError as e:
+        logger.error(f"Ошибка при записи метрик в файл {path}: {e}")
+        return None
+    return Path(path)
+
+
+@contextmanager
+def profiling(modes: Optional[str] = None, output: Optional[Path] = None) -> Iterator[None]:
+    """
+    Профилирует блок кода через cProfile и/или tracemalloc.
+
+    Args:
+        modes (Optional[str]): 'cprofile', 'tracemalloc' или оба через запятую; по умолчанию значение
+            переменной окружения DATASTATS_PROFILE (без нее профилирование выключено).
+        output (Optional[Path]): Файл статистики cProfile; по умолчанию DATASTATS_PROFILE_OUTPUT или datastats.prof.
+    """
+    modes = os.getenv(PROFILE_ENV, '') if modes is None else modes
+    enabled = {mode.strip().lower() for mode in modes.split(',') if mode.strip()}
+    unknown = enabled - {PROFILE_CPROFILE, PROFILE_TRACEMALLOC}
+    if unknown:
+        logger.warning(f"Неизвестные режимы профилирования: {', '.join(sorted(unknown))}")
+    if not enabled & {PROFILE_CPROFILE, PROFILE_TRACEMALLOC}:
+        yield
+        return
+
+    profiler = cProfile.Profile() if PROFILE_CPROFILE in enabled else None
+    trace = PROFILE_TRACEMALLOC in enabled and not tracemalloc.is_tracing()
+    if trace:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            output = output or Path(os.getenv(PROFILE_OUTPUT_ENV) or DEFAULT_PROFILE_OUTPUT)
+            profiler.dump_stats(output)
+            logger.info(f"Статистика cProfile записана в файл: {output}")
+        if trace:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            top = "\n".join(str(stat) for stat in snapshot.statistics('lineno')[:_TRACEMALLOC_TOP])
+            logger.info(f"tracemalloc: текущий объем {current / 1024 / 1024:.1f} МБ, "
+                        f"пик {peak / 1024 / 1024:.1f} МБ; крупнейшие источники выделений:\n{top}")
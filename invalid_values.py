@@ -0,0 +1,166 @@
+"""
+Учет некорректных значений: счетчики по категориям и ограниченная случайная выборка примеров.
+
+Вместо строки в логе на каждое некорректное значение накапливаются счетчики и выборка (reservoir sampling)
+не более `sample_size` значений с их позициями, а по окончании обработки файла в лог пишется одна сводка.
+"""
+import logging
+import math
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+CATEGORY_NONE = 'none'
+CATEGORY_STRING = 'string'
+CATEGORY_NAN = 'nan_inf'
+CATEGORY_TYPE = 'type'
+CATEGORIES = (CATEGORY_NONE, CATEGORY_STRING, CATEGORY_NAN, CATEGORY_TYPE)
+
+CATEGORY_NAMES = {
+    CATEGORY_NONE: "None",
+    CATEGORY_STRING: "нечисловые строки",
+    CATEGORY_NAN: "NaN/inf",
+    CATEGORY_TYPE: "неподдерживаемый тип",
+}
+
+DEFAULT_SAMPLE_SIZE = 10
+_MAX_SAMPLE_LENGTH = 80
+
+
+def classify(item: Any, numeric_strings: bool = True) -> str:
+    """
+    Определяет категорию некорректного значения по причине, по которой оно отклонено.
+
+    Args:
+        item (Any): Некорректное значение.
+        numeric_strings (bool): Принимаются ли строки с числами (`data_processor.parse_value`, обработчики файлов).
+            Если нет (`data_processor.to_value`), строка с числом отклонена из-за типа.
+    """
+    if item is None:
+        return CATEGORY_NONE
+    if isinstance(item, (str, bytes)):
+        try:
+            value = float(item)
+        except ValueError:
+            return CATEGORY_STRING
+        if not numeric_strings or math.isfinite(value):
+            return CATEGORY_TYPE
+        return CATEGORY_NAN
+    if isinstance(item, (int, float)):
+        return CATEGORY_NAN
+    return CATEGORY_TYPE
+
+
+def _describe(item: Any) -> str:
+    text = repr(item)
+    return text if len(text) <= _MAX_SAMPLE_LENGTH else text[:_MAX_SAMPLE_LENGTH - 3] + '...'
+
+
+class InvalidValueReport:
+    """
+    Счетчики некорректных значений по категориям и выборка примеров с позициями.
+    """
+    def __init__(self, sample_size: int = DEFAULT_SAMPLE_SIZE, seed: Optional[int] = None) -> None:
+        """
+        Args:
+            sample_size (int): Максимальный размер выборки примеров.
+            seed (Optional[int]): Зерно генератора случайных чисел выборки.
+        """
+        if sample_size < 0:
+            raise ValueError("Размер выборки не может быть отрицательным.")
+        self.sample_size = sample_size
+        self.counts: Dict[str, int] = dict.fromkeys(CATEGORIES, 0)
+        self.sample: List[Tuple[int, str]] = []
+        self._rng = random.Random(seed)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def add(self, item: Any, position: int, category: Optional[str] = None) -> None:
+        """
+        Учитывает некорректное значение.
+
+        Args:
+            item (Any): Исходное значение.
+            position (int): Номер значения в потоке данных (с нуля).
+            category (Optional[str]): Категория значения; по умолчанию определяется через `classify`.
+        """
+        category = category or classify(item)
+        self.counts[category] += 1
+        if len(self.sample) < self.sample_size:
+            self.sample.append((position, _describe(item)))
+        else:
+            index = self._rng.randrange(self.total)
+            if index < self.sample_size:
+                self.sample[index] = (position, _describe(item))
+
+    def merge(self, other: "InvalidValueReport", offset: int = 0) -> None:
+        """
+        Добавляет счетчики и примеры другого отчета (например, по другой части файла).
+
+        Выборка объединяется приближенно: каждый пример берется из отчета с вероятностью,
+        пропорциональной количеству учтенных в нем значений.
+
+        Args:
+            other (InvalidValueReport): Отчет по другой части данных.
+            offset (int): Сдвиг позиций примеров другого отчета (номер первого значения его части).
+        """
+        own_total, other_total = self.total, other.total
+        for category, count in other.counts.items():
+            self.counts[category] += count
+        own = self.sample[:]
+        incoming = [(position + offset, text) for position, text in other.sample]
+        self._rng.shuffle(own)
+        self._rng.shuffle(incoming)
+        merged = []
+        while len(merged) < self.sample_size and (own or incoming):
+            if not incoming or (own and self._rng.random() * (own_total + other_total) < own_total):
+                merged.append(own.pop())
+            else:
+                merged.append(incoming.pop())
+        self.sample = sorted(merged)
+
+    def reset(self) -> None:
+        """
+        Очищает счетчики и выборку (например, перед обработкой следующего файла).
+        """
+        self.counts = dict.fromkeys(CATEGORIES, 0)
+        self.sample = []
+
+    def empty_copy(self) -> "InvalidValueReport":
+        """
+        Создает пустой отчет с тем же размером выборки.
+        """
+        return InvalidValueReport(sample_size=self.sample_size)
+
+    def summary(self) -> str:
+        """
+        Возвращает сводку: общее количество, разбивку по категориям и примеры.
+        """
+        categories = ", ".join(f"{CATEGORY_NAMES[category]}: {count}" for category, count in self.counts.items() if count)
+        examples = ", ".join(f"#{position} {text}" for position, text in sorted(self.sample))
+        return f"{self.total} ({categories}); примеры: {examples}"
+
+    def log_summary(self, logger: logging.Logger, source: Any) -> None:
+        """
+        Пишет в лог одну сводку по источнику данных, если некорректные значения были.
+
+        Args:
+            logger (logging.Logger): Логгер.
+            source (Any): Источник данных (например, путь к файлу) для сообщения.
+        """
+        if self.total and logger.isEnabledFor(logging.WARNING):
+            logger.warning(f"Некорректные значения ({source}): {self.summary()}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": dict(self.counts), "sample": [list(entry) for entry in sorted(self.sample)]}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any], sample_size: int = DEFAULT_SAMPLE_SIZE) -> "InvalidValueReport":
+        """
+        Восстанавливает отчет из словаря, полученного через `to_dict`.
+        """
+        report = cls(sample_size=sample_size)
+        report.counts.update(state["counts"])
+        report.sample = [(position, text) for position, text in state["sample"]][:sample_size]
+        return report
@@ -1,17 +1,43 @@
-import json
 import logging
 from pathlib import Path
-from typing import Iterable, Union, Optional
+from typing import Any, Iterable, Iterator, TextIO, Union, Optional
+from compressed_io import data_suffix, open_input
 from data_handler import DataHandler, SumResult
+from data_processor import parse_value
+from instrumentation import STAGE_OPEN, metrics
+from json_stream import DEFAULT_CHUNK_SIZE, iter_json_array, iter_json_lines
 
 logger = logging.getLogger(__name__)
 
+JSON_LINES_SUFFIXES = ('.ndjson', '.jsonl')
+
+
 class JSONDataHandler(DataHandler):
     """
     Обработчик данных, считывающий данные из JSON-файла.
+
+    Массив верхнего уровня разбирается инкрементально порциями, а файлы NDJSON / JSON Lines
+    (расширения .ndjson и .jsonl) — построчно, поэтому весь документ не загружается в память.
+    Сжатые файлы (например, `.json.gz`, `.ndjson.zst`) распаковываются на лету, см. `compressed_io.open_input`.
     """
-    def __init__(self, file_path: Path) -> None:
+    def __init__(self, file_path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 json_lines: Optional[bool] = None, **kwargs) -> None:
+        """
+        Args:
+            file_path (Path): Путь к JSON-файлу.
+            chunk_size (int): Размер порции чтения в символах.
+            json_lines (Optional[bool]): Формат JSON Lines; по умолчанию определяется по расширению файла.
+            **kwargs: Параметры движка суммирования, см. `DataHandler.__init__`.
+        """
+        super().__init__(**kwargs)
+        if chunk_size <= 0:
+            raise ValueError("Размер порции чтения должен быть положительным.")
         self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.json_lines = data_suffix(file_path) in JSON_LINES_SUFFIXES if json_lines is None else json_lines
+
+    def _cache_namespace(self) -> str:
+        return f"{super()._cache_namespace()}[json_lines={self.json_lines}]"
 
     def process_data(self) -> SumResult:
         """
@@ -19,17 +45,58 @@ class JSONDataHandler(DataHandler):
 
         Returns:
             SumResult: Результат суммирования.
+
+        Raises:
+            ValueError: Если файл содержит некорректный JSON или является поврежденным архивом (`compressed_io.DecompressionError`).
         """
         try:
-            with self.file_path.open('r') as f:
-                data = json.load(f)
-                return self._process_data(data)
+            result = self._cached(self.file_path, self._process_file)
         except (IOError, OSError) as e:
             logger.error(f"Ошибка при обработке файла: {e}")
             return SumResult(total=0.0, count=0, incorrect_count=0)
+        self.log_invalid_values(self.file_path)
+        return result
+
+    def _process_file(self) -> SumResult:
+        with metrics.stage(STAGE_OPEN, self.file_path):
+            f = open_input(self.file_path)
+        with f:
+            return self.process_stream(f)
+
+    def process_stream(self, f: TextIO, initial: Optional[SumResult] = None) -> SumResult:
+        """
+        Обрабатывает JSON-данные из уже открытого текстового потока (например, содержимого, прочитанного заранее).
+
+        Args:
+            f (TextIO): Текстовый поток с JSON-данными.
+            initial (Optional[SumResult]): Результат по предыдущей части данных, см. `DataHandler._process_data`.
+
+        Returns:
+            SumResult: Результат суммирования.
+        """
+        return self._process_data(self._iter_items(f), initial)
+
+    def iter_values(self) -> Iterator[Optional[float]]:
+        """
+        Выдает разобранные значения файла по порядку, None — на месте некорректных (например, для записи
+        в колоночный формат, см. `columnar_writer`).
+        """
+        with open_input(self.file_path) as f:
+            yield from map(self._process_item, self._iter_items(f))
+
+    def _iter_items(self, f: TextIO) -> Iterator[Any]:
+        """
+        Выдает элементы JSON-документа по мере их декодирования.
+
+        Args:
+            f (TextIO): Открытый текстовый поток с JSON-данными.
+
+        Returns:
+            Iterator[Any]: Элементы массива верхнего уровня или значения строк NDJSON.
+        """
+        if self.json_lines:
+            return iter_json_lines(f)
+        return iter_json_array(f, self.chunk_size)
 
     def _process_item(self, item: Union[int, float, str]) -> Optional[float]:
-        try:
-            return float(item)
-        except (ValueError, TypeError):
-            return None
+        return parse_value(item)
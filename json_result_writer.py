@@ -2,6 +2,8 @@ import json
 from pathlib import Path
 from typing import Optional
 from dataclasses import dataclass
+from instrumentation import STAGE_WRITE, metrics
+from sketches import Sketches
 
 @dataclass
 class SumResult:
@@ -9,7 +11,8 @@ class SumResult:
     count: int
     incorrect_count: int
 
-def write_json_results(file_path: Path, sum_result: SumResult, average_result: Optional[float]) -> None:
+def write_json_results(file_path: Path, sum_result: SumResult, average_result: Optional[float],
+                       sketches: Optional[Sketches] = None) -> None:
     """
     Записывает результаты суммирования и вычисления среднего арифметического в JSON файл.
 
@@ -17,16 +20,22 @@ def write_json_results(file_path: Path, sum_result: SumResult, average_result: O
         file_path (Path): Путь к файлу, в который будут записаны результаты.
         sum_result (SumResult): Результат суммирования.
         average_result (Optional[float]): Среднее арифметическое (может быть None, если нет корректных данных).
+        sketches (Optional[Sketches]): Скетчи, по которым в файл добавляются квантили и количество уникальных значений.
     """
     results = {
         "Сумма": sum_result.total,
         "Некорректные данные": sum_result.incorrect_count,
         "Среднее арифметическое": average_result if average_result is not None else "Нет данных"
     }
+    if sketches is not None:
+        report = sketches.report()
+        results["Количество уникальных значений"] = report.pop("distinct")
+        results["Квантили"] = report
 
-    try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=4)
-        print(f"Результаты записаны в файл: {file_path}")
-    except (IOError, OSError) as e:
-        print(f"Ошибка при записи в файл: {e}")
+    with metrics.stage(STAGE_WRITE, file_path):
+        try:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=4)
+            print(f"Результаты записаны в файл: {file_path}")
+        except (IOError, OSError) as e:
+            print(f"Ошибка при записи в файл: {e}")
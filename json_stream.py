@@ -0,0 +1,156 @@
+import json
+from typing import Any, Iterator, TextIO
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",]"
+# Самый длинный токен, который может быть оборван границей порции, не считая строк: '-Infinity'
+_MAX_PARTIAL_TOKEN = len("-Infinity")
+_decoder = json.JSONDecoder()
+
+
+def _is_truncated(error: json.JSONDecodeError) -> bool:
+    """
+    Проверяет, могла ли ошибка декодирования возникнуть из-за того, что значение оборвано концом буфера:
+    незакрытая строка или короткий хвост без разделителей (начало литерала, числа или escape-последовательности).
+    Ошибка в середине буфера (например, `[1, foo, 2]`) не исправится подчитыванием данных.
+    """
+    if error.msg.startswith("Unterminated string"):
+        return True
+    tail = error.doc[error.pos:]
+    return len(tail) <= _MAX_PARTIAL_TOKEN and not any(char in _DELIMITERS for char in tail)
+
+
+class _ChunkReader:
+    """
+    Буфер над текстовым потоком, который подчитывает данные порциями по мере необходимости.
+    """
+    def __init__(self, f: TextIO, chunk_size: int) -> None:
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """
+        Дочитывает очередную порцию данных, отбрасывая уже разобранную часть буфера.
+
+        Returns:
+            bool: False, если поток закончился.
+        """
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def skip_whitespace(self) -> str:
+        """
+        Пропускает пробельные символы и возвращает следующий символ (пустую строку в конце потока).
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def decode_value(self) -> Any:
+        """
+        Декодирует очередное JSON-значение, при необходимости подчитывая данные.
+
+        Если за значением нет разделителя (например, конец буфера или "." внутри числа),
+        значение декодируется повторно после подчитывания: иначе число, разрезанное
+        границей порции, было бы прочитано не целиком. Ошибка декодирования приводит к подчитыванию,
+        только если значение оборвано концом буфера; иначе она сразу передается вызывающему коду,
+        чтобы некорректный документ не читался в память целиком.
+        """
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if _is_truncated(e) and self.fill():
+                    continue
+                raise
+            if (end == len(self.buffer) or self.buffer[end] not in _DELIMITERS) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(f: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Инкрементально разбирает JSON-документ и выдает элементы массива верхнего уровня по одному.
+
+    Память ограничена размером порции и самым большим элементом массива. Если документ
+    не является массивом, он разбирается целиком, как это делает `json.load`, и выдаются
+    элементы получившегося объекта (например, ключи словаря).
+
+    Args:
+        f (TextIO): Открытый текстовый поток с JSON-документом.
+        chunk_size (int): Размер порции чтения в символах.
+
+    Returns:
+        Iterator[Any]: Элементы массива верхнего уровня.
+
+    Raises:
+        json.JSONDecodeError: Если документ некорректен.
+        ValueError: Если документ — число, логическое значение или null, по которым нельзя итерироваться.
+    """
+    reader = _ChunkReader(f, chunk_size)
+    if reader.skip_whitespace() != "[":
+        reader.buffer = reader.buffer[reader.pos:] + f.read()
+        reader.pos = 0
+        document = json.loads(reader.buffer)
+        try:
+            items = iter(document)
+        except TypeError:
+            raise ValueError(f"JSON-документ должен быть массивом, получено значение типа "
+                             f"{type(document).__name__}.") from None
+        yield from items
+        return
+
+    reader.pos += 1
+    if reader.skip_whitespace() == "]":
+        reader.pos += 1
+    else:
+        while True:
+            yield reader.decode_value()
+            char = reader.skip_whitespace()
+            reader.pos += 1
+            if char == "]":
+                break
+            if char != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", reader.buffer, reader.pos - 1)
+            reader.skip_whitespace()
+
+    if reader.skip_whitespace():
+        raise json.JSONDecodeError("Extra data", reader.buffer, reader.pos)
+
+
+def iter_json_lines(f: TextIO) -> Iterator[Any]:
+    """
+    Разбирает NDJSON (JSON Lines): каждая непустая строка — отдельное значение.
+
+    Строки, которые не удается декодировать, выдаются как None и считаются некорректными данными.
+
+    Args:
+        f (TextIO): Открытый текстовый поток с NDJSON-данными.
+
+    Returns:
+        Iterator[Any]: Значения из строк файла.
+    """
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            yield None
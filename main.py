@@ -1,15 +1,48 @@
+import argparse
 import logging
+import time
 from pathlib import Path
+from typing import List, Optional
 from json_data_handler import JSONDataHandler
 from csv_data_handler import CSVDataHandler
 from json_result_writer import write_json_results
 from csv_result_writer import write_csv_results
 from logger_config import setup_logger
+from instrumentation import export_metrics, profiling
+from batch_processor import EXECUTORS, EXECUTOR_THREAD, collect_files, process_files, result_path
+from data_handler import ENGINES, ENGINE_PYTHON
+from async_pipeline import DEFAULT_READ_WORKERS, run_pipeline
+from result_cache import DEFAULT_CACHE_PATH, DEFAULT_MAX_ENTRIES, ResultCache
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Суммирование числовых данных из JSON- и CSV-файлов.")
+    parser.add_argument('inputs', nargs='*',
+                        help="Файлы, каталоги или glob-шаблоны. Без аргументов обрабатываются data.json и data.csv.")
+    parser.add_argument('--workers', type=int, default=1, help="Размер пула обработки файлов.")
+    parser.add_argument('--executor', choices=EXECUTORS, default=EXECUTOR_THREAD, help="Тип пула: потоки или процессы.")
+    parser.add_argument('--engine', choices=ENGINES, default=ENGINE_PYTHON, help="Движок суммирования.")
+    parser.add_argument('--output-dir', type=Path, default=Path('results'), help="Каталог для файлов результатов.")
+    parser.add_argument('--format', choices=('json', 'csv'), default='json', help="Формат файлов результатов.")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Асинхронный конвейер: чтение, разбор и запись результатов перекрываются во времени.")
+    parser.add_argument('--read-workers', type=int, default=DEFAULT_READ_WORKERS,
+                        help="Количество одновременных чтений в режиме --pipeline.")
+    parser.add_argument('--cache', nargs='?', type=Path, const=DEFAULT_CACHE_PATH, default=None,
+                        help=f"Кеш результатов: неизменившиеся файлы не обрабатываются повторно (по умолчанию {DEFAULT_CACHE_PATH}).")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_ENTRIES, help="Максимальное количество записей кеша.")
+    parser.add_argument('--cache-hash', action='store_true',
+                        help="Сверять хеш содержимого, если у файла изменилось только время изменения.")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="Удалить из кеша записи для переданных файлов (или весь кеш) и завершить работу.")
+    return parser.parse_args(argv)
+
+
+def average(sum_result) -> Optional[float]:
+    return sum_result.total / sum_result.count if sum_result.count > 0 else None
 
-def main():
-    setup_logger('logging_config.yaml')
-    logger = logging.getLogger(__name__)
 
+def run_default(cache: Optional[ResultCache] = None) -> None:
     # Путь к файлам данных (можно изменить на нужные вам)
     json_file_path = Path('data.json')  # Замените на ваш JSON файл
     csv_file_path = Path('data.csv')  # Замените на ваш CSV файл
@@ -17,14 +50,14 @@ def main():
     csv_output_file_path = Path('csv_results.csv')  # Файл для записи результатов в CSV
 
     # Обработка данных из JSON
-    json_handler = JSONDataHandler(json_file_path)
+    json_handler = JSONDataHandler(json_file_path, cache=cache)
     sum_result_json = json_handler.process_data()
-    average_result_json = sum_result_json.total / sum_result_json.count if sum_result_json.count > 0 else None
+    average_result_json = average(sum_result_json)
 
     # Обработка данных из CSV
-    csv_handler = CSVDataHandler(csv_file_path)
+    csv_handler = CSVDataHandler(csv_file_path, cache=cache)
     sum_result_csv = csv_handler.process_data()
-    average_result_csv = sum_result_csv.total / sum_result_csv.count if sum_result_csv.count > 0 else None
+    average_result_csv = average(sum_result_csv)
 
     # Запись результатов в файл
     write_json_results(json_output_file_path, sum_result_json, average_result_json)
@@ -32,6 +65,72 @@ def main():
 
     logging.info(f"Результаты записаны в файлы: {json_output_file_path} и {csv_output_file_path}")
 
+
+def run_batch(args: argparse.Namespace, cache: Optional[ResultCache] = None) -> None:
+    logger = logging.getLogger(__name__)
+    start = time.perf_counter()
+
+    paths = collect_files(args.inputs)
+    if not paths:
+        logger.warning("Не найдено ни одного файла для обработки.")
+        return
+
+    writer = write_json_results if args.format == 'json' else write_csv_results
+    suffix = f".{args.format}"
+    if args.pipeline:
+        batch = run_pipeline(paths, args.output_dir, writer, suffix, read_workers=args.read_workers,
+                             parse_workers=args.workers, parse_executor=args.executor, cache=cache,
+                             engine=args.engine)
+    else:
+        batch = process_files(paths, workers=args.workers, executor=args.executor, cache=cache, engine=args.engine)
+        for path, sum_result in batch.results:
+            output_path = result_path(args.output_dir, path, suffix)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            writer(output_path, sum_result, average(sum_result))
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    writer(args.output_dir / f"aggregate_results{suffix}", batch.total, average(batch.total))
+
+    elapsed = time.perf_counter() - start
+    message = f"Обработано файлов: {len(batch.results)} за {elapsed:.3f} с ({len(batch.results) / elapsed:.1f} файлов/с"
+    if not args.pipeline:
+        # В конвейере запись идет параллельно с разбором, поэтому отдельно без нее время не измеряется
+        message += f", без учета записи: {batch.files_per_second:.1f} файлов/с"
+    logger.info(message + ").")
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    setup_logger('logging_config.yaml')
+    logger = logging.getLogger(__name__)
+
+    cache = None
+    if args.cache is not None or args.clear_cache:
+        cache = ResultCache(args.cache or DEFAULT_CACHE_PATH, max_entries=args.cache_size, use_hash=args.cache_hash)
+
+    if args.clear_cache:
+        if args.inputs:
+            removed = sum(cache.invalidate(path) for path in collect_files(args.inputs))
+        else:
+            removed = cache.invalidate()
+        cache.save()
+        logger.info(f"Удалено записей кеша: {removed}")
+        return
+
+    with profiling():
+        if args.inputs:
+            run_batch(args, cache)
+        else:
+            run_default(cache)
+
+    metrics_path = export_metrics()
+    if metrics_path is not None:
+        logger.info(f"Метрики записаны в файл: {metrics_path}")
+
+    if cache is not None:
+        cache.save()
+        logger.info(f"Кеш результатов: попаданий {cache.hits}, промахов {cache.misses}, записей {len(cache)}.")
+
     logger.info("Обработка данных завершена.")
 
 if __name__ == "__main__":
@@ -0,0 +1,162 @@
+"""
+Быстрый разбор числовых CSV-файлов напрямую по байтам отображенного в память файла.
+
+Файл отображается через `mmap` и просматривается через `memoryview` небольшими блоками (`DEFAULT_BLOCK_SIZE`),
+выровненными по границам строк. Внутри блока разделители заменяются и режутся встроенными методами `bytes`
+(на уровне C), а числа разбираются `float()` прямо из байтовых токенов — без декодирования в `str`,
+без `csv.reader` и без списков строк.
+
+Это не разбор без копирования: блок копируется из отображения в `bytes`, а замена разделителей и `split`
+создают по объекту на токен. Поэтому размер блока невелик: память на разбор ограничена несколькими размерами
+блока независимо от размера файла.
+
+Результат совпадает с обычным разбором CSV-файлов без кавычек, выполненным с тем же разбиением на диапазоны
+(последовательным или параллельным); блоки с кавычками должны разбираться обычным путем
+(`sum_numeric_block` возвращает для них None). `float()` от байтов понимает только ASCII, поэтому токены,
+которые он отверг, декодируются и разбираются повторно как строки — так же, как на обычном пути
+(например, числа из арабско-индийских или полноширинных цифр).
+"""
+import locale
+import math
+import mmap
+import operator
+from array import array
+from functools import reduce
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+from data_handler import SumResult
+
+DEFAULT_BLOCK_SIZE = 256 * 1024
+_MADV_DONTNEED = getattr(mmap, 'MADV_DONTNEED', None)
+
+
+def iter_blocks(mm: Union[mmap.mmap, bytes], block_size: int = DEFAULT_BLOCK_SIZE, start: int = 0,
+                end: Optional[int] = None) -> Iterator[memoryview]:
+    """
+    Нарезает диапазон [start, end) отображенного файла на блоки около `block_size` байтов, каждый из которых
+    заканчивается на границе строки (кроме последнего). Блоки — срезы `memoryview` без копирования; срез
+    освобождается, когда запрашивается следующий блок, поэтому хранить его дольше нельзя.
+
+    Страницы отображения, которые уже просмотрены, отдаются системе (`MADV_DONTNEED`, где он есть): иначе
+    прочитанная часть файла оставалась бы в RSS процесса, и пиковая память росла бы с размером файла.
+    """
+    end = len(mm) if end is None else end
+    release = isinstance(mm, mmap.mmap) and _MADV_DONTNEED is not None
+    released = start - start % mmap.PAGESIZE
+    with memoryview(mm) as view:
+        while start < end:
+            stop = mm.rfind(b'\n', start, start + block_size) + 1 if start + block_size < end else end
+            if stop <= start:
+                stop = mm.find(b'\n', start + block_size, end)
+                stop = end if stop == -1 else stop + 1
+            with view[start:stop] as block:
+                yield block
+            start = stop
+            if release and stop - released >= block_size:
+                page_end = stop - stop % mmap.PAGESIZE
+                if page_end > released:
+                    mm.madvise(_MADV_DONTNEED, released, page_end - released)
+                    released = page_end
+
+
+def sum_numeric_block(block: Union[bytes, memoryview], initial: SumResult,
+                      on_invalid: Optional[Callable[[str, int], None]] = None,
+                      encoding: Optional[str] = None) -> Optional[SumResult]:
+    """
+    Суммирует числа в блоке CSV-данных, продолжая с результата `initial`.
+
+    Токены блока сначала суммируются `reduce` по `map(float, ...)`. Если float() отверг токен, блок
+    конвертируется в `array('d')` через `_parse_tokens`: отдельно разбираются только отвергнутые токены,
+    а на месте некорректных записывается 0.0 — прибавление нуля не меняет сумму. В обоих случаях порядок сложения
+    тот же, что и при поэлементной обработке.
+
+    Args:
+        block (Union[bytes, memoryview]): Блок из целых строк.
+        initial (SumResult): Результат по предыдущим блокам.
+        on_invalid (Optional[Callable[[str, int], None]]): Вызывается для каждого некорректного токена
+            с его позицией в файле.
+        encoding (Optional[str]): Кодировка файла для токенов, которые не разобрались как ASCII;
+            по умолчанию — та же, что у обычного пути (`locale.getpreferredencoding(False)`).
+
+    Returns:
+        Optional[SumResult]: Результат или None, если в блоке есть кавычки и его нужно разобрать обычным путем.
+
+    Raises:
+        UnicodeDecodeError: Если такой токен не декодируется (обычный путь тоже не может прочитать файл).
+    """
+    data = bytes(block)
+    if b'"' in data:
+        return None
+    if b'\r' in data:
+        data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    while b'\n\n' in data:
+        data = data.replace(b'\n\n', b'\n')
+    data = data.strip(b'\n')
+    if not data:
+        return initial
+
+    encoding = encoding or locale.getpreferredencoding(False)
+    first = initial.count + initial.incorrect_count
+    tokens = data.replace(b'\n', b',').split(b',')
+    incorrect_count = initial.incorrect_count
+    values = None
+    try:
+        total = reduce(operator.add, map(float, tokens), initial.total)
+    except ValueError:
+        values, invalid = _parse_tokens(tokens, first, encoding, on_invalid)
+        incorrect_count += invalid
+        total = reduce(operator.add, values, initial.total)
+    # Неконечная сумма — признак NaN или бесконечности среди токенов (или переполнения): значения проверяются
+    # поэлементно
+    if not math.isfinite(total) and math.isfinite(initial.total):
+        if values is None:
+            values = array('d', map(float, tokens))
+        total = initial.total
+        for position, value in enumerate(values):
+            if math.isfinite(value):
+                total += value
+                continue
+            if on_invalid is not None:
+                on_invalid(tokens[position].decode(encoding), first + position)
+            incorrect_count += 1
+    return SumResult(total=total, count=first + len(tokens) - incorrect_count, incorrect_count=incorrect_count)
+
+
+def _parse_tokens(tokens: List[bytes], first: int, encoding: str,
+                  on_invalid: Optional[Callable[[str, int], None]]) -> Tuple[array, int]:
+    """
+    Конвертирует токены в `array('d')`, разбирая отдельно только те, которые float() отверг.
+
+    Returns:
+        Tuple[array, int]: Значения (0.0 на месте некорректных токенов) и количество некорректных токенов.
+    """
+    values = array('d')
+    items = iter(tokens)
+    incorrect_count = 0
+    while True:
+        try:
+            values.extend(map(float, items))  # уже добавленные значения остаются в массиве и при ошибке
+            return values, incorrect_count
+        except ValueError:
+            position = len(values)
+            text = tokens[position].decode(encoding)
+            try:
+                value = float(text)
+            except ValueError:
+                value = math.nan
+            if not math.isfinite(value):
+                if on_invalid is not None:
+                    on_invalid(text, first + position)
+                incorrect_count += 1
+                value = 0.0
+            values.append(value)
+
+
+def open_mmap(file_path: Path) -> Optional[mmap.mmap]:
+    """
+    Отображает файл в память только для чтения. Для пустого файла возвращает None.
+    """
+    with file_path.open('rb') as f:
+        if f.seek(0, 2) == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
@@ -0,0 +1,144 @@
+"""
+Векторизованный движок суммирования на NumPy.
+
+NumPy — необязательная зависимость: если он не установлен, `is_available()` возвращает False,
+и обработчики используют обычный цикл на чистом Python. NumPy импортируется при первом обращении
+к движку, поэтому с движком 'python' запуск не тратит время на его загрузку.
+"""
+import math
+from array import array
+from functools import lru_cache
+from itertools import islice
+from types import ModuleType
+from typing import TYPE_CHECKING, Any, Callable, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+DEFAULT_BATCH_SIZE = 64 * 1024
+
+
+@lru_cache(maxsize=None)
+def load_numpy() -> Optional[ModuleType]:
+    """
+    Импортирует NumPy при первом вызове.
+
+    Returns:
+        Optional[ModuleType]: Модуль numpy или None, если он не установлен.
+    """
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover - зависит от окружения
+        return None
+    return numpy
+
+
+def is_available() -> bool:
+    """
+    Проверяет, установлен ли NumPy.
+    """
+    return load_numpy() is not None
+
+
+def _to_array(batch: List[Any]) -> "np.ndarray":
+    """
+    Конвертирует пачку элементов в массив float64 за один проход: элементы, которые не удалось разобрать,
+    и None становятся NaN.
+
+    Сначала пачка конвертируется средствами NumPy целиком. Если в ней есть элемент, который NumPy не принимает,
+    элементы конвертируются через `map(float, ...)` в `array('d')`: после ошибки на месте элемента записывается
+    NaN, и конвертация продолжается со следующего элемента, так что на Python обрабатываются только ошибки.
+    NumPy разбирает строки тем же float(), поэтому результат не зависит от того, какой путь сработал.
+    """
+    np = load_numpy()
+    try:
+        values = np.array(batch, dtype=np.float64)
+    except (ValueError, TypeError, OverflowError):
+        pass
+    else:
+        if values.shape == (len(batch),):
+            return values
+    buffer = array('d')
+    items = iter(batch)
+    while True:
+        try:
+            buffer.extend(map(float, items))  # уже добавленные значения остаются в буфере и при ошибке
+            break
+        except (ValueError, TypeError, OverflowError):
+            buffer.append(math.nan)
+    return np.frombuffer(buffer, dtype=np.float64)
+
+
+def _valid_values(batch: List[Any], process_item: Callable[[Any], Optional[float]],
+                  on_invalid: Optional[Callable[[Any, int], None]] = None,
+                  offset: int = 0) -> Tuple["np.ndarray", int]:
+    """
+    Возвращает массив корректных значений пачки и количество отброшенных некорректных элементов.
+
+    Пачка разбирается один раз в массив значений и маску конечных значений (`np.isfinite`). Через
+    `process_item` поэлементно проверяются только элементы вне маски (None, нечисловые строки, NaN
+    и бесконечности, другие типы); некорректные передаются в `on_invalid` вместе с позицией (номер
+    в пачке плюс `offset`).
+    """
+    np = load_numpy()
+    values = _to_array(batch)
+    valid = np.isfinite(values)
+    if valid.all():
+        return values, 0
+
+    incorrect_count = 0
+    for position in np.flatnonzero(~valid).tolist():
+        raw = batch[position]
+        item = process_item(raw)
+        if item is None:
+            incorrect_count += 1
+            if on_invalid is not None:
+                on_invalid(raw, offset + position)
+        else:
+            values[position] = item
+            valid[position] = True
+    return values[valid], incorrect_count
+
+
+def sum_batches(data: Iterable[Any], process_item: Callable[[Any], Optional[float]],
+                batch_size: int = DEFAULT_BATCH_SIZE,
+                on_values: Optional[Callable[[List[float]], None]] = None,
+                on_invalid: Optional[Callable[[Any, int], None]] = None) -> Tuple[float, int, int]:
+    """
+    Суммирует данные пачками: каждая пачка превращается в массив float64 без некорректных элементов,
+    а сумма считается через `np.sum`.
+
+    Поэлементно на Python обрабатываются только некорректные элементы, поэтому доля некорректных значений
+    замедляет движок пропорционально их количеству, а не размеру пачек, в которых они встретились.
+
+    Args:
+        data (Iterable[Any]): Исходные элементы.
+        process_item (Callable[[Any], Optional[float]]): Поэлементное преобразование для элементов,
+            которые не удалось сконвертировать векторно.
+        batch_size (int): Размер пачки.
+        on_values (Optional[Callable[[List[float]], None]]): Вызывается с корректными значениями каждой пачки
+            (например, для заполнения скетчей).
+        on_invalid (Optional[Callable[[Any, int], None]]): Вызывается для каждого некорректного элемента
+            с его позицией в данных.
+
+    Returns:
+        Tuple[float, int, int]: Сумма, количество корректных и количество некорректных элементов.
+    """
+    np = load_numpy()
+    total_sum = 0.0
+    count = 0
+    incorrect_count = 0
+
+    iterator = iter(data)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            break
+        values, batch_incorrect = _valid_values(batch, process_item, on_invalid, count + incorrect_count)
+        total_sum += float(np.sum(values))
+        if on_values is not None:
+            on_values(values.tolist())
+        count += len(values)
+        incorrect_count += batch_incorrect
+
+    return total_sum, count, incorrect_count
@@ -0,0 +1,209 @@
+"""
+Постоянный кеш результатов суммирования, чтобы не обрабатывать повторно неизменившиеся файлы.
+
+Запись кеша привязана к пути файла и пространству имен (имени обработчика) и хранит размер и время
+изменения файла, а при `use_hash=True` — еще и SHA-256 содержимого. Если размер или время изменения
+не совпадают, файл считается измененным; с хешем файл, у которого изменилось только время изменения
+(например, после повторной выгрузки того же содержимого), по-прежнему берется из кеша.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+from data_handler import SumResult
+from invalid_values import InvalidValueReport
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path('.datastats_cache.json')
+DEFAULT_MAX_ENTRIES = 100_000
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_digest(file_path: Path) -> str:
+    """
+    Вычисляет SHA-256 содержимого файла, читая его блоками.
+    """
+    digest = hashlib.sha256()
+    with file_path.open('rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Кеш результатов с вытеснением давно не использованных записей (LRU) и счетчиками попаданий и промахов.
+
+    Изменения сохраняются на диск вызовом `save()`. Методы потокобезопасны.
+    """
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 use_hash: bool = False) -> None:
+        """
+        Args:
+            path (Path): Файл, в котором хранится кеш.
+            max_entries (int): Максимальное количество записей.
+            use_hash (bool): Сверять ли дополнительно хеш содержимого файла.
+        """
+        if max_entries <= 0:
+            raise ValueError("Максимальное количество записей кеша должно быть положительным.")
+        self.path = path
+        self.max_entries = max_entries
+        self.use_hash = use_hash
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with self.path.open('r', encoding='utf-8') as f:
+                self._entries = OrderedDict(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (IOError, OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать кеш {self.path}, он будет создан заново: {e}")
+
+    @staticmethod
+    def _key(file_path: Path, namespace: str) -> str:
+        return f"{namespace}:{file_path.resolve()}"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, file_path: Path, namespace: str,
+            invalid_values: Optional[InvalidValueReport] = None) -> Optional[SumResult]:
+        """
+        Возвращает сохраненный результат для файла, если файл не изменился.
+
+        Args:
+            file_path (Path): Путь к входному файлу.
+            namespace (str): Пространство имен (обычно имя класса обработчика).
+            invalid_values (Optional[InvalidValueReport]): Отчет, в который при попадании добавляются
+                некорректные значения, сохраненные вместе с результатом.
+
+        Returns:
+            Optional[SumResult]: Результат или None при промахе.
+        """
+        key = self._key(file_path, namespace)
+        try:
+            stat = file_path.stat()
+        except OSError:
+            stat = None
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and stat is not None and entry["size"] == stat.st_size:
+            fresh = entry["mtime_ns"] == stat.st_mtime_ns
+            if not fresh and self.use_hash and entry.get("sha256"):
+                try:
+                    fresh = file_digest(file_path) == entry["sha256"]
+                except OSError:
+                    fresh = False
+                if fresh:
+                    entry["mtime_ns"] = stat.st_mtime_ns
+            if fresh:
+                with self._lock:
+                    self.hits += 1
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                if invalid_values is not None and entry.get("invalid_values") is not None:
+                    invalid_values.merge(InvalidValueReport.from_dict(entry["invalid_values"],
+                                                                      invalid_values.sample_size))
+                return SumResult(total=entry["total"], count=entry["count"], incorrect_count=entry["incorrect_count"])
+
+        with self._lock:
+            self.misses += 1
+            if entry is not None:
+                self._entries.pop(key, None)
+        return None
+
+    def fingerprint(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """
+        Снимает отпечаток файла (размер, время изменения и, при `use_hash=True`, SHA-256) для `put`.
+
+        Отпечаток нужно снимать до обработки файла: если файл дописывается во время обработки, запись
+        с отпечатком после обработки связала бы новый размер со старой суммой.
+
+        Returns:
+            Optional[Dict[str, Any]]: Отпечаток или None, если файл недоступен.
+        """
+        try:
+            stat = file_path.stat()
+            digest = file_digest(file_path) if self.use_hash else None
+        except OSError:
+            return None
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+
+    def put(self, file_path: Path, namespace: str, sum_result: SumResult,
+            fingerprint: Optional[Dict[str, Any]] = None,
+            invalid_values: Optional[InvalidValueReport] = None) -> None:
+        """
+        Сохраняет результат для файла. Если файл недоступен, результат не сохраняется.
+
+        Args:
+            file_path (Path): Путь к входному файлу.
+            namespace (str): Пространство имен (обычно имя класса обработчика).
+            sum_result (SumResult): Результат суммирования.
+            fingerprint (Optional[Dict[str, Any]]): Отпечаток файла, снятый `fingerprint()` до обработки;
+                если не задан, снимается в момент вызова.
+            invalid_values (Optional[InvalidValueReport]): Отчет о некорректных значениях файла,
+                который сохраняется вместе с результатом и восстанавливается в `get`.
+        """
+        if fingerprint is None:
+            fingerprint = self.fingerprint(file_path)
+            if fingerprint is None:
+                return
+        entry = {
+            **fingerprint,
+            "total": sum_result.total,
+            "count": sum_result.count,
+            "incorrect_count": sum_result.incorrect_count,
+            "average": sum_result.total / sum_result.count if sum_result.count > 0 else None,
+            "invalid_values": invalid_values.to_dict() if invalid_values is not None else None,
+        }
+        key = self._key(file_path, namespace)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, file_path: Optional[Path] = None) -> int:
+        """
+        Удаляет записи для файла (во всех пространствах имен) или, если файл не указан, очищает кеш целиком.
+
+        Args:
+            file_path (Optional[Path]): Путь к входному файлу.
+
+        Returns:
+            int: Количество удаленных записей.
+        """
+        with self._lock:
+            if file_path is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            suffix = f":{file_path.resolve()}"
+            keys = [key for key in self._entries if key.endswith(suffix)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def save(self) -> None:
+        """
+        Атомарно записывает кеш на диск (через временный файл).
+        """
+        with self._lock:
+            data = list(self._entries.items())
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with temp_path.open('w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+        except (IOError, OSError) as e:
+            logger.error(f"Ошибка при записи кеша {self.path}: {e}")
@@ -0,0 +1,148 @@
+import math
+from typing import Any, Dict, Optional
+
+
+class RunningStats:
+    """
+    Потоковая статистика с O(1) памятью.
+
+    Сумма накапливается с компенсацией ошибок округления (алгоритм Ноймайера), среднее и центральные
+    моменты до четвертого порядка — по формулам Уэлфорда. Метод `merge` объединяет статистики, собранные
+    по частям данных (в разных потоках или процессах), по формулам Чана и Пебая, поэтому результат
+    не зависит от того, как данные были разбиты.
+    """
+    def __init__(self) -> None:
+        self.count: int = 0
+        self._sum: float = 0.0
+        self._compensation: float = 0.0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+        self.mean: float = 0.0
+        self._m2: float = 0.0
+        self._m3: float = 0.0
+        self._m4: float = 0.0
+
+    def _add_to_sum(self, value: float) -> None:
+        total = self._sum + value
+        if abs(self._sum) >= abs(value):
+            self._compensation += (self._sum - total) + value
+        else:
+            self._compensation += (value - total) + self._sum
+        self._sum = total
+
+    def add(self, value: float) -> None:
+        """
+        Добавляет значение.
+
+        Args:
+            value (float): Корректное числовое значение.
+        """
+        self._add_to_sum(value)
+        if self.count == 0:
+            self.minimum = self.maximum = value
+        elif value < self.minimum:
+            self.minimum = value
+        elif value > self.maximum:
+            self.maximum = value
+
+        n1 = self.count
+        self.count += 1
+        n = self.count
+        delta = value - self.mean
+        delta_n = delta / n
+        delta_n2 = delta_n * delta_n
+        term1 = delta * delta_n * n1
+        self.mean += delta_n
+        self._m4 += term1 * delta_n2 * (n * n - 3 * n + 3) + 6 * delta_n2 * self._m2 - 4 * delta_n * self._m3
+        self._m3 += term1 * delta_n * (n - 2) - 3 * delta_n * self._m2
+        self._m2 += term1
+
+    def merge(self, other: "RunningStats") -> None:
+        """
+        Добавляет к текущей статистике статистику другой части данных.
+
+        Args:
+            other (RunningStats): Статистика другой части данных.
+        """
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return
+
+        self._add_to_sum(other._sum)
+        self._add_to_sum(other._compensation)
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+        na, nb = self.count, other.count
+        n = na + nb
+        delta = other.mean - self.mean
+        delta2 = delta * delta
+        m2a, m3a = self._m2, self._m3
+
+        self._m4 += (other._m4
+                     + delta2 * delta2 * na * nb * (na * na - na * nb + nb * nb) / (n ** 3)
+                     + 6 * delta2 * (na * na * other._m2 + nb * nb * m2a) / (n * n)
+                     + 4 * delta * (na * other._m3 - nb * m3a) / n)
+        self._m3 += (other._m3
+                     + delta2 * delta * na * nb * (na - nb) / (n * n)
+                     + 3 * delta * (na * other._m2 - nb * m2a) / n)
+        self._m2 += other._m2 + delta2 * na * nb / n
+        self.mean += delta * nb / n
+        self.count = n
+
+    @property
+    def total(self) -> float:
+        """
+        Сумма значений с учетом компенсации ошибок округления.
+        """
+        return self._sum + self._compensation
+
+    @property
+    def variance(self) -> Optional[float]:
+        """
+        Дисперсия генеральной совокупности (деление на n) или None, если значений нет.
+        """
+        return self._m2 / self.count if self.count > 0 else None
+
+    @property
+    def stddev(self) -> Optional[float]:
+        """
+        Стандартное отклонение генеральной совокупности или None, если значений нет.
+        """
+        variance = self.variance
+        return math.sqrt(variance) if variance is not None else None
+
+    @property
+    def skewness(self) -> Optional[float]:
+        """
+        Коэффициент асимметрии или None, если дисперсия равна нулю.
+        """
+        if self.count == 0 or self._m2 == 0:
+            return None
+        return math.sqrt(self.count) * self._m3 / self._m2 ** 1.5
+
+    @property
+    def kurtosis(self) -> Optional[float]:
+        """
+        Коэффициент эксцесса (для нормального распределения равен 0) или None, если дисперсия равна нулю.
+        """
+        if self.count == 0 or self._m2 == 0:
+            return None
+        return self.count * self._m4 / (self._m2 * self._m2) - 3.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Сериализует состояние в словарь, пригодный для JSON.
+        """
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "RunningStats":
+        """
+        Восстанавливает состояние из словаря, полученного через `to_dict`.
+        """
+        stats = cls()
+        stats.__dict__.update(state)
+        return stats
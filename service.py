@@ -0,0 +1,482 @@
+"""
+Резидентный сервис: принимает пути к файлам или содержимое файлов по HTTP (TCP или Unix-сокет)
+и возвращает результат суммирования в формате JSON.
+
+Интерпретатор, модули и пул обработки запускаются один раз, поэтому запрос не платит за старт `python main.py`,
+импорт `yaml` и настройку логирования. Одновременные небольшие запросы собираются в пачки (до `max_batch_size`
+запросов или `max_delay` секунд ожидания) и обрабатываются одним заданием пула; большие файлы и тела запросов
+отправляются в пул по отдельности.
+
+Запросы:
+    GET  /health                         — состояние сервиса;
+    POST /files  {"path": "data.csv", "engine": "python"} — обработка файла внутри каталога `root`;
+    POST /data?format=csv&engine=numpy   — обработка тела запроса (поддерживается сжатие gzip, bzip2, zstd).
+
+Ответ: {"total": ..., "count": ..., "incorrect_count": ..., "average": ...}.
+
+Пример:
+    python service.py --port 8080 --workers 4
+    python service.py --unix-socket /tmp/datastats.sock
+    curl -s --data-binary @data.csv 'http://127.0.0.1:8080/data?format=csv'
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import queue
+import signal
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from async_pipeline import _parse_payload
+from columnar_writer import PARQUET_SUFFIX
+from batch_processor import EXECUTORS, EXECUTOR_PROCESS, HANDLERS, _process_file, is_supported
+from data_handler import ENGINES, SumResult
+from instrumentation import Snapshot, init_worker, metrics
+from logger_config import setup_logger
+import numpy_engine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_DELAY = 0.005
+DEFAULT_SMALL_REQUEST_SIZE = 1024 * 1024
+DEFAULT_MAX_BODY_SIZE = 256 * 1024 * 1024
+DEFAULT_LISTEN_BACKLOG = 128
+
+FORMATS = tuple(suffix.lstrip('.') for suffix in HANDLERS if suffix != PARQUET_SUFFIX)
+
+
+class ServiceError(Exception):
+    """
+    Ошибка запроса, которая возвращается клиенту с HTTP-статусом `status`.
+    """
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Request:
+    """
+    Задание на обработку: файл `path` или, если задано `payload`, содержимое (обработчик выбирается
+    по расширению `path`).
+    """
+    path: Path
+    payload: Optional[bytes] = None
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        if self.payload is not None:
+            return len(self.payload)
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+
+
+def _process_request(request: Request) -> Tuple[SumResult, bool]:
+    """
+    Обрабатывает один запрос пачки. Любая ошибка (например, RecursionError при разборе глубоко вложенного
+    JSON) относится только к этому запросу: остальные запросы пачки обрабатываются как обычно.
+    """
+    try:
+        if request.payload is None:
+            return _process_file(request.path, request.options)
+        return _parse_payload(request.path, request.payload, request.options)
+    except Exception as e:
+        logger.error(f"Непредвиденная ошибка при обработке запроса {request.path.name}: {e!r}")
+        return SumResult(total=0.0, count=0, incorrect_count=0), False
+
+
+def _process_batch(requests: List[Request], collect_metrics: bool) -> Tuple[List[Tuple[SumResult, bool]],
+                                                                          Optional[Snapshot]]:
+    """
+    Задание для пула: обрабатывает пачку запросов. В пуле процессов вместе с результатами возвращаются
+    метрики, накопленные в дочернем процессе.
+    """
+    results = [_process_request(request) for request in requests]
+    return results, metrics.snapshot(reset=True) if collect_metrics else None
+
+
+def _warm_up(barrier: Optional[threading.Barrier] = None) -> None:
+    """
+    Задание, которое заставляет пул запустить воркер заранее и импортирует в нем NumPy (если он установлен),
+    чтобы первый запрос с движком 'numpy' не платил за импорт.
+
+    В пуле потоков задания ждут друг друга на `barrier`: иначе пул отдал бы следующее задание уже освободившемуся
+    потоку и не запустил бы остальные. Пул процессов барьер не требует: запускающийся процесс не считается
+    свободным, поэтому каждое задание получает свой процесс.
+    """
+    numpy_engine.load_numpy()
+    if barrier is not None:
+        barrier.wait()
+
+
+class RequestBatcher:
+    """
+    Собирает одновременные запросы в пачки и отправляет каждую пачку в пул одним заданием.
+    """
+    def __init__(self, pool: Executor, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 max_delay: float = DEFAULT_MAX_DELAY, small_request_size: int = DEFAULT_SMALL_REQUEST_SIZE,
+                 collect_metrics: bool = False) -> None:
+        """
+        Args:
+            pool (Executor): Пул обработки.
+            max_batch_size (int): Максимальное количество запросов в пачке.
+            max_delay (float): Сколько секунд первый запрос пачки ждет попутчиков.
+            small_request_size (int): Запросы больше этого размера (в байтах) отправляются в пул по отдельности.
+            collect_metrics (bool): Объединять метрики, возвращенные заданиями (для пула процессов).
+        """
+        if max_batch_size <= 0 or max_delay < 0:
+            raise ValueError("Размер пачки должен быть положительным, а время ожидания — неотрицательным.")
+        self.pool = pool
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.small_request_size = small_request_size
+        self.collect_metrics = collect_metrics
+        self.batches = 0
+        self._queue: "queue.Queue[Optional[Tuple[Request, Future]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='datastats-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, request: Request) -> Future:
+        """
+        Ставит запрос в очередь.
+
+        Returns:
+            Future: Будущий результат: пара (SumResult, признак успешной обработки).
+        """
+        future: Future = Future()
+        if request.size > self.small_request_size:
+            self._dispatch([(request, future)])
+        else:
+            self._queue.put((request, future))
+        return future
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._dispatch(batch)
+                    return
+                batch.append(item)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[Tuple[Request, Future]]) -> None:
+        self.batches += 1
+        futures = [future for _, future in batch]
+        try:
+            task = self.pool.submit(_process_batch, [request for request, _ in batch], self.collect_metrics)
+        except RuntimeError as e:  # пул уже остановлен
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        def done(task: Future) -> None:
+            try:
+                results, snapshot = task.result()
+            except BaseException as e:
+                for future in futures:
+                    future.set_exception(e)
+                return
+            if snapshot is not None:
+                metrics.merge(snapshot)
+            for future, result in zip(futures, results):
+                future.set_result(result)
+        task.add_done_callback(done)
+
+
+class StatsService:
+    """
+    Пул обработки с предварительно запущенными воркерами и пакетной отправкой запросов.
+    """
+    def __init__(self, root: Path = Path('.'), workers: int = 1, executor: str = EXECUTOR_PROCESS,
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_delay: float = DEFAULT_MAX_DELAY,
+                 max_body_size: int = DEFAULT_MAX_BODY_SIZE) -> None:
+        """
+        Args:
+            root (Path): Каталог, за пределами которого файлы не обрабатываются.
+            workers (int): Размер пула обработки.
+            executor (str): Тип пула: 'thread' или 'process'.
+            max_batch_size (int): Максимальное количество запросов в пачке.
+            max_delay (float): Сколько секунд первый запрос пачки ждет попутчиков.
+            max_body_size (int): Максимальный размер тела запроса в байтах.
+        """
+        if executor not in EXECUTORS:
+            raise ValueError(f"Неизвестный тип пула: {executor}. Допустимые значения: {', '.join(EXECUTORS)}.")
+        if workers <= 0:
+            raise ValueError("Размер пула должен быть положительным.")
+        self.root = root.resolve()
+        self.workers = workers
+        self.max_body_size = max_body_size
+        if executor == EXECUTOR_PROCESS:
+            self.pool: Executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                                      initargs=(metrics.enabled,))
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=workers)
+        # Воркеры запускаются сразу, а не при первом запросе
+        barrier = threading.Barrier(workers) if executor != EXECUTOR_PROCESS else None
+        for task in [self.pool.submit(_warm_up, barrier) for _ in range(workers)]:
+            task.result()
+        self.batcher = RequestBatcher(self.pool, max_batch_size=max_batch_size, max_delay=max_delay,
+                                      collect_metrics=executor == EXECUTOR_PROCESS)
+
+    def resolve(self, path: str) -> Path:
+        """
+        Проверяет путь к файлу из запроса.
+
+        Raises:
+            ServiceError: Если файл находится вне каталога `root`, не существует или не поддерживается.
+        """
+        resolved = (self.root / path).resolve()
+        if resolved != self.root and self.root not in resolved.parents:
+            raise ServiceError(403, f"Файл вне каталога сервиса: {path}")
+        if not resolved.is_file():
+            raise ServiceError(404, f"Файл не найден: {path}")
+        if not is_supported(resolved):
+            raise ServiceError(400, f"Неподдерживаемый формат файла: {path}")
+        return resolved
+
+    def process(self, request: Request) -> SumResult:
+        """
+        Обрабатывает запрос в пуле и дожидается результата.
+
+        Raises:
+            ServiceError: Если данные не удалось обработать.
+        """
+        result, succeeded = self.batcher.submit(request).result()
+        if not succeeded:
+            raise ServiceError(422, f"Не удалось обработать данные: {request.path.name}")
+        return result
+
+    def close(self) -> None:
+        self.batcher.close()
+        self.pool.shutdown()
+
+
+def _parse_options(values: Dict[str, Any]) -> Dict[str, Any]:
+    engine = values.get('engine')
+    if engine is None:
+        return {}
+    if engine not in ENGINES:
+        raise ServiceError(400, f"Неизвестный движок: {engine}. Допустимые значения: {', '.join(ENGINES)}.")
+    return {'engine': engine}
+
+
+def result_to_dict(result: SumResult) -> Dict[str, Any]:
+    return {
+        "total": result.total,
+        "count": result.count,
+        "incorrect_count": result.incorrect_count,
+        "average": result.total / result.count if result.count > 0 else None,
+    }
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'DataStats'
+    protocol_version = 'HTTP/1.1'
+    # Заголовки и тело ответа отправляются одним пакетом (без задержки Nagle при отдельной записи тела)
+    wbufsize = -1
+
+    @property
+    def service(self) -> StatsService:
+        return self.server.service
+
+    def do_GET(self) -> None:
+        if urlsplit(self.path).path != '/health':
+            self._send_error(ServiceError(404, f"Неизвестный адрес: {self.path}"))
+            return
+        self._send_json(200, {"status": "ok", "workers": self.service.workers})
+
+    def do_POST(self) -> None:
+        url = urlsplit(self.path)
+        try:
+            body = self._read_body()
+            if url.path == '/files':
+                request = self._file_request(body)
+            elif url.path == '/data':
+                request = self._data_request(body, {key: values[-1] for key, values in parse_qs(url.query).items()})
+            else:
+                raise ServiceError(404, f"Неизвестный адрес: {url.path}")
+            result = self.service.process(request)
+        except ServiceError as e:
+            self._send_error(e)
+            return
+        except Exception:
+            logger.exception(f"Непредвиденная ошибка при обработке запроса {self.path}")
+            self._send_error(ServiceError(500, "Внутренняя ошибка сервиса."))
+            return
+        self._send_json(200, result_to_dict(result))
+
+    def _read_body(self) -> bytes:
+        """
+        Читает тело запроса. Если запрос отклонен до чтения тела, соединение закрывается после ответа:
+        иначе непрочитанное тело было бы разобрано как следующий запрос того же соединения.
+        """
+        try:
+            length = self._content_length()
+        except ServiceError:
+            self.close_connection = True
+            raise
+        return self.rfile.read(length)
+
+    def _content_length(self) -> int:
+        length = self.headers.get('Content-Length')
+        if length is None:
+            raise ServiceError(411, "Требуется заголовок Content-Length.")
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # Отрицательная длина превратилась бы в rfile.read(-1): чтение до закрытия соединения без ограничения
+            raise ServiceError(400, "Некорректный заголовок Content-Length.")
+        if length > self.service.max_body_size:
+            raise ServiceError(413, f"Тело запроса больше {self.service.max_body_size} байт.")
+        return length
+
+    def _file_request(self, body: bytes) -> Request:
+        try:
+            values = json.loads(body)
+        except ValueError:
+            raise ServiceError(400, "Тело запроса должно быть JSON-объектом.") from None
+        if not isinstance(values, dict) or not isinstance(values.get('path'), str):
+            raise ServiceError(400, "Тело запроса должно содержать строку path.")
+        return Request(self.service.resolve(values['path']), options=_parse_options(values))
+
+    def _data_request(self, body: bytes, query: Dict[str, str]) -> Request:
+        data_format = query.get('format', 'csv')
+        if data_format not in FORMATS:
+            raise ServiceError(400, f"Неизвестный формат: {data_format}. Допустимые значения: {', '.join(FORMATS)}.")
+        return Request(Path(f"request.{data_format}"), payload=body, options=_parse_options(query))
+
+    def _send_error(self, error: ServiceError) -> None:
+        self._send_json(error.status, {"error": str(error)})
+
+    def _send_json(self, status: int, content: Dict[str, Any]) -> None:
+        body = json.dumps(content, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        return str(self.client_address[0]) if self.client_address else 'unix'
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class ServiceHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = DEFAULT_LISTEN_BACKLOG
+
+    def __init__(self, address: Tuple[str, int], service: StatsService) -> None:
+        super().__init__(address, ServiceRequestHandler)
+        self.service = service
+
+
+class ServiceUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = DEFAULT_LISTEN_BACKLOG
+
+    def __init__(self, path: Path, service: StatsService) -> None:
+        if path.exists():
+            path.unlink()
+        super().__init__(str(path), ServiceRequestHandler)
+        self.service = service
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    HTTP-соединение через Unix-сокет (например, для клиента сервиса, запущенного с --unix-socket).
+    """
+    def __init__(self, path: Path, timeout: float = 60.0) -> None:
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = str(path)
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Адрес для TCP-сервера.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Порт для TCP-сервера.")
+    parser.add_argument("--unix-socket", type=Path, default=None, help="Слушать Unix-сокет вместо TCP-порта.")
+    parser.add_argument("--root", type=Path, default=Path('.'), help="Каталог, из которого разрешено читать файлы.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Размер пула обработки.")
+    parser.add_argument("--executor", choices=EXECUTORS, default=EXECUTOR_PROCESS, help="Тип пула обработки.")
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help="Максимальное количество запросов в пачке.")
+    parser.add_argument("--max-delay", type=float, default=DEFAULT_MAX_DELAY,
+                        help="Сколько секунд первый запрос пачки ждет попутчиков.")
+    parser.add_argument("--max-body-size", type=int, default=DEFAULT_MAX_BODY_SIZE,
+                        help="Максимальный размер тела запроса в байтах.")
+    args = parser.parse_args()
+
+    setup_logger('logging_config.yaml')
+    service = StatsService(args.root, workers=args.workers, executor=args.executor,
+                           max_batch_size=args.max_batch_size, max_delay=args.max_delay,
+                           max_body_size=args.max_body_size)
+    if args.unix_socket is not None:
+        server: socketserver.BaseServer = ServiceUnixServer(args.unix_socket, service)
+        address = args.unix_socket
+    else:
+        server = ServiceHTTPServer((args.host, args.port), service)
+        address = f"http://{args.host}:{server.server_address[1]}"
+    logger.info(f"Сервис запущен: {address}, воркеров: {args.workers} ({args.executor}).")
+
+    def stop(signum: int, frame: Any) -> None:
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        logger.info("Сервис остановлен.")
+
+
+if __name__ == "__main__":
+    main()
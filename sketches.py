@@ -0,0 +1,297 @@
+"""
+Скетчи с фиксированной памятью: приближенные квантили (KLL) и количество уникальных значений (HyperLogLog).
+
+Оба скетча сериализуются в словарь, пригодный для JSON, и объединяются через `merge`,
+поэтому их можно собирать по частям файла или по разным файлам и сводить в один результат.
+"""
+import base64
+import math
+import random
+import struct
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_KLL_K = 200
+DEFAULT_HLL_PRECISION = 14
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+_MASK64 = (1 << 64) - 1
+_NAN_HASH = 0x7FF8000000000000
+_DOUBLE = struct.Struct('<d')
+
+
+def _mix64(value: int) -> int:
+    """
+    Финализатор SplitMix64: равномерно перемешивает биты 64-битного значения.
+    """
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+class KLLSketch:
+    """
+    Квантильный скетч KLL (Karnin, Lang, Liberty).
+
+    Память — O(k) значений, ошибка ранга квантиля — порядка 1.7 / k (около 1% при k = 200).
+    """
+    def __init__(self, k: int = DEFAULT_KLL_K, seed: Optional[int] = None) -> None:
+        """
+        Args:
+            k (int): Параметр точности: чем больше, тем точнее квантили и больше памяти.
+            seed (Optional[int]): Зерно генератора случайных чисел для воспроизводимых результатов.
+        """
+        if k < 8:
+            raise ValueError("Параметр k должен быть не меньше 8.")
+        self.k = k
+        self.count = 0
+        self.compactors: List[List[float]] = []
+        self._size = 0
+        self._max_size = 0
+        self._rng = random.Random(seed)
+        self._grow()
+
+    def _capacity(self, height: int) -> int:
+        depth = len(self.compactors) - height - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def _grow(self) -> None:
+        self.compactors.append([])
+        self._max_size = sum(self._capacity(height) for height in range(len(self.compactors)))
+
+    def _compress(self) -> None:
+        while self._size >= self._max_size:
+            for height, compactor in enumerate(self.compactors):
+                if len(compactor) >= self._capacity(height):
+                    if height + 1 >= len(self.compactors):
+                        self._grow()
+                    compactor.sort()
+                    kept = [compactor.pop()] if len(compactor) % 2 else []
+                    self.compactors[height + 1].extend(compactor[self._rng.random() < 0.5::2])
+                    self.compactors[height] = kept
+                    self._size = sum(len(c) for c in self.compactors)
+                    break
+
+    def add(self, value: float) -> None:
+        """
+        Добавляет значение.
+        """
+        self.compactors[0].append(value)
+        self.count += 1
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        """
+        Добавляет значения другого скетча.
+        """
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for height, compactor in enumerate(other.compactors):
+            self.compactors[height].extend(compactor)
+        self.count += other.count
+        self._size = sum(len(c) for c in self.compactors)
+        self._compress()
+
+    def _weighted_items(self) -> List[Tuple[float, int]]:
+        items = [(value, 1 << height) for height, compactor in enumerate(self.compactors) for value in compactor]
+        items.sort()
+        return items
+
+    def quantiles(self, fractions: Sequence[float]) -> List[Optional[float]]:
+        """
+        Возвращает приближенные квантили.
+
+        Args:
+            fractions (Sequence[float]): Уровни квантилей от 0 до 1.
+
+        Returns:
+            List[Optional[float]]: Значения квантилей (None, если данных нет).
+        """
+        items = self._weighted_items()
+        if not items:
+            return [None] * len(fractions)
+        total_weight = sum(weight for _, weight in items)
+        results = []
+        for fraction in fractions:
+            if not 0 <= fraction <= 1:
+                raise ValueError("Уровень квантиля должен быть в диапазоне от 0 до 1.")
+            target = fraction * total_weight
+            cumulative = 0
+            result = items[-1][0]
+            for value, weight in items:
+                cumulative += weight
+                if cumulative >= target:
+                    result = value
+                    break
+            results.append(result)
+        return results
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """
+        Возвращает приближенный квантиль уровня `fraction`.
+        """
+        return self.quantiles([fraction])[0]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Сериализует скетч в словарь, пригодный для JSON.
+        """
+        return {"k": self.k, "count": self.count, "compactors": [list(c) for c in self.compactors]}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "KLLSketch":
+        """
+        Восстанавливает скетч из словаря, полученного через `to_dict`.
+        """
+        sketch = cls(k=state["k"])
+        sketch.compactors = []
+        for _ in state["compactors"]:
+            sketch._grow()
+        sketch.compactors = [list(c) for c in state["compactors"]]
+        sketch.count = state["count"]
+        sketch._size = sum(len(c) for c in sketch.compactors)
+        return sketch
+
+
+class HyperLogLog:
+    """
+    Счетчик количества уникальных значений HyperLogLog.
+
+    Память — 2^precision байт, относительная ошибка — около 1.04 / sqrt(2^precision)
+    (около 0.8% при precision = 14).
+    """
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION) -> None:
+        """
+        Args:
+            precision (int): Число бит хеша для выбора регистра, от 4 до 18.
+        """
+        if not 4 <= precision <= 18:
+            raise ValueError("Точность HyperLogLog должна быть в диапазоне от 4 до 18.")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value: float) -> None:
+        """
+        Добавляет значение.
+        """
+        if value != value:
+            hashed = _mix64(_NAN_HASH)
+        else:
+            # Хешируются биты IEEE-754, а не hash(): у hash() есть совпадения (hash(-1.0) == hash(-2.0),
+            # значения, равные по модулю 2**61 - 1). Прибавление 0.0 превращает -0.0 в 0.0.
+            hashed = _mix64(int.from_bytes(_DOUBLE.pack(value + 0.0), 'little'))
+        index = hashed >> (64 - self.precision)
+        remainder = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = 64 - self.precision - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """
+        Добавляет значения другого счетчика с той же точностью.
+        """
+        if other.precision != self.precision:
+            raise ValueError("Нельзя объединить счетчики HyperLogLog с разной точностью.")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        """
+        Возвращает оценку количества уникальных значений.
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Сериализует счетчик в словарь, пригодный для JSON.
+        """
+        return {"precision": self.precision, "registers": base64.b64encode(bytes(self.registers)).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "HyperLogLog":
+        """
+        Восстанавливает счетчик из словаря, полученного через `to_dict`.
+        """
+        counter = cls(precision=state["precision"])
+        counter.registers = bytearray(base64.b64decode(state["registers"]))
+        return counter
+
+
+class Sketches:
+    """
+    Набор скетчей, которые заполняются за тот же проход по данным, что и сумма.
+    """
+    def __init__(self, k: int = DEFAULT_KLL_K, precision: int = DEFAULT_HLL_PRECISION,
+                 seed: Optional[int] = None) -> None:
+        """
+        Args:
+            k (int): Параметр точности квантильного скетча.
+            precision (int): Точность счетчика уникальных значений.
+            seed (Optional[int]): Зерно генератора случайных чисел квантильного скетча.
+        """
+        self.quantile_sketch = KLLSketch(k=k, seed=seed)
+        self.distinct_counter = HyperLogLog(precision=precision)
+
+    def add(self, value: float) -> None:
+        """
+        Добавляет корректное значение во все скетчи.
+        """
+        self.quantile_sketch.add(value)
+        self.distinct_counter.add(value)
+
+    def update(self, values: Iterable[float]) -> None:
+        """
+        Добавляет несколько корректных значений.
+        """
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "Sketches") -> None:
+        """
+        Добавляет значения другого набора скетчей.
+        """
+        self.quantile_sketch.merge(other.quantile_sketch)
+        self.distinct_counter.merge(other.distinct_counter)
+
+    def empty_copy(self) -> "Sketches":
+        """
+        Создает пустой набор скетчей с теми же параметрами точности.
+        """
+        return Sketches(k=self.quantile_sketch.k, precision=self.distinct_counter.precision)
+
+    def report(self, fractions: Sequence[float] = DEFAULT_QUANTILES) -> Dict[str, Any]:
+        """
+        Возвращает квантили и количество уникальных значений.
+
+        Returns:
+            Dict[str, Any]: Словарь вида {"p50": ..., "p95": ..., "p99": ..., "distinct": ...}.
+        """
+        report: Dict[str, Any] = {
+            f"p{fraction * 100:g}": value
+            for fraction, value in zip(fractions, self.quantile_sketch.quantiles(fractions))
+        }
+        report["distinct"] = self.distinct_counter.count()
+        return report
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Сериализует набор скетчей в словарь, пригодный для JSON.
+        """
+        return {"quantiles": self.quantile_sketch.to_dict(), "distinct": self.distinct_counter.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "Sketches":
+        """
+        Восстанавливает набор скетчей из словаря, полученного через `to_dict`.
+        """
+        sketches = cls()
+        sketches.quantile_sketch = KLLSketch.from_dict(state["quantiles"])
+        sketches.distinct_counter = HyperLogLog.from_dict(state["distinct"])
+        return sketches
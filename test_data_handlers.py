@@ -0,0 +1,766 @@
+import bz2
+import gzip
+import io
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from csv_data_handler import CSVDataHandler
+from mmap_tokenizer import DEFAULT_BLOCK_SIZE
+from json_data_handler import JSONDataHandler
+from json_stream import iter_json_array
+from data_handler import SumResult, SimpleDataHandler, ENGINE_NUMPY, ENGINE_PYTHON
+import numpy_engine
+from batch_processor import collect_files, process_files, EXECUTOR_PROCESS
+from async_pipeline import DEFAULT_LARGE_FILE_SIZE, _parse_payload, run_pipeline
+from json_result_writer import write_json_results
+from result_cache import ResultCache
+from incremental import IncrementalProcessor
+from columnar_data_handler import ColumnarDataHandler
+from columnar_writer import parquet_available, write_columnar, write_parquet
+from group_aggregator import GroupAggregator
+from sketches import Sketches
+from invalid_values import InvalidValueReport, CATEGORY_NAN, CATEGORY_STRING
+from compressed_io import DecompressionError, detect_compression
+from batch_processor import handler_class_for
+import benchmark
+import instrumentation
+
+
+class TestCSVDataHandler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name: str, content: str) -> Path:
+        path = Path(self.tmp.name) / name
+        path.write_text(content)
+        return path
+
+    def test_process_fixture(self):
+        """Проверяем результат на файле data.csv из репозитория."""
+        result = CSVDataHandler(Path('data.csv')).process_data()
+        self.assertAlmostEqual(result.total, 103.2)
+        self.assertEqual(result.count, 5)
+        self.assertEqual(result.incorrect_count, 4)
+
+    def test_small_buffer_multiline(self):
+        """Проверяем, что маленький буфер чтения не влияет на результат."""
+        path = self.write('multi.csv', "1,2,x\n3,,4\n\n5\n")
+        result = CSVDataHandler(path, buffer_size=2).process_data()
+        self.assertEqual(result, SumResult(total=15.0, count=5, incorrect_count=2))
+
+    def test_invalid_buffer_size(self):
+        with self.assertRaises(ValueError):
+            CSVDataHandler(Path('data.csv'), buffer_size=0)
+
+    def test_parallel_matches_sequential(self):
+        """Проверяем, что обработка диапазонами в пуле процессов дает тот же результат, что и в одном процессе."""
+        path = self.write('parallel.csv', "".join(f"{i},x,{i / 4}\r\n" if i % 3 else "\n" for i in range(500)))
+        sequential = CSVDataHandler(path).process_data()
+        parallel = CSVDataHandler(path, workers=2, chunk_size=64).process_data()
+        self.assertEqual(parallel, sequential)
+
+    def test_fast_numeric_matches_csv_reader(self):
+        """Проверяем, что разбор байтов из mmap дает тот же результат, что и csv.reader, включая блоки с кавычками."""
+        content = "".join(f"{i},x,{i / 4},\r\n" if i % 3 else "\n\n" for i in range(500)) + '"7","8"\n1e3, 2 ,-0.5\r5'
+        path = self.write('fast.csv', content)
+        expected = CSVDataHandler(path).process_data()
+        for block_size in (16, 1024, DEFAULT_BLOCK_SIZE):
+            with self.subTest(block_size=block_size):
+                result = CSVDataHandler(path, fast_numeric=True, block_size=block_size).process_data()
+                self.assertEqual(result, expected)
+        self.assertEqual(CSVDataHandler(path, fast_numeric=True, workers=2, chunk_size=256,
+                                        block_size=64).process_data(), expected)
+
+    def test_fast_numeric_matches_parallel_and_streaming(self):
+        """Проверяем на случайных числах разного порядка, что mmap-путь совпадает с потоковым разбором бит в бит,
+        а в параллельном режиме — с параллельным разбором через csv.reader при том же разбиении на диапазоны."""
+        rng = random.Random(11)
+        rows = []
+        for _ in range(3000):
+            cells = [repr(rng.uniform(-1, 1) * 10 ** rng.randint(-3, 12)) for _ in range(3)]
+            if rng.random() < 0.05:
+                cells[rng.randrange(3)] = "n/a"
+            rows.append(",".join(cells) + rng.choice(("\n", "\r\n")))
+        path = self.write('random.csv', "".join(rows))
+        streaming = CSVDataHandler(path).process_data()
+        self.assertEqual(CSVDataHandler(path, fast_numeric=True, chunk_size=4096).process_data(), streaming)
+        parallel = CSVDataHandler(path, workers=2, chunk_size=4096).process_data()
+        self.assertEqual(CSVDataHandler(path, fast_numeric=True, workers=2, chunk_size=4096).process_data(), parallel)
+        self.assertEqual(parallel[1:], streaming[1:])
+        self.assertTrue(math.isclose(parallel.total, streaming.total, rel_tol=1e-9, abs_tol=1e-3))
+
+    def test_invalid_values_report_positions(self):
+        """Проверяем, что все пути разбора находят одни и те же некорректные ячейки с одинаковыми позициями."""
+        path = self.write('dirty.csv', "".join(f"{i},bad{i}\n" if i % 50 == 0 else f"{i},{i}\n" for i in range(400)))
+        options = [{}, {'fast_numeric': True}, {'workers': 2, 'chunk_size': 512}]
+        if numpy_engine.is_available():
+            options.append({'engine': ENGINE_NUMPY})
+        for kwargs in options:
+            with self.subTest(**kwargs):
+                handler = CSVDataHandler(path, invalid_values=InvalidValueReport(sample_size=100), **kwargs)
+                handler.process_data()
+                self.assertEqual(handler.invalid_values.counts[CATEGORY_STRING], 8)
+                self.assertEqual(sorted(handler.invalid_values.sample),
+                                 [(i * 2 + 1, repr(f"bad{i}")) for i in range(0, 400, 50)])
+
+    def test_nan_and_inf_are_invalid(self):
+        """Проверяем, что NaN и бесконечности считаются некорректными на всех путях разбора, а отчет
+        описывает только последний вызов process_data."""
+        path = self.write('nan.csv', "1,nan,inf\n-Infinity,2\n")
+        options = [{}, {'fast_numeric': True}, {'workers': 2, 'chunk_size': 8}]
+        if numpy_engine.is_available():
+            options.append({'engine': ENGINE_NUMPY})
+        for kwargs in options:
+            with self.subTest(**kwargs):
+                handler = CSVDataHandler(path, **kwargs)
+                for _ in range(2):
+                    self.assertEqual(handler.process_data(), SumResult(total=3.0, count=2, incorrect_count=3))
+                    self.assertEqual(handler.invalid_values.counts[CATEGORY_NAN], 3)
+                    self.assertEqual(handler.invalid_values.total, 3)
+
+    def test_fast_numeric_non_ascii_digits(self):
+        """Проверяем, что mmap-путь, как и float() на обычном пути, принимает числа из не-ASCII цифр."""
+        path = self.write('digits.csv', "1,\u0661\u0662,\uff13.5\n\u00a04,x\n")
+        expected = CSVDataHandler(path).process_data()
+        self.assertEqual(expected, SumResult(total=20.5, count=4, incorrect_count=1))
+        handler = CSVDataHandler(path, fast_numeric=True)
+        self.assertEqual(handler.process_data(), expected)
+        self.assertEqual(handler.invalid_values.sample, [(4, repr('x'))])
+
+    def test_fast_numeric_invalid_and_nan_in_one_block(self):
+        """Проверяем, что некорректные токены и NaN/inf в одном блоке считаются так же, как на обычном пути,
+        с теми же позициями."""
+        path = self.write('mixed.csv', "".join(f"{i},x{i},nan,{i / 2}\n" for i in range(50)) + "inf,1e308,1e308\n")
+        expected_handler = CSVDataHandler(path, invalid_values=InvalidValueReport(sample_size=200))
+        expected = expected_handler.process_data()
+        for block_size in (32, DEFAULT_BLOCK_SIZE):
+            with self.subTest(block_size=block_size):
+                handler = CSVDataHandler(path, fast_numeric=True, block_size=block_size,
+                                         invalid_values=InvalidValueReport(sample_size=200))
+                self.assertEqual(handler.process_data(), expected)
+                self.assertEqual(sorted(handler.invalid_values.sample), sorted(expected_handler.invalid_values.sample))
+
+    def test_fast_numeric_empty_file(self):
+        path = self.write('empty.csv', "")
+        result = CSVDataHandler(path, fast_numeric=True).process_data()
+        self.assertEqual(result, SumResult(total=0.0, count=0, incorrect_count=0))
+
+    def test_missing_file(self):
+        result = CSVDataHandler(Path(self.tmp.name) / 'missing.csv').process_data()
+        self.assertEqual(result, SumResult(total=0.0, count=0, incorrect_count=0))
+
+
+class TestCSVGroupBy(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.rows = [(f"key{i % 7}", i, i / 2 if i % 4 else "x") for i in range(200)]
+        self.path = Path(self.tmp.name) / 'table.csv'
+        self.path.write_text("region,qty,price\n" + "".join(f"{k},{q},{p}\n" for k, q, p in self.rows) + "\nkey0\n")
+
+    def expected(self):
+        expected = {}
+        for key, qty, price in self.rows + [("key0", None, None)]:
+            group = expected.setdefault(key, {"qty": [0.0, 0, 0], "price": [0.0, 0, 0]})
+            for column, value in (("qty", qty), ("price", price)):
+                if isinstance(value, (int, float)):
+                    group[column][0] += value
+                    group[column][1] += 1
+                else:
+                    group[column][2] += 1
+        return {key: {column: SumResult(*acc) for column, acc in columns.items()} for key, columns in expected.items()}
+
+    def test_aggregate_by_group(self):
+        """Проверяем суммы по колонкам и группам, в том числе при сбросе групп на диск."""
+        handler = CSVDataHandler(self.path, header=True, columns=['qty', 'price'], group_by='region')
+        for max_groups in (100, 2):
+            with self.subTest(max_groups=max_groups):
+                result = dict(handler.aggregate(max_groups=max_groups, spill_dir=Path(self.tmp.name)))
+                self.assertEqual(result.keys(), self.expected().keys())
+                for key, columns in self.expected().items():
+                    for column, expected in columns.items():
+                        self.assertAlmostEqual(result[key][column].total, expected.total)
+                        self.assertEqual(result[key][column][1:], expected[1:])
+        self.assertEqual(list(Path(self.tmp.name).glob('datastats_groups_*')), [])
+
+    def test_large_partitions_are_split(self):
+        """Проверяем, что раздел, в котором больше max_groups групп, при объединении делится на подразделы."""
+        aggregator = GroupAggregator(1, max_groups=10, partitions=2, spill_dir=Path(self.tmp.name))
+        written = []
+        write_partitions = aggregator._write_partitions
+
+        def record(groups, directory, level):
+            written.append(len(groups))
+            write_partitions(groups, directory, level)
+
+        aggregator._write_partitions = record
+        for i in range(1000):
+            aggregator.add(i % 300, [1.0 if i % 5 else None])
+        result = dict(aggregator.results())
+        self.assertEqual(len(result), 300)
+        self.assertEqual(result[0], [SumResult(total=0.0, count=0, incorrect_count=4)])
+        self.assertEqual(result[7], [SumResult(total=4.0, count=4, incorrect_count=0)])
+        self.assertGreater(aggregator.repartitions, 0)
+        self.assertLessEqual(max(written), 10)
+        self.assertEqual(list(Path(self.tmp.name).glob('datastats_groups_*')), [])
+
+    def test_selected_columns_process_data(self):
+        result = CSVDataHandler(self.path, header=True, columns=[1], group_by='region').process_data()
+        self.assertEqual(result, SumResult(total=float(sum(range(200))), count=200, incorrect_count=1))
+
+    def test_column_errors(self):
+        with self.assertRaises(ValueError):
+            CSVDataHandler(self.path, columns=['qty'])
+        with self.assertRaises(ValueError):
+            list(CSVDataHandler(self.path, header=True, columns=['missing']).aggregate())
+
+
+class TestJSONDataHandler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name: str, content: str) -> Path:
+        path = Path(self.tmp.name) / name
+        path.write_text(content)
+        return path
+
+    def test_process_fixture(self):
+        """Проверяем результат на файле data.json из репозитория."""
+        result = JSONDataHandler(Path('data.json')).process_data()
+        self.assertEqual(result, SumResult(total=155.5, count=6, incorrect_count=2))
+
+    def test_small_chunks_match_full_parse(self):
+        """Проверяем, что разбор мелкими порциями дает тот же результат, что и json.load."""
+        path = self.write('array.json', '[1.25, -2e3, "7", null, [1], {"a": 2}, 123456789, 0.5]')
+        result = JSONDataHandler(path, chunk_size=3).process_data()
+        self.assertEqual(result, SumResult(total=1.25 - 2000 + 7 + 123456789 + 0.5, count=5, incorrect_count=3))
+
+    def test_json_lines(self):
+        """Проверяем разбор NDJSON: пустые строки пропускаются, битые строки считаются некорректными."""
+        path = self.write('data.ndjson', '1\n\n"2.5"\n{bad\nnull\n4\n')
+        result = JSONDataHandler(path).process_data()
+        self.assertEqual(result, SumResult(total=7.5, count=3, incorrect_count=2))
+
+    def test_nan_and_inf_are_invalid(self):
+        path = self.write('nan.json', '[1, "nan", NaN, "-inf", Infinity, 2]')
+        handler = JSONDataHandler(path)
+        self.assertEqual(handler.process_data(), SumResult(total=3.0, count=2, incorrect_count=4))
+        self.assertEqual(handler.invalid_values.counts[CATEGORY_NAN], 4)
+
+    def test_malformed_array(self):
+        path = self.write('bad.json', '[1, 2')
+        with self.assertRaises(ValueError):
+            JSONDataHandler(path, chunk_size=2).process_data()
+
+    def test_scalar_document(self):
+        """Проверяем, что документ-число считается некорректным файлом (ValueError), а не приводит к TypeError."""
+        path = self.write('scalar.json', '5')
+        with self.assertRaises(ValueError):
+            JSONDataHandler(path).process_data()
+
+    def test_bad_token_does_not_read_whole_file(self):
+        """Проверяем, что ошибка в начале массива обнаруживается сразу, без чтения остального файла."""
+        stream = io.StringIO('[1, foo, ' + ', '.join(['1'] * 100000) + ']')
+        with self.assertRaises(ValueError):
+            list(iter_json_array(stream, chunk_size=16))
+        self.assertLessEqual(stream.tell(), 32)
+
+    def test_values_split_by_chunk_boundaries(self):
+        """Проверяем, что литералы, числа и строки, разрезанные границей порции, дочитываются,
+        а не считаются ошибкой."""
+        content = '[-Infinity, NaN, true, null, 123456.5e-3, "\\u00e9\\"x", {"a": [false]}]'
+        expected = json.loads(content)
+        for chunk_size in range(1, 12):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(repr(list(iter_json_array(io.StringIO(content), chunk_size))), repr(expected))
+
+
+class TestCompressedInput(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.content = "".join(f"{i},x,{i / 4}\n" for i in range(2000))
+        self.plain = Path(self.tmp.name) / 'plain.csv'
+        self.plain.write_text(self.content)
+
+    def test_gzip_multi_member_and_bz2(self):
+        """Проверяем, что сжатые файлы (в том числе gzip из нескольких членов) дают тот же результат, что и несжатый."""
+        expected = CSVDataHandler(self.plain).process_data()
+        half = len(self.content) // 2
+        gz = Path(self.tmp.name) / 'data.csv.gz'
+        gz.write_bytes(gzip.compress(self.content[:half].encode()) + gzip.compress(self.content[half:].encode()))
+        bz = Path(self.tmp.name) / 'data.csv.bz2'
+        bz.write_bytes(bz2.compress(self.content.encode()))
+        for path in (gz, bz):
+            with self.subTest(path=path.name):
+                self.assertEqual(CSVDataHandler(path, buffer_size=64, workers=2, fast_numeric=True).process_data(),
+                                 expected)
+                self.assertIs(handler_class_for(path), CSVDataHandler)
+
+    def test_json_detected_by_magic_bytes(self):
+        path = Path(self.tmp.name) / 'values.ndjson'
+        path.write_bytes(gzip.compress(b'1\n"2"\nnull\n3.5\n'))
+        self.assertEqual(detect_compression(path), 'gzip')
+        self.assertEqual(JSONDataHandler(path).process_data(), SumResult(total=6.5, count=3, incorrect_count=1))
+        lines = Path(self.tmp.name) / 'values.ndjson.gz'
+        path.rename(lines)
+        self.assertTrue(JSONDataHandler(lines).json_lines)
+
+    def test_plain_text_starting_with_bzip2_prefix(self):
+        path = Path(self.tmp.name) / 'text.csv'
+        path.write_text("BZh,1\n2\n")
+        self.assertIsNone(detect_compression(path))
+        self.assertEqual(CSVDataHandler(path).process_data(), SumResult(total=3.0, count=2, incorrect_count=1))
+
+    def test_corrupted_archive(self):
+        """Проверяем, что обрезанный архив считается необработанным файлом и не попадает в кеш."""
+        path = Path(self.tmp.name) / 'broken.csv.gz'
+        path.write_bytes(gzip.compress(self.content.encode())[:-100])
+        with self.assertRaises(DecompressionError):
+            CSVDataHandler(path).process_data()
+        cache = ResultCache(Path(self.tmp.name) / 'cache.json')
+        batch = process_files([path], cache=cache)
+        self.assertEqual(batch.total, SumResult(total=0.0, count=0, incorrect_count=0))
+        self.assertEqual(len(cache), 0)
+        self.assertFalse(_parse_payload(path, path.read_bytes(), {})[1])
+
+
+@unittest.skipUnless(numpy_engine.is_available(), "NumPy не установлен")
+class TestNumpyEngine(unittest.TestCase):
+    def test_parity_on_fixtures(self):
+        """Проверяем, что движки 'python' и 'numpy' дают одинаковые суммы и счетчики на data.csv и data.json."""
+        for handler_class, path in ((CSVDataHandler, Path('data.csv')), (JSONDataHandler, Path('data.json'))):
+            with self.subTest(path=path):
+                python_result = handler_class(path, engine=ENGINE_PYTHON).process_data()
+                numpy_result = handler_class(path, engine=ENGINE_NUMPY).process_data()
+                self.assertEqual(python_result, numpy_result)
+
+    def test_invalid_values_are_masked(self):
+        """Проверяем, что None, нечисловые элементы, 'nan' и целые, не помещающиеся во float, считаются
+        некорректными, как и в цикле на Python."""
+        data = [1, None, 'abc', '2.5', [1], 'nan'] + list(range(200)) + [10 ** 400]
+        python_result = SimpleDataHandler().process_data(data)
+        numpy_result = SimpleDataHandler(engine=ENGINE_NUMPY, batch_size=7).process_data(data)
+        self.assertEqual(numpy_result.count, python_result.count)
+        self.assertEqual(numpy_result.incorrect_count, python_result.incorrect_count)
+        self.assertEqual(numpy_result.incorrect_count, 5)
+
+    def test_only_invalid_items_are_parsed_in_python(self):
+        """Проверяем, что поэлементно через _process_item проходят только некорректные элементы, а не отрезки
+        пачки вокруг них, и что позиции некорректных элементов совпадают с циклом на Python."""
+        class CountingHandler(SimpleDataHandler):
+            calls = 0
+
+            def _process_item(self, item):
+                CountingHandler.calls += 1
+                return super()._process_item(item)
+
+        data = [str(i) if i % 20 else 'x' for i in range(1000)] + [None, 1.5, float('inf')]
+        handler = CountingHandler(engine=ENGINE_NUMPY, batch_size=100, invalid_values=InvalidValueReport(100))
+        result = handler.process_data(data)
+        python_handler = SimpleDataHandler(invalid_values=InvalidValueReport(100))
+        self.assertEqual(result, python_handler.process_data(data))
+        self.assertEqual(CountingHandler.calls, result.incorrect_count)
+        self.assertEqual(handler.invalid_values.counts, python_handler.invalid_values.counts)
+        self.assertEqual(sorted(handler.invalid_values.sample), sorted(python_handler.invalid_values.sample))
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            SimpleDataHandler(engine='fortran')
+
+    def test_numpy_is_imported_lazily(self):
+        """Проверяем, что NumPy не загружается при запуске, пока движок 'numpy' не используется."""
+        code = ("import sys, main; from data_handler import SimpleDataHandler; SimpleDataHandler().process_data([1]); "
+                "print('numpy' in sys.modules)")
+        output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+        self.assertEqual(output.strip(), 'False')
+
+
+class TestBatchProcessor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        root = Path(self.tmp.name)
+        (root / 'a').mkdir()
+        (root / 'a' / 'one.csv').write_text("1,2,x\n")
+        (root / 'a' / 'two.json').write_text("[3, null]")
+        (root / 'a' / 'notes.txt').write_text("skip me")
+        (root / 'three.ndjson').write_text("4\n5\n")
+
+    def test_collect_files(self):
+        """Проверяем раскрытие каталогов и шаблонов: неподдерживаемые файлы в каталогах пропускаются, повторы удаляются."""
+        root = Path(self.tmp.name)
+        files = collect_files([str(root / 'a'), str(root / '*.ndjson'), str(root / 'a' / 'one.csv')])
+        self.assertEqual(files, [root / 'a' / 'one.csv', root / 'a' / 'two.json', root / 'three.ndjson'])
+
+    def test_process_files_aggregate(self):
+        """Проверяем результаты по файлам и общий результат для пулов потоков и процессов."""
+        files = collect_files([self.tmp.name])
+        for executor in ('thread', EXECUTOR_PROCESS):
+            with self.subTest(executor=executor):
+                batch = process_files(files, workers=2, executor=executor)
+                self.assertEqual([result.count for _, result in batch.results], [2, 1, 2])
+                self.assertEqual(batch.total, SumResult(total=15.0, count=5, incorrect_count=2))
+
+    def test_failed_file_does_not_abort_batch(self):
+        """Проверяем, что файл с JSON-документом верхнего уровня, по которому нельзя итерироваться, не прерывает
+        обработку остальных файлов ни в пакетном режиме, ни в конвейере."""
+        root = Path(self.tmp.name)
+        (root / 'scalar.json').write_text("5")
+        files = [root / 'a' / 'one.csv', root / 'scalar.json']
+        batch = process_files(files, workers=2)
+        self.assertEqual([result for _, result in batch.results], [SumResult(total=3.0, count=2, incorrect_count=1),
+                                                                   SumResult(total=0.0, count=0, incorrect_count=0)])
+        batch = run_pipeline(files, root / 'out', write_json_results, '.json', parse_executor='thread')
+        self.assertEqual(batch.total, SumResult(total=3.0, count=2, incorrect_count=1))
+
+    def test_async_pipeline(self):
+        """Проверяем, что конвейер с маленькими очередями и пачками записи дает те же результаты и пишет файлы
+        (в том числе когда все файлы считаются крупными и разбираются потоково)."""
+        files = collect_files([self.tmp.name])
+        for executor, large_file_size in (('thread', DEFAULT_LARGE_FILE_SIZE), ('thread', 0), (EXECUTOR_PROCESS, 0)):
+            with self.subTest(executor=executor, large_file_size=large_file_size):
+                output_dir = Path(self.tmp.name) / f'out_{executor}_{large_file_size}'
+                batch = run_pipeline(files, output_dir, write_json_results, '.json', read_workers=2, parse_workers=2,
+                                     parse_executor=executor, queue_size=1, write_batch_size=2,
+                                     large_file_size=large_file_size)
+                self.assertEqual([path for path, _ in batch.results], files)
+                self.assertEqual(batch.total, SumResult(total=15.0, count=5, incorrect_count=2))
+                self.assertEqual(len(list(output_dir.rglob('*_results.json'))), 3)
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        self.cache_path = self.root / 'cache.json'
+        self.data_path = self.root / 'data.csv'
+        self.data_path.write_text("1,2,x\n")
+
+    def test_handler_hit_after_save(self):
+        """Проверяем, что после сохранения кеша повторная обработка неизменившегося файла берется из кеша."""
+        cache = ResultCache(self.cache_path)
+        first = CSVDataHandler(self.data_path, cache=cache).process_data()
+        cache.save()
+
+        cache = ResultCache(self.cache_path)
+        second = CSVDataHandler(self.data_path, cache=cache).process_data()
+        self.assertEqual(second, first)
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+    def test_modified_file_is_miss(self):
+        cache = ResultCache(self.cache_path)
+        cache.put(self.data_path, 'CSVDataHandler', SumResult(total=3.0, count=2, incorrect_count=1))
+        self.data_path.write_text("1,2,y\n")
+        os.utime(self.data_path, ns=(0, 0))
+        self.assertIsNone(cache.get(self.data_path, 'CSVDataHandler'))
+        self.assertEqual(len(cache), 0)
+
+    def test_file_appended_during_processing_is_miss(self):
+        """Проверяем, что отпечаток файла снимается до обработки: дописанный во время обработки файл не берется из кеша."""
+        cache = ResultCache(self.cache_path)
+        handler = CSVDataHandler(self.data_path, cache=cache)
+
+        def compute():
+            result = handler._process_file()
+            with self.data_path.open('a') as f:
+                f.write("4\n")
+            return result
+
+        self.assertEqual(handler._cached(self.data_path, compute).total, 3.0)
+        self.assertIsNone(cache.get(self.data_path, 'CSVDataHandler'))
+        self.assertEqual(CSVDataHandler(self.data_path, cache=cache).process_data().total, 7.0)
+
+    def test_hit_restores_invalid_values(self):
+        """Проверяем, что при попадании в кеш отчет о некорректных значениях восстанавливается, а не остается пустым."""
+        cache = ResultCache(self.cache_path)
+        first = CSVDataHandler(self.data_path, cache=cache)
+        first.process_data()
+        cache.save()
+
+        second = CSVDataHandler(self.data_path, cache=ResultCache(self.cache_path))
+        second.process_data()
+        second.process_data()
+        self.assertEqual(second.cache.hits, 2)
+        self.assertEqual(second.invalid_values.counts, first.invalid_values.counts)
+        self.assertEqual(second.invalid_values.sample, [(2, "'x'")])
+
+    def test_namespace_includes_format_and_engine(self):
+        """Проверяем, что результаты одного файла, разобранного как JSON и как JSON Lines или разными движками,
+        не берутся из кеша друг для друга."""
+        path = self.root / 'values.json'
+        path.write_text("1\n2\n")
+        cache = ResultCache(self.cache_path)
+        with self.assertRaises(ValueError):
+            JSONDataHandler(path, cache=cache).process_data()
+        self.assertEqual(JSONDataHandler(path, json_lines=True, cache=cache).process_data().total, 3.0)
+        with self.assertRaises(ValueError):
+            JSONDataHandler(path, cache=cache).process_data()
+        engines = [ENGINE_PYTHON, ENGINE_NUMPY] if numpy_engine.is_available() else [ENGINE_PYTHON]
+        namespaces = {CSVDataHandler(self.data_path, engine=engine)._cache_namespace() for engine in engines}
+        self.assertEqual(len(namespaces), len(engines))
+
+    def test_namespace_includes_parsing_options(self):
+        """Проверяем, что результаты, полученные быстрым путем разбора или параллельно с разным разбиением
+        на диапазоны, не берутся из кеша друг для друга."""
+        options = [{}, {'fast_numeric': True}, {'workers': 2, 'chunk_size': 64}, {'workers': 4, 'chunk_size': 128},
+                   {'fast_numeric': True, 'workers': 2, 'chunk_size': 64}]
+        namespaces = {CSVDataHandler(self.data_path, **kwargs)._cache_namespace() for kwargs in options}
+        self.assertEqual(len(namespaces), len(options))
+        self.assertEqual(CSVDataHandler(self.data_path, workers=2)._cache_namespace(),
+                         CSVDataHandler(self.data_path, workers=4)._cache_namespace())
+
+    def test_parallel_handler_with_cache(self):
+        """Проверяем, что обработчик с кешем передается в пул процессов (кеш с блокировкой не сериализуется)."""
+        self.data_path.write_text("".join(f"{i}\n" for i in range(100)))
+        cache = ResultCache(self.cache_path)
+        handler = CSVDataHandler(self.data_path, workers=2, chunk_size=64, cache=cache)
+        result = handler.process_data()
+        self.assertEqual(result, SumResult(total=4950.0, count=100, incorrect_count=0))
+        self.assertEqual(cache.get(self.data_path, handler._cache_namespace()), result)
+
+    def test_content_hash_survives_touch(self):
+        """Проверяем, что с хешем содержимого файл с новым временем изменения остается в кеше."""
+        cache = ResultCache(self.cache_path, use_hash=True)
+        cache.put(self.data_path, 'CSVDataHandler', SumResult(total=3.0, count=2, incorrect_count=1))
+        os.utime(self.data_path, ns=(0, 0))
+        self.assertEqual(cache.get(self.data_path, 'CSVDataHandler').total, 3.0)
+
+    def test_lru_eviction_and_invalidate(self):
+        cache = ResultCache(self.cache_path, max_entries=2)
+        result = SumResult(total=3.0, count=2, incorrect_count=1)
+        for namespace in ('a', 'b'):
+            cache.put(self.data_path, namespace, result)
+        cache.get(self.data_path, 'a')
+        cache.put(self.data_path, 'c', result)
+        self.assertIsNone(cache.get(self.data_path, 'b'))
+        self.assertEqual(cache.invalidate(self.data_path), 2)
+        self.assertEqual(len(cache), 0)
+
+
+class TestIncrementalProcessor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        self.checkpoint = self.root / 'checkpoint.json'
+
+    def append(self, path: Path, content: str) -> None:
+        with path.open('a', newline='') as f:
+            f.write(content)
+
+    def test_appends_match_full_recompute(self):
+        """Проверяем, что после каждого дописывания (в том числе незавершенной строки) результат совпадает с полной обработкой."""
+        path = self.root / 'log.csv'
+        path.write_text('')
+        for chunk in ("0.1,0.2,x\n", "0.3,", "7\n1e-3,\r\n", "", "5,abc"):
+            self.append(path, chunk)
+            incremental = IncrementalProcessor(CSVDataHandler(path), self.checkpoint).process()
+            self.assertEqual(incremental, CSVDataHandler(path).process_data())
+
+    def test_json_lines(self):
+        path = self.root / 'log.ndjson'
+        path.write_text('1\n"2"\n')
+        IncrementalProcessor(JSONDataHandler(path), self.checkpoint).process()
+        self.append(path, 'null\n3.5\n')
+        result = IncrementalProcessor(JSONDataHandler(path), self.checkpoint).process()
+        self.assertEqual(result, SumResult(total=6.5, count=3, incorrect_count=1))
+
+    def test_truncated_or_rewritten_file_is_rescanned(self):
+        """Проверяем полную обработку, если файл усечен или его начало перезаписано."""
+        path = self.root / 'log.csv'
+        path.write_text("1,2,3\n4\n")
+        processor = IncrementalProcessor(CSVDataHandler(path), self.checkpoint)
+        self.assertEqual(processor.process().count, 4)
+        path.write_text("5\n")
+        self.assertEqual(processor.process(), SumResult(total=5.0, count=1, incorrect_count=0))
+        path.write_text("6\n7\n")
+        self.assertEqual(processor.process(), SumResult(total=13.0, count=2, incorrect_count=0))
+        self.assertEqual(processor.offset, 4)
+
+
+class TestColumnarFormat(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.source = Path(self.tmp.name) / 'values.csv'
+        self.source.write_text("".join(f"{i / 8},x,\n" if i % 5 else f"{-i}\n" for i in range(1003)))
+        self.path = Path(self.tmp.name) / 'values.dscol'
+
+    def test_roundtrip_matches_text_parse(self):
+        """Проверяем, что запись и чтение колоночного файла дают тот же результат, что и разбор CSV."""
+        expected = CSVDataHandler(self.source).process_data()
+        written = write_columnar(self.path, CSVDataHandler(self.source).iter_values(), block_size=100)
+        self.assertEqual(written, expected)
+        self.assertEqual(ColumnarDataHandler(self.path).process_data(), expected)
+        if numpy_engine.is_available():
+            result = ColumnarDataHandler(self.path, engine=ENGINE_NUMPY).process_data()
+            self.assertAlmostEqual(result.total, expected.total)
+            self.assertEqual(result[1:], expected[1:])
+
+    def test_invalid_positions_excluded_from_sketches(self):
+        write_columnar(self.path, [1.0, None, 3.0, None, 5.0])
+        for engine in (ENGINE_PYTHON, ENGINE_NUMPY):
+            with self.subTest(engine=engine):
+                sketches = Sketches()
+                ColumnarDataHandler(self.path, engine=engine, sketches=sketches).process_data()
+                self.assertEqual(sketches.report()["distinct"], 3)
+
+    @unittest.skipUnless(parquet_available(), "pyarrow не установлен")
+    def test_parquet_in_pipeline(self):
+        """Проверяем, что конвейер читает небольшой Parquet-файл так же, как пакетный режим."""
+        path = Path(self.tmp.name) / 'values.parquet'
+        write_parquet(path, [1.5, None, 2.0])
+        expected = SumResult(total=3.5, count=2, incorrect_count=1)
+        self.assertEqual(process_files([path]).total, expected)
+        batch = run_pipeline([path], Path(self.tmp.name) / 'out', write_json_results, '.json', parse_executor='thread')
+        self.assertEqual(batch.total, expected)
+
+    def test_pyarrow_is_imported_lazily(self):
+        """Проверяем, что pyarrow (а с ним и NumPy) не загружается при запуске, пока не нужен Parquet."""
+        code = "import sys, main, columnar_writer; columnar_writer.parquet_available(); print('pyarrow' in sys.modules)"
+        output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+        self.assertEqual(output.strip(), 'False')
+
+    def test_invalid_values_reported(self):
+        """Проверяем, что некорректные позиции из битовой карты (и null в Parquet) попадают в отчет."""
+        values = [1.0, None] + [2.0] * 10 + [None]
+        paths = [self.path]
+        write_columnar(self.path, values)
+        if parquet_available():
+            paths.append(Path(self.tmp.name) / 'values.parquet')
+            write_parquet(paths[-1], values, block_size=5)
+        for path in paths:
+            with self.subTest(path=path.suffix):
+                handler = ColumnarDataHandler(path)
+                self.assertEqual(handler.process_data().incorrect_count, 2)
+                self.assertEqual(handler.invalid_values.total, 2)
+                self.assertEqual(sorted(handler.invalid_values.sample), [(1, 'None'), (12, 'None')])
+
+    def test_corrupted_file(self):
+        self.path.write_bytes(b'not a columnar file at all')
+        with self.assertRaises(ValueError):
+            ColumnarDataHandler(self.path).process_data()
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_generated_datasets_are_readable(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cases = (('csv', CSVDataHandler), ('csv_gzip', CSVDataHandler), ('csv_bz2', CSVDataHandler),
+                     ('json', JSONDataHandler), ('ndjson', JSONDataHandler))
+            for name, handler_class in cases:
+                with self.subTest(name=name):
+                    path = Path(tmp) / f"{name}{benchmark.DATASET_SUFFIXES[name]}"
+                    benchmark.generate_dataset(name, path, 0.05, invalid_ratio=0.1)
+                    result = handler_class(path).process_data()
+                    self.assertGreater(result.count, 0)
+                    self.assertGreater(result.incorrect_count, 0)
+
+    def test_handler_cases_match_csv(self):
+        """Проверяем, что варианты обработки CSV (mmap, несколько процессов, сжатие) считают те же значения."""
+        with tempfile.TemporaryDirectory() as tmp:
+            results = {}
+            for name in ('csv', 'csv_fast', 'csv_parallel', 'csv_gzip', 'csv_gzip_to_disk'):
+                path = Path(tmp) / f"{name}{benchmark.DATASET_SUFFIXES[name]}"
+                benchmark.generate_dataset(name, path, 0.05, invalid_ratio=0.1)
+                results[name] = benchmark.run_benchmark(name, path, repeat=1, workers=2, buffer_size=1024)["items"]
+            self.assertEqual(len(set(results.values())), 1, results)
+            self.assertEqual(sorted(path.name for path in Path(tmp).iterdir()), sorted(
+                f"{name}{benchmark.DATASET_SUFFIXES[name]}" for name in results))
+
+    def test_speedups(self):
+        """Проверяем, что ускорение считается относительно опорного бенчмарка того же размера."""
+        benchmarks = {"csv@1MB": {"items_per_second": 100.0}, "csv_fast@1MB": {"items_per_second": 250.0},
+                      "csv_parallel@2MB": {"items_per_second": 400.0}, "csv_gzip": {"items_per_second": 30.0},
+                      "csv_gzip_to_disk": {"items_per_second": 20.0}}
+        self.assertEqual(benchmark.speedups(benchmarks), {
+            "csv_fast@1MB": {"reference": "csv@1MB", "ratio": 2.5},
+            "csv_gzip": {"reference": "csv_gzip_to_disk", "ratio": 1.5},
+        })
+
+    def test_percentile(self):
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(benchmark.percentile(values, 0.5), 50.0)
+        self.assertEqual(benchmark.percentile(values, 0.99), 99.0)
+        self.assertEqual(benchmark.percentile([3.0], 0.95), 3.0)
+
+    def test_compare_detects_regression(self):
+        baseline = {"benchmarks": {"csv": {"items_per_second": 1000.0}, "json": {"items_per_second": 1000.0}}}
+        results = {"benchmarks": {"csv": {"items_per_second": 850.0}, "json": {"items_per_second": 950.0},
+                                  "ndjson": {"items_per_second": 1.0}}}
+        regressions = benchmark.compare(results, baseline, threshold=0.1)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("csv:"))
+        self.assertEqual(benchmark.compare(results, baseline, threshold=0.2), [])
+
+    def test_peak_rss_checks(self):
+        """Проверяем, что рост пикового RSS относительно эталона и превышение предела считаются регрессиями."""
+        baseline = {"benchmarks": {"csv_fast": {"items_per_second": 1000.0, "peak_rss_mb": 25.0}}}
+        results = {"benchmarks": {"csv_fast": {"items_per_second": 1000.0, "peak_rss_mb": 211.0},
+                                  "csv": {"items_per_second": 1000.0, "peak_rss_mb": 25.0}}}
+        regressions = benchmark.compare(results, baseline)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("csv_fast:"))
+        self.assertEqual(benchmark.compare(results, baseline, rss_threshold=10), [])
+        self.assertEqual([regression.split(":")[0] for regression in benchmark.check_peak_rss(results, 64)],
+                         ["csv_fast"])
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / 'values.csv'
+        self.path.write_text("1,2,abc\n3\n")
+        metrics = instrumentation.metrics
+        self.addCleanup(setattr, metrics, 'enabled', metrics.enabled)
+        self.addCleanup(metrics.reset)
+        metrics.reset()
+
+    def test_disabled_records_nothing(self):
+        instrumentation.metrics.enabled = False
+        CSVDataHandler(self.path).process_data()
+        self.assertEqual(instrumentation.metrics.to_dict(), {"files": {}})
+
+    def test_stages_and_counters(self):
+        instrumentation.metrics.enabled = True
+        CSVDataHandler(self.path).process_data()
+        output_path = Path(self.tmp.name) / 'results.json'
+        write_json_results(output_path, SumResult(total=6.0, count=3, incorrect_count=1), 2.0)
+        files = instrumentation.metrics.to_dict()["files"]
+        entry = files[str(self.path)]
+        self.assertEqual(set(entry["stages"]), {instrumentation.STAGE_OPEN, instrumentation.STAGE_PROCESS})
+        self.assertEqual(entry["counters"], {"bytes_read": self.path.stat().st_size, "items": 4, "invalid_items": 1})
+        self.assertIn("items_per_second", entry)
+        self.assertEqual(files[str(output_path)]["stages"][instrumentation.STAGE_WRITE]["calls"], 1)
+
+    def test_process_pool_metrics_are_merged(self):
+        instrumentation.metrics.enabled = True
+        process_files([self.path], workers=1, executor=EXECUTOR_PROCESS)
+        counters = instrumentation.metrics.to_dict()["files"][str(self.path)]["counters"]
+        self.assertEqual(counters["items"], 4)
+
+    def test_export_formats(self):
+        instrumentation.metrics.enabled = True
+        CSVDataHandler(self.path).process_data()
+        prom_path = Path(self.tmp.name) / 'metrics.prom'
+        instrumentation.metrics.export(prom_path)
+        text = prom_path.read_text(encoding='utf-8')
+        self.assertIn(f'datastats_items_total{{file="{self.path}"}} 4', text)
+        self.assertIn('datastats_stage_seconds_total{stage="process"', text)
+        json_path = Path(self.tmp.name) / 'metrics.json'
+        instrumentation.metrics.export(json_path)
+        self.assertIn(str(self.path), json.loads(json_path.read_text(encoding='utf-8'))["files"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,11 @@
 import unittest
 import random
 import logging
+import math
+import statistics
 from unittest.mock import patch
-from data_processor import DataProcessor, SumResult, AverageResult, process_data
+from data_processor import DataProcessor, SumResult, AverageResult, process_data, safe_add
+from invalid_values import InvalidValueReport, CATEGORY_NAN, CATEGORY_NONE, CATEGORY_STRING, CATEGORY_TYPE
 from logger_config import setup_logger
 
 
@@ -124,6 +127,91 @@ class TestDataProcessor(unittest.TestCase):
         self.assertAlmostEqual(self.processor.total_sum, 3.14)
         self.assertEqual(self.processor.count, 1)
 
+    def test_compensated_sum(self):
+        """Проверяем, что сумма значений разного порядка не теряет точность."""
+        for value in [1e16, 1.0, -1e16, 1.0] * 1000:
+            self.processor.add_value(value)
+        self.assertEqual(self.processor.total_sum, 2000.0)
+
+    def test_dispersion_statistics(self):
+        """Проверяем минимум, максимум, дисперсию, асимметрию и эксцесс на известных данных."""
+        data = [2, 4, 4, 4, 5, 5, 7, 9]
+        for value in data:
+            self.processor.add_value(value)
+        results = self.processor.calculate_results()
+        self.assertEqual(results.minimum, 2)
+        self.assertEqual(results.maximum, 9)
+        self.assertAlmostEqual(results.variance, statistics.pvariance(data))
+        self.assertAlmostEqual(results.stddev, 2.0)
+        mean = statistics.fmean(data)
+        m2 = sum((x - mean) ** 2 for x in data) / len(data)
+        m3 = sum((x - mean) ** 3 for x in data) / len(data)
+        m4 = sum((x - mean) ** 4 for x in data) / len(data)
+        self.assertAlmostEqual(results.skewness, m3 / m2 ** 1.5)
+        self.assertAlmostEqual(results.kurtosis, m4 / m2 ** 2 - 3)
+
+    def test_merge_matches_single_pass(self):
+        """Проверяем, что объединение частичных результатов совпадает с обработкой за один проход."""
+        rng = random.Random(42)
+        data = [rng.gauss(1000, 50) for _ in range(3000)]
+        for value in data:
+            self.processor.add_value(value)
+        merged = DataProcessor()
+        for start, stop in ((0, 1), (1, 1700), (1700, len(data))):
+            part = DataProcessor()
+            for value in data[start:stop]:
+                part.add_value(value)
+            part.add_incorrect()
+            merged.merge(part)
+        expected = self.processor.calculate_results()
+        actual = merged.calculate_results()
+        self.assertEqual(actual.count, expected.count)
+        self.assertEqual(actual.incorrect_count, 3)
+        for field in ('total', 'average', 'minimum', 'maximum', 'variance', 'skewness', 'kurtosis'):
+            self.assertTrue(math.isclose(getattr(actual, field), getattr(expected, field), rel_tol=1e-9, abs_tol=1e-9),
+                            field)
+
+
+class TestInvalidValues(unittest.TestCase):
+    def test_categories_and_single_summary(self):
+        """Проверяем, что некорректные значения считаются по категориям, а в лог пишется одна сводка."""
+        data = [1, None, 'abc', float('nan'), float('inf'), [2], 10 ** 400, 3.5] * 100
+        with patch('data_processor.logger') as mock_logger:
+            mock_logger.isEnabledFor.return_value = True
+            sum_result, _ = process_data(data)
+        self.assertEqual(sum_result.total, 450.0)
+        self.assertEqual(sum_result.incorrect_count, 600)
+        mock_logger.error.assert_not_called()
+        mock_logger.warning.assert_called_once()
+
+    def test_report_counts_and_bounded_sample(self):
+        processor = DataProcessor(invalid_values=InvalidValueReport(sample_size=5, seed=1))
+        for item in [None, 'x', float('nan'), {}] * 50:
+            processor.add_invalid(item)
+        report = processor.invalid_values
+        self.assertEqual(report.counts, {CATEGORY_NONE: 50, CATEGORY_STRING: 50, CATEGORY_NAN: 50, CATEGORY_TYPE: 50})
+        self.assertEqual(len(report.sample), 5)
+        self.assertTrue(all(0 <= position < 200 for position, _ in report.sample))
+
+    def test_numeric_string_is_type_error(self):
+        """Проверяем, что строка с числом, которую отклоняет to_value, считается значением неподдерживаемого
+        типа, а не NaN/inf."""
+        processor = DataProcessor()
+        for item in ['5', 'nan', float('inf'), 'abc']:
+            safe_add(processor, item)
+        self.assertEqual(processor.invalid_values.counts,
+                         {CATEGORY_NONE: 0, CATEGORY_STRING: 1, CATEGORY_NAN: 1, CATEGORY_TYPE: 2})
+
+    def test_merge_shifts_positions(self):
+        first, second = DataProcessor(), DataProcessor()
+        first.add_value(1.0)
+        first.add_invalid('a')
+        second.add_invalid(None)
+        first.merge(second)
+        self.assertEqual(first.invalid_values.sample, [(1, "'a'"), (2, 'None')])
+        self.assertEqual(first.incorrect_count, 2)
+
+
 class TestLogging(unittest.TestCase):
     @patch('logging.Logger.info')
     def test_logging_info_message(self, mock_info):
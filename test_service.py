@@ -0,0 +1,155 @@
+import gzip
+import http.client
+import json
+import socket
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from batch_processor import EXECUTOR_PROCESS, EXECUTOR_THREAD
+from service import ServiceHTTPServer, ServiceUnixServer, StatsService, UnixHTTPConnection
+
+
+class TestService(unittest.TestCase):
+    executor = EXECUTOR_THREAD
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        (self.root / 'values.csv').write_text("1,2,abc\n3\n")
+        self.service = StatsService(self.root, workers=2, executor=self.executor, max_delay=0.05)
+        self.addCleanup(self.service.close)
+        self.server = ServiceHTTPServer(('127.0.0.1', 0), self.service)
+        self.addCleanup(self.server.server_close)
+        thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        self.addCleanup(self.server.shutdown)
+
+    def request(self, method, url, body=None, headers=None):
+        connection = http.client.HTTPConnection('127.0.0.1', self.server.server_address[1], timeout=10)
+        try:
+            connection.request(method, url, body=body, headers=headers or {})
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            connection.close()
+
+    def test_health(self):
+        self.assertEqual(self.request('GET', '/health'), (200, {"status": "ok", "workers": 2}))
+
+    def test_workers_are_started(self):
+        """Проверяем, что все воркеры пула запущены до первого запроса."""
+        pool = self.service.pool
+        workers = pool._processes if self.executor == EXECUTOR_PROCESS else pool._threads
+        self.assertEqual(len(workers), 2)
+
+    def test_file_request(self):
+        status, result = self.request('POST', '/files', json.dumps({"path": "values.csv"}))
+        self.assertEqual(status, 200)
+        self.assertEqual(result, {"total": 6.0, "count": 3, "incorrect_count": 1, "average": 2.0})
+
+    def test_data_request(self):
+        for query, body in (('format=csv', b"1,2,abc\n3\n"), ('format=json', b'[1, 2, "abc", 3]'),
+                            ('format=ndjson&engine=numpy', gzip.compress(b'1\n2\n"abc"\n3\n'))):
+            with self.subTest(query=query):
+                status, result = self.request('POST', f'/data?{query}', body)
+                self.assertEqual(status, 200)
+                self.assertEqual(result["total"], 6.0)
+                self.assertEqual(result["incorrect_count"], 1)
+
+    def test_errors(self):
+        broken = gzip.compress(b"1,2\n" * 1000)[:-20]
+        (self.root / 'broken.csv.gz').write_bytes(broken)
+        cases = [
+            ('/files', json.dumps({"path": "broken.csv.gz"}), 422),
+            ('/data?format=csv', broken, 422),
+            ('/files', json.dumps({"path": "missing.csv"}), 404),
+            ('/files', json.dumps({"path": "../outside.csv"}), 403),
+            ('/files', b'not json', 400),
+            ('/data?format=xml', b'1', 400),
+            ('/data?format=json&engine=fortran', b'[1]', 400),
+            ('/data?format=json', b'[1, 2', 422),
+            ('/unknown', b'', 404),
+        ]
+        for url, body, expected in cases:
+            with self.subTest(url=url, body=body):
+                status, result = self.request('POST', url, body)
+                self.assertEqual(status, expected)
+                self.assertIn("error", result)
+
+    def test_negative_content_length(self):
+        """Проверяем, что отрицательный Content-Length отклоняется, а не обходит ограничение размера тела."""
+        self.service.max_body_size = 10
+        status, result = self.request('POST', '/data?format=csv', b"1," * 100, headers={'Content-Length': '-1'})
+        self.assertEqual(status, 400)
+        self.assertIn("error", result)
+
+    def test_rejected_body_is_not_read_as_next_request(self):
+        """Проверяем, что после отказа без чтения тела (411, 400, 413) соединение закрывается, и тело,
+        похожее на запрос, не получает второго ответа."""
+        self.service.max_body_size = 10
+        body = b"GET /health HTTP/1.1\r\nHost: localhost\r\n\r\n"
+        for header, expected in ((b'', b'411'), (b'Content-Length: -1\r\n', b'400'),
+                                 (b'Content-Length: %d\r\n' % len(body), b'413')):
+            with self.subTest(status=expected):
+                with socket.create_connection(('127.0.0.1', self.server.server_address[1]), timeout=5) as sock:
+                    sock.sendall(b'POST /data?format=csv HTTP/1.1\r\nHost: localhost\r\n' + header + b'\r\n' + body)
+                    response = b''
+                    while True:
+                        chunk = sock.recv(4096)
+                        if not chunk:
+                            break
+                        response += chunk
+                self.assertTrue(response.startswith(b'HTTP/1.1 ' + expected))
+                self.assertIn(b'Connection: close', response)
+                self.assertEqual(response.count(b'HTTP/1.1 '), 1)
+
+    def test_concurrent_requests_are_batched(self):
+        """Проверяем, что одновременные запросы обрабатываются меньшим числом заданий пула."""
+        body = json.dumps({"path": "values.csv"})
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            responses = list(pool.map(lambda _: self.request('POST', '/files', body), range(32)))
+        self.assertTrue(all(status == 200 and result["total"] == 6.0 for status, result in responses))
+        self.assertLess(self.service.batcher.batches, 32)
+
+    def test_failed_request_does_not_fail_batch(self):
+        """Ошибка разбора одного запроса (RecursionError) не должна влиять на другие запросы той же пачки."""
+        requests = [('/files', json.dumps({"path": "values.csv"}))] * 4 + [('/data?format=json', b'[' * 100000)]
+        with ThreadPoolExecutor(max_workers=len(requests)) as pool:
+            responses = list(pool.map(lambda request: self.request('POST', *request), requests))
+        self.assertEqual([status for status, _ in responses], [200] * 4 + [422])
+        self.assertTrue(all(result["total"] == 6.0 for _, result in responses[:4]))
+        self.assertLess(self.service.batcher.batches, len(requests))
+
+
+class TestServiceProcessPool(TestService):
+    executor = EXECUTOR_PROCESS
+
+
+class TestServiceUnixSocket(unittest.TestCase):
+    def test_unix_socket(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / 'values.csv').write_text("1,2\n")
+            service = StatsService(root, workers=1, executor=EXECUTOR_THREAD)
+            socket_path = root / 'service.sock'
+            server = ServiceUnixServer(socket_path, service)
+            threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+            try:
+                connection = UnixHTTPConnection(socket_path, timeout=10)
+                connection.request('POST', '/files', body=json.dumps({"path": "values.csv"}))
+                response = connection.getresponse()
+                self.assertEqual(response.status, 200)
+                self.assertEqual(json.loads(response.read())["total"], 3.0)
+                connection.close()
+            finally:
+                server.shutdown()
+                server.server_close()
+                service.close()
+            self.assertFalse(socket_path.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
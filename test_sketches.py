@@ -0,0 +1,81 @@
+import bisect
+import json
+import random
+import tempfile
+import unittest
+from pathlib import Path
+from data_handler import SimpleDataHandler
+from data_processor import DataProcessor
+from json_result_writer import write_json_results
+from sketches import Sketches, KLLSketch, HyperLogLog
+
+
+class TestSketches(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        self.data = [rng.gauss(0, 1) for _ in range(50000)]
+        self.sorted_data = sorted(self.data)
+
+    def rank(self, value: float) -> float:
+        return bisect.bisect_left(self.sorted_data, value) / len(self.sorted_data)
+
+    def test_quantiles_within_error_bound(self):
+        """Проверяем, что ранги приближенных квантилей отличаются от точных не более чем на 2%."""
+        sketch = KLLSketch(seed=1)
+        for value in self.data:
+            sketch.add(value)
+        for fraction, value in zip((0.5, 0.95, 0.99), sketch.quantiles((0.5, 0.95, 0.99))):
+            self.assertAlmostEqual(self.rank(value), fraction, delta=0.02)
+        self.assertLess(sum(len(c) for c in sketch.compactors), 1000)
+
+    def test_merge_and_serialization(self):
+        """Проверяем, что скетчи частей после сериализации и объединения дают оценку по всем данным."""
+        parts = [Sketches(seed=i) for i in range(3)]
+        for i, value in enumerate(self.data):
+            parts[i % 3].add(value)
+        merged = Sketches.from_dict(json.loads(json.dumps(parts[0].to_dict())))
+        for part in parts[1:]:
+            merged.merge(Sketches.from_dict(json.loads(json.dumps(part.to_dict()))))
+        report = merged.report()
+        self.assertAlmostEqual(self.rank(report["p50"]), 0.5, delta=0.02)
+        self.assertAlmostEqual(report["distinct"], len(self.data), delta=len(self.data) * 0.03)
+
+    def test_distinct_count(self):
+        counter = HyperLogLog()
+        for i in range(20000):
+            counter.add(float(i % 5000))
+        self.assertAlmostEqual(counter.count(), 5000, delta=5000 * 0.03)
+        with self.assertRaises(ValueError):
+            counter.merge(HyperLogLog(precision=10))
+
+    def test_distinct_values_with_equal_hash(self):
+        """Проверяем, что значения с одинаковым hash() считаются разными, а 0.0 и -0.0 — одним значением."""
+        counter = HyperLogLog()
+        for value in (-1.0, -2.0, 0.0, -0.0, 1.0, 2.0 ** 61):
+            counter.add(value)
+        self.assertEqual(counter.count(), 5)
+
+    def test_filled_in_same_pass(self):
+        """Проверяем, что DataProcessor и DataHandler заполняют скетчи только корректными значениями."""
+        processor = DataProcessor(sketches=Sketches())
+        for value in (1, 2, 2, 3):
+            processor.add_value(value)
+        self.assertEqual(processor.sketches.report()["distinct"], 3)
+
+        handler = SimpleDataHandler(sketches=Sketches())
+        handler.process_data(['1', 'x', '5', None, '3'])
+        self.assertEqual(handler.sketches.report(), {"p50": 3.0, "p95": 5.0, "p99": 5.0, "distinct": 3})
+
+    def test_written_to_json_results(self):
+        sketches = Sketches()
+        sketches.update([1.0, 2.0, 3.0])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'results.json'
+            write_json_results(path, DataProcessor().calculate_results(), None, sketches)
+            results = json.loads(path.read_text(encoding='utf-8'))
+        self.assertEqual(results["Количество уникальных значений"], 3)
+        self.assertEqual(results["Квантили"]["p50"], 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import json
+import math
+import random
+import tempfile
+import unittest
+from pathlib import Path
+from window_aggregator import (SlidingWindow, StreamingResultWriter, TimeBuckets, WindowedAggregator, follow,
+                               parse_line)
+
+
+class TestSlidingWindow(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(3)
+        self.values = [rng.uniform(-1e6, 1e6) for _ in range(5000)]
+
+    def test_count_window_matches_brute_force(self):
+        """Проверяем сумму, минимум и максимум окна по количеству на каждом шаге."""
+        window = SlidingWindow(size=100)
+        for i, value in enumerate(self.values):
+            window.add(value, float(i))
+            expected = self.values[max(0, i - 99):i + 1]
+            self.assertEqual(window.count, len(expected))
+            self.assertTrue(math.isclose(window.total, math.fsum(expected), rel_tol=1e-9, abs_tol=1e-6))
+            self.assertEqual(window.minimum, min(expected))
+            self.assertEqual(window.maximum, max(expected))
+
+    def test_time_window_matches_brute_force(self):
+        window = SlidingWindow(duration=10.0)
+        timestamps = [i * 0.7 for i in range(len(self.values))]
+        for i, (value, timestamp) in enumerate(zip(self.values, timestamps)):
+            window.add(value, timestamp)
+            expected = [v for v, t in zip(self.values[:i + 1], timestamps) if t > timestamp - 10.0]
+            self.assertEqual(window.count, len(expected))
+            self.assertTrue(math.isclose(window.total, math.fsum(expected), rel_tol=1e-9, abs_tol=1e-6))
+            self.assertEqual((window.minimum, window.maximum), (min(expected), max(expected)))
+        window.evict(timestamps[-1] + 100)
+        self.assertEqual((window.count, window.total, window.minimum), (0, 0.0, None))
+
+    def test_invalid_parameters(self):
+        for kwargs in ({}, {"size": 0}, {"duration": -1.0}):
+            with self.subTest(kwargs=kwargs):
+                with self.assertRaises(ValueError):
+                    SlidingWindow(**kwargs)
+
+
+class TestWindowedAggregator(unittest.TestCase):
+    def test_buckets_close_on_boundary(self):
+        buckets = TimeBuckets(60.0)
+        self.assertEqual(buckets.add(1.0, 1.0, 5.0), [])
+        self.assertEqual(buckets.add("abc", None, 59.9), [])
+        closed = buckets.add(3.0, 3.0, 125.0)
+        self.assertEqual(len(closed), 1)
+        self.assertEqual(closed[0]["start"], "1970-01-01T00:00:00+00:00")
+        self.assertEqual((closed[0]["total"], closed[0]["count"], closed[0]["incorrect_count"]), (1.0, 1, 1))
+        self.assertEqual(buckets.close_until(179.0), [])
+        self.assertEqual(buckets.close_until(180.0)[0]["start"], "1970-01-01T00:02:00+00:00")
+
+    def test_stream(self):
+        aggregator = WindowedAggregator(window_size=2, window_seconds=30.0, bucket_seconds=60.0, emit_every=2)
+        results = []
+        for timestamp, item in ((0, 1), (10, None), (20, 2), (50, 4), (70, float('nan')), (80, 8)):
+            results.extend(aggregator.add(item, float(timestamp)))
+        results.extend(aggregator.flush())
+
+        windows = [r for r in results if r["type"] == "window"]
+        self.assertEqual([(r["window"], r["total"]) for r in windows],
+                         [("count", 3.0), ("time", 3.0), ("count", 12.0), ("time", 8.0)])
+        buckets = [r for r in results if r["type"] == "bucket"]
+        self.assertEqual([(r["total"], r["count"], r["incorrect_count"]) for r in buckets], [(7.0, 3, 1), (8.0, 1, 1)])
+        result = aggregator.processor.calculate_results()
+        self.assertEqual((result.total, result.count, result.incorrect_count), (15.0, 4, 2))
+
+    def test_tick_closes_idle_bucket(self):
+        aggregator = WindowedAggregator(window_seconds=5.0, bucket_seconds=60.0, clock=lambda: 0.0)
+        aggregator.add(2.0)
+        self.assertEqual(aggregator.tick(30.0), [])
+        self.assertEqual(aggregator.windows[0].count, 0)
+        self.assertEqual(len(aggregator.tick(61.0)), 1)
+
+    def test_data_time_is_not_mixed_with_wall_clock(self):
+        """Проверяем, что без источника времени tick() не сдвигает время данных к настенным часам."""
+        aggregator = WindowedAggregator(window_seconds=5.0, bucket_seconds=60.0, clock=None)
+        aggregator.add(1.0, 1000.0)
+        self.assertEqual(aggregator.tick(), [])
+        aggregator.add(2.0, 1001.0)
+        self.assertEqual(aggregator.windows[0].count, 2)
+        self.assertEqual(aggregator.windows[0].result(1001.0)["total"], 3.0)
+        aggregator.add("3")
+        result = aggregator.processor.calculate_results()
+        self.assertEqual((result.count, result.incorrect_count), (2, 1))
+        self.assertEqual(aggregator.flush()[0]["start"], "1970-01-01T00:16:00+00:00")
+
+    def test_parse_line(self):
+        self.assertEqual(parse_line("1.5"), (1.5, None))
+        self.assertEqual(parse_line("abc"), ("abc", None))
+        self.assertEqual(parse_line("100,2", timestamps=True), (2.0, 100.0))
+        self.assertEqual(parse_line("bad,2", timestamps=True), ("bad,2", None))
+
+
+class TestStreamingIO(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_writer_appends(self):
+        path = Path(self.tmp.name) / 'results.ndjson'
+        for i in range(2):
+            with StreamingResultWriter(path) as writer:
+                writer.write([{"type": "window", "total": i}])
+                self.assertEqual(len(path.read_text(encoding='utf-8').splitlines()), i + 1)
+        self.assertEqual([json.loads(line)["total"] for line in path.read_text(encoding='utf-8').splitlines()], [0, 1])
+
+    def test_follow_reads_appended_lines(self):
+        path = Path(self.tmp.name) / 'values.log'
+        path.write_text("1\n2")
+        lines = follow(path, from_start=True, poll_interval=0.01)
+        self.assertEqual(next(lines), "1")
+        self.assertIsNone(next(lines))
+        with path.open('a') as f:
+            f.write("\n3\n")
+        self.assertEqual([next(lines), next(lines)], ["2", "3"])
+        self.assertIsNone(next(lines))
+        path.write_text("4\n")
+        self.assertEqual(next(lines), "4")
+        lines.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
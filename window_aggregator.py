@@ -0,0 +1,434 @@
+"""
+Оконная агрегация потоков: скользящие суммы и средние по последним N значениям или последним T секундам
+и поминутные (в общем случае — по `bucket_seconds`) корзины.
+
+Скользящее окно обновляется за O(1) амортизированно: при вытеснении значение вычитается из суммы,
+а минимум и максимум берутся из монотонных очередей. Чтобы ошибка округления от вычитаний не накапливалась,
+сумма пересчитывается по содержимому окна после каждых `len(окна)` вытеснений (тоже O(1) амортизированно).
+Корзины считаются через `DataProcessor`, поэтому для каждой из них доступны те же показатели, что и для файла
+целиком (минимум, максимум, дисперсия, некорректные значения).
+
+Данные читаются из stdin или из файла, который дописывается (как `tail -f`); результаты дописываются
+в файл NDJSON по мере готовности, а не перезаписываются целиком.
+
+Пример:
+    python window_aggregator.py --window-size 1000 --window-seconds 300 --output windows.ndjson < values.txt
+    python window_aggregator.py --follow /var/log/values.log --bucket-seconds 60 --output minutes.ndjson
+"""
+import argparse
+import json
+import logging
+import math
+import signal
+import sys
+import time
+from collections import deque
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, TextIO, Tuple
+from data_processor import DataProcessor, to_value
+from logger_config import setup_logger
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKET_SECONDS = 60.0
+DEFAULT_EMIT_EVERY = 100
+DEFAULT_POLL_INTERVAL = 0.5
+
+WINDOW_COUNT = 'count'
+WINDOW_TIME = 'time'
+
+
+class SlidingWindow:
+    """
+    Скользящее окно по последним `size` значениям и/или по значениям за последние `duration` секунд.
+    """
+    def __init__(self, size: Optional[int] = None, duration: Optional[float] = None) -> None:
+        """
+        Args:
+            size (Optional[int]): Максимальное количество значений в окне.
+            duration (Optional[float]): Длительность окна в секундах.
+        """
+        if size is None and duration is None:
+            raise ValueError("Нужно задать размер окна или его длительность.")
+        if (size is not None and size <= 0) or (duration is not None and duration <= 0):
+            raise ValueError("Размер и длительность окна должны быть положительными.")
+        self.size = size
+        self.duration = duration
+        self.total = 0.0
+        self._values: Deque[Tuple[float, float]] = deque()
+        self._minimums: Deque[Tuple[int, float]] = deque()
+        self._maximums: Deque[Tuple[int, float]] = deque()
+        self._index = 0
+        self._evictions = 0
+
+    @property
+    def kind(self) -> str:
+        return WINDOW_COUNT if self.size is not None else WINDOW_TIME
+
+    @property
+    def count(self) -> int:
+        return len(self._values)
+
+    @property
+    def average(self) -> Optional[float]:
+        return self.total / len(self._values) if self._values else None
+
+    @property
+    def minimum(self) -> Optional[float]:
+        return self._minimums[0][1] if self._minimums else None
+
+    @property
+    def maximum(self) -> Optional[float]:
+        return self._maximums[0][1] if self._maximums else None
+
+    def add(self, value: float, timestamp: float) -> None:
+        """
+        Добавляет значение и вытесняет устаревшие.
+
+        Args:
+            value (float): Корректное числовое значение.
+            timestamp (float): Время значения в секундах; предполагается, что время не убывает.
+        """
+        index = self._index
+        self._index += 1
+        self._values.append((timestamp, value))
+        self.total += value
+        while self._minimums and self._minimums[-1][1] >= value:
+            self._minimums.pop()
+        self._minimums.append((index, value))
+        while self._maximums and self._maximums[-1][1] <= value:
+            self._maximums.pop()
+        self._maximums.append((index, value))
+        self.evict(timestamp)
+
+    def evict(self, now: float) -> None:
+        """
+        Вытесняет значения, вышедшие за размер окна или старше `now - duration`.
+        """
+        values = self._values
+        while values and ((self.size is not None and len(values) > self.size)
+                          or (self.duration is not None and values[0][0] <= now - self.duration)):
+            _, value = values.popleft()
+            self.total -= value
+            first = self._index - len(values)
+            while self._minimums and self._minimums[0][0] < first:
+                self._minimums.popleft()
+            while self._maximums and self._maximums[0][0] < first:
+                self._maximums.popleft()
+            self._evictions += 1
+        if not values:
+            self.total = 0.0
+            self._evictions = 0
+        elif self._evictions >= len(values):
+            self.total = math.fsum(value for _, value in values)
+            self._evictions = 0
+
+    def result(self, timestamp: float) -> Dict[str, Any]:
+        return {
+            "type": "window",
+            "window": self.kind,
+            "size": self.size if self.size is not None else self.duration,
+            "timestamp": timestamp,
+            "count": self.count,
+            "total": self.total,
+            "average": self.average,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+        }
+
+
+def _isoformat(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class TimeBuckets:
+    """
+    Корзины фиксированной длительности (по умолчанию поминутные), выровненные по границам эпохи.
+
+    Каждая корзина — отдельный `DataProcessor`. Корзина закрывается, когда приходит значение с более поздним
+    временем (или по `close_until`); значения с временем раньше начала текущей корзины учитываются в ней.
+    Корзины без данных не выводятся.
+    """
+    def __init__(self, seconds: float = DEFAULT_BUCKET_SECONDS) -> None:
+        if seconds <= 0:
+            raise ValueError("Длительность корзины должна быть положительной.")
+        self.seconds = seconds
+        self.start: Optional[float] = None
+        self.processor: Optional[DataProcessor] = None
+
+    def _bucket_start(self, timestamp: float) -> float:
+        return math.floor(timestamp / self.seconds) * self.seconds
+
+    def add(self, item: Any, value: Optional[float], timestamp: float) -> List[Dict[str, Any]]:
+        """
+        Учитывает элемент в корзине его времени.
+
+        Args:
+            item (Any): Исходный элемент (для отчета о некорректных значениях).
+            value (Optional[float]): Значение элемента или None, если элемент некорректен.
+            timestamp (float): Время элемента в секундах эпохи.
+
+        Returns:
+            List[Dict[str, Any]]: Результаты закрытых при этом корзин.
+        """
+        closed = self.close_until(timestamp)
+        if self.processor is None:
+            self.start = self._bucket_start(timestamp)
+            self.processor = DataProcessor()
+        if value is None:
+            self.processor.add_invalid(item)
+        else:
+            self.processor.add_value(value)
+        return closed
+
+    def close_until(self, now: float) -> List[Dict[str, Any]]:
+        """
+        Закрывает текущую корзину, если `now` уже за ее концом.
+        """
+        if self.processor is None or now < self.start + self.seconds:
+            return []
+        return self.flush()
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """
+        Закрывает текущую корзину независимо от времени (например, в конце потока).
+        """
+        if self.processor is None:
+            return []
+        result = {"type": "bucket", "start": _isoformat(self.start), "end": _isoformat(self.start + self.seconds)}
+        result.update(asdict(self.processor.calculate_results()))
+        self.processor = None
+        return [result]
+
+
+class WindowedAggregator:
+    """
+    Скользящие окна и корзины по потоку элементов, а также общий итог через `DataProcessor`.
+    """
+    def __init__(self, window_size: Optional[int] = None, window_seconds: Optional[float] = None,
+                 bucket_seconds: Optional[float] = DEFAULT_BUCKET_SECONDS, emit_every: int = DEFAULT_EMIT_EVERY,
+                 clock: Optional[Callable[[], float]] = time.time) -> None:
+        """
+        Args:
+            window_size (Optional[int]): Размер окна по количеству значений.
+            window_seconds (Optional[float]): Длительность окна по времени в секундах.
+            bucket_seconds (Optional[float]): Длительность корзины; None — без корзин.
+            emit_every (int): Результаты окон выводятся после каждых `emit_every` корректных значений.
+            clock (Optional[Callable[[], float]]): Источник времени для элементов без метки времени и для `tick()`
+                без аргумента. None — время берется только из данных: элемент без метки времени считается
+                некорректным, а `tick()` без аргумента ничего не делает (настенное время не смешивается со временем
+                данных, например при чтении исторического файла).
+        """
+        if emit_every <= 0:
+            raise ValueError("Период вывода должен быть положительным.")
+        self.windows: List[SlidingWindow] = []
+        if window_size is not None:
+            self.windows.append(SlidingWindow(size=window_size))
+        if window_seconds is not None:
+            self.windows.append(SlidingWindow(duration=window_seconds))
+        self.buckets = TimeBuckets(bucket_seconds) if bucket_seconds is not None else None
+        self.emit_every = emit_every
+        self.clock = clock
+        self.processor = DataProcessor()
+        self._last_timestamp = -math.inf
+        self._since_emit = 0
+
+    def add(self, item: Any, timestamp: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Учитывает элемент.
+
+        Args:
+            item (Any): Элемент данных.
+            timestamp (Optional[float]): Время элемента в секундах эпохи; по умолчанию текущее по `clock`. Время,
+                меньшее предыдущего, заменяется предыдущим.
+
+        Returns:
+            List[Dict[str, Any]]: Результаты, готовые к выводу: закрытые корзины и, раз в `emit_every`
+            значений, состояние окон.
+        """
+        if timestamp is None:
+            if self.clock is None:
+                self.processor.add_invalid(item)
+                return []
+            timestamp = self.clock()
+        timestamp = max(timestamp, self._last_timestamp)
+        self._last_timestamp = timestamp
+
+        value = to_value(item)
+        results = self.buckets.add(item, value, timestamp) if self.buckets is not None else []
+        if value is None:
+            self.processor.add_invalid(item)
+            return results
+        self.processor.add_value(value)
+        for window in self.windows:
+            window.add(value, timestamp)
+        self._since_emit += 1
+        if self._since_emit >= self.emit_every:
+            self._since_emit = 0
+            results.extend(window.result(timestamp) for window in self.windows)
+        return results
+
+    def tick(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Продвигает время без новых данных: вытесняет устаревшие значения из окон по времени
+        и закрывает завершившуюся корзину.
+
+        Args:
+            now (Optional[float]): Текущее время; по умолчанию по `clock` (без `clock` время не продвигается).
+        """
+        if now is None:
+            if self.clock is None:
+                return []
+            now = self.clock()
+        now = max(now, self._last_timestamp)
+        self._last_timestamp = now
+        for window in self.windows:
+            window.evict(now)
+        return self.buckets.close_until(now) if self.buckets is not None else []
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """
+        Завершает поток: закрывает текущую корзину и выводит итоговое состояние окон.
+        """
+        results = self.buckets.flush() if self.buckets is not None else []
+        if self._since_emit:
+            self._since_emit = 0
+            results.extend(window.result(self._last_timestamp) for window in self.windows)
+        return results
+
+
+class StreamingResultWriter:
+    """
+    Дописывает результаты в файл NDJSON по одному на строку, сбрасывая буфер после каждой записи,
+    чтобы результаты были видны читателям файла сразу.
+    """
+    def __init__(self, file_path: Optional[Path] = None) -> None:
+        """
+        Args:
+            file_path (Optional[Path]): Файл результатов (дописывается); по умолчанию stdout.
+        """
+        self.file_path = file_path
+        self._file: TextIO = file_path.open('a', encoding='utf-8') if file_path is not None else sys.stdout
+
+    def write(self, results: List[Dict[str, Any]]) -> None:
+        if not results:
+            return
+        self._file.write("".join(json.dumps(result, ensure_ascii=False) + "\n" for result in results))
+        self._file.flush()
+
+    def close(self) -> None:
+        if self.file_path is not None:
+            self._file.close()
+
+    def __enter__(self) -> "StreamingResultWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def follow(file_path: Path, from_start: bool = False,
+           poll_interval: float = DEFAULT_POLL_INTERVAL) -> Iterator[Optional[str]]:
+    """
+    Читает строки, которые дописываются в файл (как `tail -f`).
+
+    Незавершенная последняя строка выдается только после того, как будет дописан ее перевод строки.
+    Если файл усечен (например, при ротации), чтение начинается с начала.
+
+    Args:
+        file_path (Path): Путь к файлу.
+        from_start (bool): Прочитать и уже записанные строки; иначе — только новые.
+        poll_interval (float): Пауза между проверками файла в секундах.
+
+    Returns:
+        Iterator[Optional[str]]: Строки без перевода строки; None, если новых данных пока нет
+        (чтобы вызывающий код мог продвинуть время, см. `WindowedAggregator.tick`).
+    """
+    with file_path.open('r', encoding='utf-8', newline='') as f:
+        if not from_start:
+            f.seek(0, 2)
+        pending = ''
+        while True:
+            line = f.readline()
+            if line:
+                pending += line
+                if pending.endswith('\n'):
+                    yield pending.rstrip('\r\n')
+                    pending = ''
+                continue
+            if file_path.stat().st_size < f.tell():
+                f.seek(0)
+                pending = ''
+                continue
+            yield None
+            time.sleep(poll_interval)
+
+
+def parse_line(line: str, timestamps: bool = False) -> Tuple[Any, Optional[float]]:
+    """
+    Разбирает строку входных данных: значение или, при `timestamps=True`, «время,значение».
+
+    Returns:
+        Tuple[Any, Optional[float]]: Элемент (число или исходная строка, если это не число) и время.
+        Строка с некорректным временем возвращается целиком как элемент без времени.
+    """
+    timestamp = None
+    if timestamps:
+        head, _, value = line.partition(',')
+        try:
+            timestamp = float(head)
+        except ValueError:
+            return line.strip(), None
+        line = value
+    text = line.strip()
+    try:
+        return float(text), timestamp
+    except ValueError:
+        return text, timestamp
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--follow", type=Path, default=None, help="Читать дописываемый файл вместо stdin.")
+    parser.add_argument("--from-start", action='store_true', help="С --follow прочитать и уже записанные строки.")
+    parser.add_argument("--window-size", type=int, default=None, help="Окно по количеству значений.")
+    parser.add_argument("--window-seconds", type=float, default=None, help="Окно по времени в секундах.")
+    parser.add_argument("--bucket-seconds", type=float, default=DEFAULT_BUCKET_SECONDS,
+                        help="Длительность корзины в секундах; 0 — без корзин.")
+    parser.add_argument("--emit-every", type=int, default=DEFAULT_EMIT_EVERY,
+                        help="Выводить состояние окон после каждых N значений.")
+    parser.add_argument("--timestamps", action='store_true',
+                        help="Строки имеют вид «время,значение» (время — секунды эпохи).")
+    parser.add_argument("--output", type=Path, default=None, help="Файл NDJSON для результатов (по умолчанию stdout).")
+    args = parser.parse_args()
+
+    setup_logger('logging_config.yaml')
+    # С --timestamps время берется только из данных: простой источника не должен закрывать корзины по настенным часам
+    aggregator = WindowedAggregator(window_size=args.window_size, window_seconds=args.window_seconds,
+                                    bucket_seconds=args.bucket_seconds or None, emit_every=args.emit_every,
+                                    clock=None if args.timestamps else time.time)
+    lines = follow(args.follow, from_start=args.from_start) if args.follow is not None else (
+        line.rstrip('\r\n') for line in sys.stdin)
+
+    def stop(signum: int, frame: Any) -> None:
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    with StreamingResultWriter(args.output) as writer:
+        try:
+            for line in lines:
+                if line is None:
+                    writer.write(aggregator.tick())
+                elif line.strip():
+                    item, timestamp = parse_line(line, args.timestamps)
+                    writer.write(aggregator.add(item, timestamp))
+        except KeyboardInterrupt:
+            pass
+        writer.write(aggregator.flush())
+    aggregator.processor.invalid_values.log_summary(logger, args.follow or "stdin")
+
+
+if __name__ == "__main__":
+    main()